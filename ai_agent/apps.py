@@ -4,3 +4,22 @@ from django.apps import AppConfig
 class AiAgentConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ai_agent'
+
+    def ready(self):
+        from django.conf import settings
+        from modules.corpus_index import open_corpus_index
+        from modules.search import configure_search
+        from modules.search_cache import configure_search_cache
+
+        configure_search_cache(
+            path=settings.SEARCH_CACHE_PATH or None,
+            ttl=settings.SEARCH_CACHE_TTL,
+            max_memory_entries=settings.SEARCH_CACHE_MEMORY_ENTRIES,
+            max_disk_entries=settings.SEARCH_CACHE_MAX_ENTRIES,
+        )
+        configure_search(
+            timeout=settings.SEARCH_TIMEOUT,
+            max_results=settings.SEARCH_MAX_RESULTS,
+            corpus=open_corpus_index(settings.LEGAL_CORPUS_INDEX_PATH),
+            min_confidence=settings.LEGAL_CORPUS_MIN_CONFIDENCE,
+        )
@@ -0,0 +1,170 @@
+"""
+WebSocket consumer for live drafting sessions.
+
+ws://<host>/ws/sessions/<session_id>/   (the session's owner only)
+
+Client -> server:
+    {"type": "user_turn", "prompt": "..."}
+
+Server -> client:
+    {"type": "user_turn", "prompt": "..."}                    every tab
+    {"type": "token", "text": "..."}                          sender only
+    {"type": "tool_start", "tool": "...", "message": "..."}   sender only
+    {"type": "draft_start"}                                   sender only
+    {"type": "messages", "messages": [user, assistant]}       every tab, once persisted
+    {"type": "draft_update", "document_id": "...", "content": "..."}  every tab
+    {"type": "error", "error": "..."}                         sender only
+
+While the session is drafting, turns go to the agent (with history loaded from
+the database); once a draft exists they refine it, as in the Streamlit app.
+"""
+
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from channels.db import database_sync_to_async
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+from rest_framework.renderers import JSONRenderer
+
+from authentication.utils import resolve_user
+from chat.serializers import MessageSerializer
+from chat_sessions.models import Session
+from documents.models import Document
+from .history import load_session_history, record_turn
+from .services import stream_legal_document, refine_legal_document
+
+FORWARDED_STREAM_EVENTS = ('token', 'tool_start', 'tool_end', 'draft_start')
+
+
+@database_sync_to_async
+def get_session_status(session_id, user=None):
+    sessions = Session.objects.filter(pk=session_id)
+    if user is not None:
+        sessions = sessions.filter(user=user)
+    return sessions.values_list('status', flat=True).first()
+
+
+@database_sync_to_async
+def get_current_draft(session_id):
+    return Document.objects.filter(session_id=session_id).values_list('content', flat=True).first()
+
+
+@database_sync_to_async
+def save_turn(session_id, prompt, reply, draft=None, refined=False):
+    user_message, assistant_message, document = record_turn(session_id, prompt, reply, draft, refined)
+    messages = MessageSerializer([user_message, assistant_message], many=True).data
+    # Round-trip through JSON so UUIDs/datetimes survive the channel layer.
+    return json.loads(JSONRenderer().render(messages)), document
+
+
+class DraftingConsumer(AsyncJsonWebsocketConsumer):
+    """One connection per open tab; tabs on the same session share a group."""
+
+    async def connect(self):
+        self.session_id = str(self.scope['url_route']['kwargs']['session_id'])
+        self.group_name = f'drafting_{self.session_id}'
+        self.turn_task = None
+
+        # Only the session's owner may join it
+        user = await database_sync_to_async(resolve_user)(self.scope.get('user'))
+        if await get_session_status(self.session_id, user) is None:
+            await self.close(code=4404)
+            return
+
+        await self.channel_layer.group_add(self.group_name, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        if self.turn_task and not self.turn_task.done():
+            self.turn_task.cancel()
+        await self.channel_layer.group_discard(self.group_name, self.channel_name)
+
+    async def receive_json(self, content, **kwargs):
+        if content.get('type') != 'user_turn':
+            await self.send_json({'type': 'error', 'error': 'Unsupported message type.'})
+            return
+
+        prompt = (content.get('prompt') or '').strip()
+        if not prompt:
+            await self.send_json({'type': 'error', 'error': 'Prompt is required.'})
+            return
+        if self.turn_task and not self.turn_task.done():
+            await self.send_json({'type': 'error', 'error': 'A turn is already in progress.'})
+            return
+
+        # Run the turn as a task so this consumer keeps receiving group events.
+        self.turn_task = asyncio.create_task(self.handle_turn(prompt))
+
+    async def handle_turn(self, prompt):
+        try:
+            await self.channel_layer.group_send(self.group_name, {
+                'type': 'session.user_turn',
+                'prompt': prompt,
+            })
+
+            status = await get_session_status(self.session_id)
+            if status == 'drafting':
+                await self.generate(prompt)
+            else:
+                await self.refine(prompt)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self.send_json({'type': 'error', 'error': str(e)})
+
+    async def generate(self, prompt):
+        history = await database_sync_to_async(load_session_history)(self.session_id)
+        events = stream_legal_document(prompt, history, session_key=self.session_id)
+        next_event = sync_to_async(next, thread_sensitive=False)
+
+        while True:
+            item = await next_event(events, None)
+            if item is None:
+                break
+            event, data = item
+            if event in FORWARDED_STREAM_EVENTS:
+                await self.send_json({'type': event, **data})
+            elif event == 'error':
+                await self.send_json({'type': 'error', **data})
+                return
+            elif event == 'done':
+                await self.publish_turn(prompt, data['result'], data['draft'])
+
+    async def refine(self, prompt):
+        current_draft = await get_current_draft(self.session_id)
+        if not current_draft:
+            await self.send_json({'type': 'error', 'error': 'No draft to refine.'})
+            return
+        refined = await sync_to_async(refine_legal_document, thread_sensitive=False)(
+            current_draft, prompt
+        )
+        await self.publish_turn(prompt, refined['result'], refined['result'], refined=True)
+
+    async def publish_turn(self, prompt, reply, draft, refined=False):
+        messages, document = await save_turn(self.session_id, prompt, reply, draft, refined)
+        await self.channel_layer.group_send(self.group_name, {
+            'type': 'session.messages',
+            'messages': messages,
+        })
+        if document is not None:
+            await self.channel_layer.group_send(self.group_name, {
+                'type': 'session.draft_update',
+                'document_id': str(document.id),
+                'content': document.content,
+            })
+
+    # Group event handlers
+
+    async def session_user_turn(self, event):
+        await self.send_json({'type': 'user_turn', 'prompt': event['prompt']})
+
+    async def session_messages(self, event):
+        await self.send_json({'type': 'messages', 'messages': event['messages']})
+
+    async def session_draft_update(self, event):
+        await self.send_json({
+            'type': 'draft_update',
+            'document_id': event['document_id'],
+            'content': event['content'],
+        })
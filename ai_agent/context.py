@@ -0,0 +1,172 @@
+"""
+Context-window management for drafting conversations.
+
+Before each agent call the history is fitted to a per-model token budget: the
+system prompt and the last N turns are kept verbatim and everything older is
+replaced by a rolling summary. Summaries are cached per session and extended
+incrementally, so each older message is summarized once.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from modules.agent import get_summary_prompt
+
+SUMMARY_PREFIX = "Summary of the earlier conversation:\n"
+# Per-message overhead of the chat format (role markers, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding('cl100k_base')
+                except Exception:
+                    # tiktoken missing, or its vocabulary cannot be downloaded
+                    _encoding = False
+    return _encoding
+
+
+def count_tokens(text):
+    """Count tokens with tiktoken, falling back to ~4 characters per token."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + 3) // 4
+
+
+def count_message_tokens(messages):
+    return sum(count_tokens(message.content) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+def _digest(messages):
+    digest = hashlib.sha1()
+    for message in messages:
+        digest.update(message.type.encode())
+        digest.update(b'\0')
+        digest.update(message.content.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _transcript(messages):
+    labels = {'human': 'Client', 'ai': 'Lawyer'}
+    return '\n'.join(f"{labels.get(m.type, m.type)}: {m.content}" for m in messages)
+
+
+class SummaryCache:
+    """LRU of rolling summaries: key -> (messages covered, digest of them, summary)."""
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, covered, digest, summary):
+        with self._lock:
+            self._entries[key] = (covered, digest, summary)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ContextWindowManager:
+    """
+    Fits a conversation history into a token budget.
+
+    Args:
+        summarize (callable): ``summarize(previous_summary, messages) -> str``,
+            called only for messages not yet covered by the cached summary.
+        token_budget (int): Max tokens for system prompt + history + input.
+        keep_turns (int): Number of recent user/assistant turns kept verbatim.
+    """
+
+    def __init__(self, summarize, token_budget, keep_turns=6, cache=None):
+        self.summarize = summarize
+        self.token_budget = token_budget
+        self.keep_turns = keep_turns
+        self.cache = cache if cache is not None else SummaryCache()
+
+    def fit(self, history, prompt, system_prompt='', session_key=None):
+        """
+        Return ``(history, stats)`` where history fits the budget.
+
+        ``stats`` holds the prompt-token counts before and after compaction.
+        """
+        fixed_tokens = count_tokens(system_prompt) + count_tokens(prompt) + 2 * MESSAGE_OVERHEAD_TOKENS
+        history_tokens = count_message_tokens(history)
+        stats = {
+            'token_budget': self.token_budget,
+            'prompt_tokens_before': fixed_tokens + history_tokens,
+            'summarized_messages': 0,
+        }
+
+        if fixed_tokens + history_tokens <= self.token_budget:
+            stats['prompt_tokens'] = stats['prompt_tokens_before']
+            return list(history), stats
+
+        keep = self.keep_turns * 2
+        older, recent = (history[:-keep], history[-keep:]) if keep else (history, [])
+        compacted = []
+        if older:
+            summary = self._summary_for(older, session_key)
+            compacted.append(SystemMessage(content=SUMMARY_PREFIX + summary))
+            stats['summarized_messages'] = len(older)
+        compacted.extend(recent)
+
+        # Still too long (e.g. a pasted document): drop the oldest kept turns,
+        # but always keep the summary and the latest exchange.
+        start = 1 if older else 0
+        while (fixed_tokens + count_message_tokens(compacted) > self.token_budget
+               and len(compacted) - start > 2):
+            del compacted[start]
+
+        stats['prompt_tokens'] = fixed_tokens + count_message_tokens(compacted)
+        return compacted, stats
+
+    def _summary_for(self, older, session_key):
+        key = session_key or _digest(older[:1])
+        cached = self.cache.get(key)
+        previous, covered = '', 0
+        if cached is not None:
+            cached_covered, cached_digest, cached_summary = cached
+            if cached_covered <= len(older) and _digest(older[:cached_covered]) == cached_digest:
+                previous, covered = cached_summary, cached_covered
+
+        if covered == len(older):
+            return previous
+
+        summary = self.summarize(previous, older[covered:])
+        self.cache.set(key, len(older), _digest(older), summary)
+        return summary
+
+
+def llm_summarizer(llm):
+    """Build a ``summarize`` callable for ContextWindowManager from a chat model."""
+    def summarize(previous_summary, messages):
+        prompt = get_summary_prompt(previous_summary, _transcript(messages))
+        return llm.invoke([HumanMessage(content=prompt)]).content.strip()
+    return summarize
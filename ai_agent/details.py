@@ -0,0 +1,81 @@
+"""
+Per-session document details, extracted as messages arrive.
+
+Each session has one documents.DocumentDetails row holding the extractor
+state (values, confidence, provenance) and how many of the session's messages
+it has scanned. New turns are fed to the extractor when they are recorded, so
+reading a session's details is a single indexed lookup; messages written
+elsewhere (e.g. the chat API) are caught up on the next read, scanning only
+the ones after ``scanned_messages``.
+"""
+
+from django.db import transaction
+
+from chat.models import Message
+from documents.models import DocumentDetails
+from modules.details import DetailsExtractor
+
+
+def _source(message, index):
+    return {'message_id': str(message.id), 'index': index, 'role': message.role}
+
+
+def update_session_details(session_id, new_messages=None, document=None):
+    """
+    Feed a session's unscanned messages (and a new draft) to its extractor and persist the result.
+
+    ``new_messages`` are the messages just written, in order; when they follow
+    the already scanned ones directly they are used without querying. Otherwise
+    the unscanned messages are read from the database. ``document`` is a
+    Document whose content was just drafted; drafts are not chat messages, so
+    the content is fed here and the details are linked to the document.
+
+    Returns:
+        DocumentDetails: The session's details row.
+    """
+    with transaction.atomic():
+        record = DocumentDetails.objects.select_for_update().filter(session_id=session_id).first()
+        if record is None and document is not None:
+            # Details created for the document through the API, before this session was tracked
+            record = DocumentDetails.objects.select_for_update().filter(document=document, session=None).first()
+        if record is None:
+            record = DocumentDetails(session_id=session_id)
+        values = {field: value for field, value in record.details.items() if field in record.confidence}
+        extractor = DetailsExtractor(values, record.confidence, record.provenance)
+
+        scanned = record.scanned_messages
+        total = Message.objects.filter(session_id=session_id).count()
+        if new_messages is not None and scanned + len(new_messages) == total:
+            pending = list(new_messages)
+        else:
+            pending = list(Message.objects.filter(session_id=session_id).order_by('created_at', 'id')[scanned:])
+        for offset, message in enumerate(pending):
+            extractor.feed(message.content, _source(message, scanned + offset))
+
+        fields = ['details', 'confidence', 'provenance', 'scanned_messages', 'updated_at']
+        if document is not None:
+            extractor.feed(document.content, {'document_id': str(document.id), 'role': 'document'})
+            record.document = document
+            fields.append('document')
+        elif not pending and record.pk:
+            return record
+
+        # Keys the extractor does not produce (e.g. set through the API) are kept.
+        record.details = {**record.details, **extractor.details()}
+        record.confidence = extractor.confidence
+        record.provenance = extractor.provenance
+        record.scanned_messages = scanned + len(pending)
+        if record.pk and record.session_id:
+            record.save(update_fields=fields)
+        else:
+            record.session_id = session_id
+            record.save()
+    return record
+
+
+def get_session_details(session_id):
+    """The session's details, catching up on messages it has not scanned yet."""
+    record = DocumentDetails.objects.filter(session_id=session_id).first()
+    if record is not None and record.scanned_messages == Message.objects.filter(session_id=session_id).count():
+        return record
+    return update_session_details(session_id)
@@ -0,0 +1,193 @@
+"""
+Server-side conversation history for drafting sessions.
+
+Turns are read from and written to chat.Message, so clients only need to send
+the new prompt for a chat_sessions.Session. Converted LangChain message lists
+are kept in a per-process LRU so a turn does not re-read and re-convert the
+whole transcript.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+from langchain_core.messages import AIMessage, HumanMessage
+
+from chat.models import Message
+from chat_sessions.models import Session
+from documents.models import Document
+from .details import update_session_details
+
+DRAFT_READY_MESSAGE = "I have prepared the initial draft. Please review it in the editor and suggest any changes."
+DRAFT_UPDATED_MESSAGE = "I have updated the document based on your feedback. Please review the changes."
+DEFAULT_DOCUMENT_TYPE = 'Legal Document'
+
+
+def to_langchain_message(role, content):
+    if role == 'user':
+        return HumanMessage(content=content)
+    if role == 'assistant':
+        return AIMessage(content=content)
+    return None
+
+
+class SessionHistoryCache:
+    """
+    LRU of converted histories, keyed by session id.
+
+    Each entry remembers the message count and newest created_at it was built
+    from; a load compares them against one aggregate query, so writes made by
+    other processes or endpoints are picked up without reading message bodies.
+    """
+
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_id, version):
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None or entry[0] != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            return list(entry[1])
+
+    def set(self, session_id, version, history):
+        with self._lock:
+            self._entries[session_id] = (version, list(history))
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def extend(self, session_id, old_version, new_version, messages):
+        """Append new messages to an entry that is still at ``old_version``."""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                return
+            if entry[0] != old_version:
+                del self._entries[session_id]
+                return
+            self._entries[session_id] = (new_version, entry[1] + list(messages))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'sessions': len(self._entries)}
+
+
+history_cache = SessionHistoryCache(getattr(settings, 'AI_HISTORY_CACHE_SIZE', 256))
+
+
+def get_history_version(session_id):
+    """Return (message count, newest created_at) for a session."""
+    aggregate = Message.objects.filter(session_id=session_id).aggregate(
+        count=Count('id'), latest=Max('created_at')
+    )
+    return aggregate['count'], aggregate['latest']
+
+
+def load_session_history(session_id):
+    """Return the session's messages as LangChain messages, oldest first."""
+    session_id = str(session_id)
+    version = get_history_version(session_id)
+    history = history_cache.get(session_id, version)
+    if history is not None:
+        return history
+
+    history = []
+    rows = Message.objects.filter(session_id=session_id).order_by('created_at', 'id').values_list('role', 'content')
+    for role, content in rows:
+        message = to_langchain_message(role, content)
+        if message is not None:
+            history.append(message)
+    history_cache.set(session_id, version, history)
+    return history
+
+
+def save_messages(session_id, messages, draft=None, document_type=None, formatted_content='', status=None):
+    """
+    Persist a batch of messages for a session in one transaction.
+
+    ``messages`` are ``(role, content, metadata)`` tuples, oldest first; they
+    are written with one bulk INSERT and get increasing created_at values so
+    their order is kept. When ``draft`` is given the session's Document is
+    created or updated and the session moves to the reviewing state (unless
+    ``status`` says otherwise). The session row is written once.
+
+    Returns:
+        tuple: (list of saved messages, document or None)
+    """
+    session_id = str(session_id)
+    with transaction.atomic():
+        session = Session.objects.get(pk=session_id)
+        old_version = get_history_version(session_id)
+        now = timezone.now()
+        saved = Message.objects.bulk_create([
+            Message(session=session, role=role, content=content, metadata=metadata or {},
+                    created_at=now + timedelta(microseconds=offset))
+            for offset, (role, content, metadata) in enumerate(messages)
+        ])
+
+        document = None
+        if draft is not None:
+            defaults = {'content': draft, 'formatted_content': formatted_content}
+            if document_type:
+                defaults['document_type'] = document_type
+            document, _ = Document.objects.update_or_create(
+                session=session,
+                defaults=defaults,
+                create_defaults={'document_type': DEFAULT_DOCUMENT_TYPE, **defaults},
+            )
+            session.status = 'reviewing'
+        if status:
+            session.status = status
+        session.save(update_fields=['status', 'updated_at'])
+        update_session_details(session_id, saved, document)
+
+        if saved:
+            new_version = (old_version[0] + len(saved), saved[-1].created_at)
+            converted = [to_langchain_message(message.role, message.content) for message in saved]
+            transaction.on_commit(lambda: history_cache.extend(
+                session_id, old_version, new_version, [m for m in converted if m is not None],
+            ))
+
+    return saved, document
+
+
+def record_turn(session_id, prompt, reply, draft=None, refined=False, prompt_metadata=None):
+    """
+    Persist one user/assistant exchange for a session.
+
+    When ``draft`` is given the session's Document is created or updated and the
+    session moves to the reviewing state, mirroring the Streamlit flow where the
+    draft lives in the editor and the chat only gets a short notice.
+    ``prompt_metadata`` is stored on the user message (e.g. the job that ran
+    the turn, see jobs.handlers.run_generate).
+
+    Returns:
+        tuple: (user_message, assistant_message, document or None)
+    """
+    metadata = {}
+    if draft is not None:
+        reply = DRAFT_UPDATED_MESSAGE if refined else DRAFT_READY_MESSAGE
+        metadata = {'draft_updated': True} if refined else {'draft_complete': True}
+
+    (user_message, assistant_message), document = save_messages(
+        session_id, [('user', prompt, prompt_metadata or {}), ('assistant', reply, metadata)], draft
+    )
+    return user_message, assistant_message, document
@@ -0,0 +1,41 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from modules.corpus_index import CorpusIndex
+
+
+class Command(BaseCommand):
+    help = "Index a folder of statutes and case-law text for offline Legal_Web_Search."
+
+    def add_arguments(self, parser):
+        parser.add_argument('folder', help="Folder of .txt/.md documents (searched recursively)")
+        parser.add_argument('--index', default=settings.LEGAL_CORPUS_INDEX_PATH,
+                            help="Index directory (default: LEGAL_CORPUS_INDEX_PATH)")
+        parser.add_argument('--rebuild', action='store_true', help="Re-index every file, not only changed ones")
+        parser.add_argument('--compact', action='store_true', help="Merge all segments after indexing")
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options['folder']):
+            raise CommandError(f"Corpus folder not found: {options['folder']}")
+        try:
+            index = CorpusIndex(options['index'])
+            started = time.perf_counter()
+            stats = index.ingest(options['folder'], force=options['rebuild'])
+            if options['compact']:
+                index.compact()
+        except OSError as e:
+            raise CommandError(f"Error indexing corpus: {e}")
+
+        self.stdout.write(self.style.SUCCESS(
+            "Indexed {added} new and {updated} changed files ({sections} sections), "
+            "removed {removed}, skipped {unchanged} unchanged in {elapsed:.1f}s".format(
+                elapsed=time.perf_counter() - started, **stats)
+        ))
+        summary = index.stats()
+        self.stdout.write(
+            f"Index now holds {summary['sections']} sections from {summary['files']} files "
+            f"in {summary['segments']} segment(s)"
+        )
@@ -0,0 +1,6 @@
+from django.urls import path
+from .consumers import DraftingConsumer
+
+websocket_urlpatterns = [
+    path('ws/sessions/<uuid:session_id>/', DraftingConsumer.as_asgi(), name='drafting_session'),
+]
@@ -5,9 +5,14 @@ Directly imports and uses logic from modules/agent.py.
 
 import sys
 import os
+import logging
+import re
+import threading
+import time
 from pathlib import Path
+from queue import Queue
 from django.conf import settings
-from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 
 # Ensure the parent directory is in sys.path for import
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -15,11 +20,310 @@ if str(BASE_DIR) not in sys.path:
     sys.path.insert(0, str(BASE_DIR))
 
 # Import the modules directly
-from modules.agent import get_agent_executor, get_refinement_prompt
-from modules.ui import clean_legal_document, extract_document_details
+from modules.agent import (
+    registry,
+    get_additional_clauses_prompt,
+    get_batch_drafting_prompt,
+    get_interview_prompt,
+    get_refinement_prompt,
+    get_section_refinement_prompt,
+    get_section_selection_prompt,
+    DRAFTING_SYSTEM_PROMPT,
+)
+from modules.sections import (
+    split_sections,
+    join_sections,
+    outline_sections,
+    select_sections,
+    is_global_edit,
+    format_section_blocks,
+    parse_section_blocks,
+    splice_sections,
+)
+from modules.search import search_legal_sources
+from modules.search_cache import get_search_cache
+from modules.cleaning import clean_legal_document
+from modules.clause_templates import detect_document_type, fill_template, get_template, missing_details
+from modules.details import DetailsExtractor
+from .context import ContextWindowManager, SummaryCache, llm_summarizer
+from .history import load_session_history, record_turn
+from .streaming import QueueCallbackHandler, DRAFT_MARKER
 
+logger = logging.getLogger(__name__)
 
-def generate_legal_document(prompt, conversation_history=None):
+# Section-targeted refinement needs a draft with at least this many sections,
+# and falls back to the full document if more than this share would change.
+MIN_SECTIONS_FOR_TARGETED_REFINE = 3
+MAX_TARGETED_SECTION_SHARE = 0.5
+
+# Turns that need Legal_Web_Search go through the agent; everything else is
+# answered by the chat model directly.
+RESEARCH_REQUEST = re.compile(
+    r"\b(?:statutes?|statutory|legislation|regulations?|case\s+law|precedents?|courts?|tribunals?|"
+    r"canlii|justice\.gc\.ca|research|look\s+up|legal\s+requirements?|is\s+it\s+legal|"
+    r"what\s+does\s+the\s+law|by-?laws?)\b",
+    re.IGNORECASE,
+)
+NAMED_ACT = re.compile(r"\b[A-Z][a-z]+(?:\s+[A-Z][a-z]+)*\s+Act\b")
+RESEARCH_ANNOUNCEMENT = "search for relevant legal information"
+
+# Turns asking for the draft, which the clause templates can answer once every
+# detail is known, and sentences asking for clauses beyond the templates'.
+DRAFT_REQUEST = re.compile(
+    r"\b(?:draft|generate|prepare|create|write|produce|finali[sz]e|go\s+ahead|proceed)\b",
+    re.IGNORECASE,
+)
+ADDITIONAL_CLAUSE_REQUEST = re.compile(
+    r"\b(?:add|include|insert|want|need|require)\b[^.?!\n]*\b(?:clause|provision|covenant|condition|restriction)s?\b",
+    re.IGNORECASE,
+)
+SENTENCE = re.compile(r"[^.?!\n]+[.?!]?")
+
+interview_prompt = get_interview_prompt()
+
+# Rolling summaries of long conversations, shared by all requests in this process
+summary_cache = SummaryCache()
+
+
+def get_api_key():
+    # Get API key from Django settings
+    api_key = getattr(settings, 'OPENROUTER_API_KEY', '')
+    if not api_key:
+        raise ValueError("OPENROUTER_API_KEY not configured in Django settings")
+    return api_key
+
+
+def get_agent_executor():
+    """
+    Return the pooled agent executor for the configured model.
+
+    Executors are built once per worker process and reused across requests,
+    keyed by AI_MODEL, AI_TEMPERATURE, OPENROUTER_API_KEY and OPENROUTER_BASE_URL.
+    """
+    return registry.get_agent_executor(
+        get_api_key(),
+        model=settings.AI_MODEL,
+        temperature=settings.AI_TEMPERATURE,
+        base_url=settings.OPENROUTER_BASE_URL,
+    )
+
+
+def get_chat_model():
+    """Return the pooled chat model for the configured model (no agent/tools)."""
+    return registry.get_llm(
+        get_api_key(),
+        model=settings.AI_MODEL,
+        temperature=settings.AI_TEMPERATURE,
+        base_url=settings.OPENROUTER_BASE_URL,
+    )
+
+
+def get_context_manager():
+    """Return a ContextWindowManager using the token budget of AI_MODEL."""
+    budget = settings.AI_CONTEXT_TOKEN_BUDGETS.get(
+        settings.AI_MODEL, settings.AI_CONTEXT_DEFAULT_TOKEN_BUDGET
+    )
+    return ContextWindowManager(
+        summarize=llm_summarizer(get_chat_model()),
+        token_budget=budget,
+        keep_turns=settings.AI_CONTEXT_KEEP_TURNS,
+        cache=summary_cache,
+    )
+
+
+def prepare_history(prompt, conversation_history=None, session_key=None):
+    """
+    Convert and compact the history for one agent call.
+    
+    The prompt itself is passed to the agent as "input", so it is not part of
+    the returned history.
+    
+    Returns:
+        tuple: (history, metadata) where metadata holds prompt-token counts
+    """
+    history = to_langchain_messages(conversation_history)
+    history, metadata = get_context_manager().fit(
+        history, prompt, DRAFTING_SYSTEM_PROMPT, session_key=session_key
+    )
+    logger.info(
+        "Prompt tokens: %s (before compaction: %s, summarized messages: %s)",
+        metadata['prompt_tokens'], metadata['prompt_tokens_before'], metadata['summarized_messages'],
+    )
+    return history, metadata
+
+
+def elapsed_ms(started):
+    return round((time.perf_counter() - started) * 1000)
+
+
+def route_turn(prompt, history):
+    """
+    Decide how to answer a drafting turn.
+    
+    Returns:
+        str: "agent" when the turn needs research (explicit legal-research
+             wording, a named Act, or research announced on the previous
+             turn), otherwise "direct"
+    """
+    if not settings.AI_ROUTING_ENABLED:
+        return 'agent'
+    return 'agent' if needs_research(prompt, history) else 'direct'
+
+
+def needs_research(prompt, history):
+    """Explicit legal-research wording, a named Act, or research announced on the previous turn."""
+    if RESEARCH_REQUEST.search(prompt) or NAMED_ACT.search(prompt):
+        return True
+    last_reply = next((m.content for m in reversed(history) if m.type == 'ai'), '')
+    return RESEARCH_ANNOUNCEMENT in last_reply.lower()
+
+
+def run_turn(path, prompt, history, callbacks=None):
+    """Answer a drafting turn on the given path and return the raw output text."""
+    inputs = {"input": prompt, "history": history}
+    config = {"callbacks": callbacks} if callbacks else {}
+    if path == 'agent':
+        return get_agent_executor().invoke(inputs, config=config)["output"]
+
+    chain = interview_prompt | get_chat_model()
+    if callbacks:
+        # Stream so token callbacks fire as the answer is produced.
+        return ''.join(chunk.content for chunk in chain.stream(inputs, config=config))
+    return chain.invoke(inputs).content
+
+
+def answer_turn(prompt, history, callbacks=None):
+    """
+    Route a drafting turn and answer it.
+
+    A direct answer that only announces research is re-run through the agent,
+    so the search happens on this turn instead of the user's next message.
+
+    Returns:
+        tuple: (path, output text)
+    """
+    path = route_turn(prompt, history)
+    output = run_turn(path, prompt, history, callbacks)
+    if path == 'direct' and RESEARCH_ANNOUNCEMENT in output.lower():
+        path = 'agent'
+        output = run_turn(path, prompt, history, callbacks)
+    return path, output
+
+
+def complete_prompt(prompt):
+    """Run a single self-contained prompt (refinement) without the agent loop."""
+    if not settings.AI_ROUTING_ENABLED:
+        return get_agent_executor().invoke({"input": prompt, "history": []})["output"], 'agent'
+    return get_chat_model().invoke([HumanMessage(content=prompt)]).content, 'direct'
+
+
+def get_agent_pool_stats():
+    """Return hit/miss counters for the pooled agent executors."""
+    return registry.stats()
+
+
+def get_search_cache_stats():
+    """Return hit/miss counters for the Legal_Web_Search result cache."""
+    return get_search_cache().stats()
+
+
+def to_langchain_messages(conversation_history):
+    """Convert [{"role": ..., "content": ...}] dicts to LangChain messages."""
+    history = []
+    if conversation_history:
+        for msg in conversation_history:
+            if isinstance(msg, BaseMessage):
+                # Already converted (e.g. loaded by ai_agent.history)
+                history.append(msg)
+            elif msg.get('role') == 'user':
+                history.append(HumanMessage(content=msg.get('content', '')))
+            elif msg.get('role') == 'assistant':
+                history.append(AIMessage(content=msg.get('content', '')))
+    return history
+
+
+def finalize_response(response_content):
+    """Clean the draft if the agent answered with DRAFT_COMPLETE:."""
+    # Check if this is a draft completion
+    if DRAFT_MARKER in response_content:
+        draft = response_content.replace(DRAFT_MARKER, "").strip()
+        # Clean the document using existing utility
+        cleaned_draft = clean_legal_document(draft)
+        return f"{DRAFT_MARKER} {cleaned_draft}"
+    
+    return response_content
+
+
+def additional_clause_requests(texts):
+    """Sentences of the user's messages asking for additional clauses (questions excluded)."""
+    requests = []
+    for text in texts:
+        for sentence in SENTENCE.findall(text):
+            sentence = sentence.strip()
+            if sentence.endswith('?') or not ADDITIONAL_CLAUSE_REQUEST.search(sentence):
+                continue
+            if sentence not in requests:
+                requests.append(sentence)
+    return requests
+
+
+def draft_from_template(prompt, conversation_history=None):
+    """
+    Draft the document from the clause templates when the turn asks for the
+    draft and the conversation already states every detail the template needs.
+    
+    The standard clauses are filled in locally; only clauses the user asked
+    for beyond them are drafted by the chat model.
+    
+    Returns:
+        dict: like generate_legal_document, with metadata path "template",
+              "document_type", "jurisdiction" and "additional_clauses" (the
+              number of requests drafted by the model), or None when the turn
+              needs the model
+    """
+    if not settings.AI_TEMPLATE_DRAFTING or not DRAFT_REQUEST.search(prompt):
+        return None
+    started = time.perf_counter()
+    history = to_langchain_messages(conversation_history)
+    if needs_research(prompt, history):
+        return None
+    messages = history + [HumanMessage(content=prompt)]
+    user_texts = [message.content for message in messages if message.type == 'human']
+    document_type = detect_document_type(user_texts)
+    if document_type is None:
+        return None
+    extractor = DetailsExtractor()
+    for message in messages:
+        extractor.feed(message.content)
+    template = get_template(document_type, extractor.values.get('jurisdiction'))
+    if template is None or missing_details(template, extractor.values):
+        return None
+
+    additional_terms = ''
+    requests = additional_clause_requests(user_texts)
+    if requests:
+        clauses_prompt = get_additional_clauses_prompt(
+            template.template.title.lower(),
+            "\n".join(f"- {field}: {value}" for field, value in extractor.details().items()),
+            "\n".join(f"- {request}" for request in requests),
+        )
+        additional_terms = clean_legal_document(
+            get_chat_model().invoke([HumanMessage(content=clauses_prompt)]).content
+        )
+    draft = fill_template(template, extractor.values, additional_terms)
+    return {
+        'result': f"{DRAFT_MARKER} {draft}",
+        'metadata': {
+            'path': 'template',
+            'document_type': document_type,
+            'jurisdiction': template.jurisdiction,
+            'additional_clauses': len(requests),
+            'latency_ms': elapsed_ms(started),
+        },
+    }
+
+
+def generate_legal_document(prompt, conversation_history=None, session_key=None):
     """
     Generate legal document using the existing Streamlit modules.
     
@@ -27,86 +331,244 @@ def generate_legal_document(prompt, conversation_history=None):
         prompt (str): User input prompt
         conversation_history (list): List of conversation messages in format:
                                    [{"role": "user", "content": "..."}, {"role": "assistant", "content": "..."}]
+        session_key (str): Optional session id used to cache the rolling summary
     
     Returns:
-        str: AI response or document content
+        dict: {"result": AI response or document content,
+               "metadata": prompt-token counts, path ("agent"/"direct") and latency_ms,
+               or path "template" when drafted by draft_from_template}
     """
     try:
-        # Get API key from Django settings
-        api_key = getattr(settings, 'OPENROUTER_API_KEY', '')
-        if not api_key:
-            raise ValueError("OPENROUTER_API_KEY not configured in Django settings")
-        
-        # Initialize agent executor
-        agent_executor = get_agent_executor(api_key)
-        
-        # Convert conversation history to LangChain message format
-        history = []
-        if conversation_history:
-            for msg in conversation_history:
-                if msg.get('role') == 'user':
-                    history.append(HumanMessage(content=msg.get('content', '')))
-                elif msg.get('role') == 'assistant':
-                    history.append(AIMessage(content=msg.get('content', '')))
-        
-        # Add current user message to history
-        history.append(HumanMessage(content=prompt))
-        
-        # Generate response using agent
-        response = agent_executor.invoke({
-            "input": prompt,
-            "history": history
-        })
-        
-        response_content = response["output"]
+        templated = draft_from_template(prompt, conversation_history)
+        if templated is not None:
+            return templated
+
+        # Convert and compact conversation history
+        history, metadata = prepare_history(prompt, conversation_history, session_key)
         
-        # Check if this is a draft completion
-        if "DRAFT_COMPLETE:" in response_content:
-            draft = response_content.replace("DRAFT_COMPLETE:", "").strip()
-            # Clean the document using existing utility
-            cleaned_draft = clean_legal_document(draft)
-            return f"DRAFT_COMPLETE: {cleaned_draft}"
+        # Generate response via the agent (research) or the chat model directly
+        started = time.perf_counter()
+        path, output = answer_turn(prompt, history)
+        metadata.update(path=path, latency_ms=elapsed_ms(started))
         
-        return response_content
+        return {'result': finalize_response(output), 'metadata': metadata}
         
     except Exception as e:
         raise Exception(f"Error generating legal document: {str(e)}")
 
 
+def generate_session_turn(session_id, prompt, job_id=None):
+    """
+    Generate the next turn of a stored drafting session.
+    
+    Prior turns are loaded from chat.Message (see ai_agent.history), so the
+    client only sends the new prompt. The user message and the assistant reply
+    (and the Document, once drafted) are saved in one transaction; ``job_id``
+    is recorded on the user message so a retried job can find the turn.
+    
+    Returns:
+        dict: {"result", "metadata", "user_message", "assistant_message", "document"}
+    """
+    history = load_session_history(session_id)
+    generated = generate_legal_document(prompt, history, session_key=str(session_id))
+    result = generated['result']
+
+    draft = None
+    if result.startswith(DRAFT_MARKER):
+        draft = result[len(DRAFT_MARKER):].strip()
+    user_message, assistant_message, document = record_turn(
+        session_id, prompt, result, draft, prompt_metadata={'job': job_id} if job_id else None
+    )
+
+    return {
+        'result': result,
+        'metadata': generated['metadata'],
+        'user_message': user_message,
+        'assistant_message': assistant_message,
+        'document': document,
+    }
+
+
+def stream_legal_document(prompt, conversation_history=None, session_key=None):
+    """
+    Generate a response like generate_legal_document, yielding events as they happen.
+    
+    Yields (event, data) tuples:
+        ("token", {"text": ...})            LLM output tokens
+        ("tool_start", {"tool", "input", "message"}) / ("tool_end", {"tool"})
+        ("draft_start", {})                 the answer began with DRAFT_COMPLETE:
+        ("done", {"result", "draft_complete", "draft", "metadata"}) final, cleaned answer
+        ("error", {"error": ...})
+    """
+    try:
+        templated = draft_from_template(prompt, conversation_history)
+        if templated is None:
+            history, metadata = prepare_history(prompt, conversation_history, session_key)
+    except Exception as e:
+        yield 'error', {'error': f"Error generating legal document: {str(e)}"}
+        return
+
+    if templated is not None:
+        draft = templated['result'][len(DRAFT_MARKER):].strip()
+        yield 'draft_start', {}
+        yield 'token', {'text': draft}
+        yield 'done', {'result': templated['result'], 'draft_complete': True, 'draft': draft,
+                       'metadata': templated['metadata']}
+        return
+
+    queue = Queue()
+    handler = QueueCallbackHandler(queue)
+    finished = object()
+
+    def run_agent():
+        started = time.perf_counter()
+        try:
+            path, output = answer_turn(prompt, history, callbacks=[handler])
+            metadata.update(path=path, latency_ms=elapsed_ms(started))
+            queue.put(('_result', output))
+        except Exception as e:
+            queue.put(('error', {'error': f"Error generating legal document: {str(e)}"}))
+        finally:
+            queue.put(finished)
+
+    # The agent keeps running if the client disconnects; its result is discarded.
+    threading.Thread(target=run_agent, daemon=True).start()
+
+    while True:
+        item = queue.get()
+        if item is finished:
+            return
+        event, data = item
+        if event == '_result':
+            result = finalize_response(data)
+            draft_complete = result.startswith(DRAFT_MARKER)
+            yield 'done', {
+                'result': result,
+                'draft_complete': draft_complete,
+                'draft': result[len(DRAFT_MARKER):].strip() if draft_complete else None,
+                'metadata': metadata,
+            }
+        else:
+            yield event, data
+
+
+def research_batch(document_type, instructions=''):
+    """
+    Run Legal_Web_Search once for a whole batch.
+
+    Every document of a batch shares this research (and repeated batches hit
+    the search cache), instead of each document researching on its own.
+    """
+    extractor = DetailsExtractor()
+    extractor.feed(instructions)
+    jurisdiction = extractor.values.get('jurisdiction', 'Canada')
+    return search_legal_sources(f"{document_type} legal requirements {jurisdiction}")
+
+
+def draft_batch_document(document_type, details, instructions='', research=''):
+    """Draft one document of a batch with the pooled chat model; returns the cleaned draft."""
+    lines = "\n".join(f"- {key}: {value}" for key, value in details.items())
+    prompt = get_batch_drafting_prompt(document_type, lines, instructions, research)
+    output = get_chat_model().invoke([HumanMessage(content=prompt)]).content
+    return clean_legal_document(output)
+
+
+def select_sections_with_llm(sections, user_request):
+    """Ask the chat model which sections a request affects; [] means all/unknown."""
+    prompt = get_section_selection_prompt(outline_sections(sections), user_request)
+    reply = get_chat_model().invoke([HumanMessage(content=prompt)]).content
+    # Only a bare ALL; "3, 5 (the SMALL claims clause)" names sections
+    if re.fullmatch(r'\W*ALL\W*', reply, re.IGNORECASE):
+        return []
+    numbers = {int(n) for n in re.findall(r'\d+', reply)}
+    return sorted(n for n in numbers if 0 <= n < len(sections))
+
+
+def clean_section_reply(text, section):
+    """Clean a rewritten section like a full draft, dropping any chatter before its heading."""
+    lines = clean_legal_document(text).split('\n')
+    heading = ' '.join(section['heading'].split())
+    if heading:
+        start = next((i for i, line in enumerate(lines) if line == heading), 0)
+        lines = lines[start:]
+    return '\n'.join(lines)
+
+
+def refine_sections(sections, selected, user_request):
+    """
+    Rewrite only the selected sections and splice them back in.
+    
+    Returns:
+        tuple: (updated sections, changed indexes, path), or None if the
+        model's reply could not be matched to every selected section
+    """
+    prompt = get_section_refinement_prompt(
+        outline_sections(sections),
+        format_section_blocks([sections[i] for i in selected]),
+        user_request,
+    )
+    output, path = complete_prompt(prompt)
+    replacements = parse_section_blocks(output)
+    if not set(selected) <= set(replacements):
+        return None
+    updated, changed = splice_sections(
+        sections, {i: clean_section_reply(replacements[i], sections[i]) for i in selected}
+    )
+    return updated, changed, path
+
+
 def refine_legal_document(current_draft, user_request):
     """
     Refine an existing legal document based on user feedback.
     
+    Targeted edits send only the affected sections to the model: sections are
+    split with the heading rules of format_document_content, picked by lexical
+    ranking (or by the model when nothing matches) and spliced back in. Global
+    edits, short drafts and unparseable replies use the full document.
+    
     Args:
         current_draft (str): Current document content
         user_request (str): User's refinement request
     
     Returns:
-        str: Updated document content
+        dict: {"result": updated document, "mode": "sections" or "full",
+               "changed_sections": [{"index", "heading"}] or None in full mode,
+               "metadata": {"path", "latency_ms"}}
     """
+    started = time.perf_counter()
     try:
-        # Get API key from Django settings
-        api_key = getattr(settings, 'OPENROUTER_API_KEY', '')
-        if not api_key:
-            raise ValueError("OPENROUTER_API_KEY not configured in Django settings")
-        
-        # Initialize agent executor
-        agent_executor = get_agent_executor(api_key)
-        
+        sections = split_sections(current_draft)
+        selected = []
+        if len(sections) >= MIN_SECTIONS_FOR_TARGETED_REFINE and not is_global_edit(user_request):
+            selected = select_sections(sections, user_request) or select_sections_with_llm(sections, user_request)
+
+        if selected and len(selected) <= len(sections) * MAX_TARGETED_SECTION_SHARE:
+            refined = refine_sections(sections, selected, user_request)
+            if refined is not None:
+                updated, changed, path = refined
+                return {
+                    'result': join_sections(updated).strip(),
+                    'mode': 'sections',
+                    'changed_sections': [
+                        {'index': i, 'heading': updated[i]['heading']} for i in changed
+                    ],
+                    'metadata': {'path': path, 'latency_ms': elapsed_ms(started)},
+                }
+
         # Get refinement prompt
         refinement_input = get_refinement_prompt(current_draft, user_request)
         
-        # Generate refined document
-        response = agent_executor.invoke({
-            "input": refinement_input,
-            "history": []  # Empty history for refinement
-        })
-        
-        updated_draft = response["output"]
+        # Generate refined document (refinement never needs research)
+        updated_draft, path = complete_prompt(refinement_input)
         # Clean the document
         cleaned_draft = clean_legal_document(updated_draft)
         
-        return cleaned_draft
+        return {
+            'result': cleaned_draft,
+            'mode': 'full',
+            'changed_sections': None,
+            'metadata': {'path': path, 'latency_ms': elapsed_ms(started)},
+        }
         
     except Exception as e:
         raise Exception(f"Error refining legal document: {str(e)}")
@@ -120,21 +582,18 @@ def extract_document_details_from_history(conversation_history):
         conversation_history (list): List of conversation messages
     
     Returns:
-        dict: Extracted document details
+        dict: {"details": field values, "confidence": per field,
+               "provenance": per field, the index and role of the source message}
     """
     try:
-        # Convert to LangChain message format
-        history = []
-        if conversation_history:
-            for msg in conversation_history:
-                if msg.get('role') == 'user':
-                    history.append(HumanMessage(content=msg.get('content', '')))
-                elif msg.get('role') == 'assistant':
-                    history.append(AIMessage(content=msg.get('content', '')))
-        
-        # Extract details using existing utility
-        details = extract_document_details(history)
-        return details
+        extractor = DetailsExtractor()
+        for index, message in enumerate(conversation_history or []):
+            extractor.feed(message.get('content', ''), {'index': index, 'role': message.get('role')})
+        return {
+            'details': extractor.details(),
+            'confidence': extractor.confidence,
+            'provenance': extractor.provenance,
+        }
         
     except Exception as e:
         raise Exception(f"Error extracting document details: {str(e)}")
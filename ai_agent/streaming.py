@@ -0,0 +1,126 @@
+"""
+Streaming helpers for the AI agent (Server-Sent Events).
+
+The agent runs in a background thread; a LangChain callback handler forwards
+LLM tokens and tool calls into a queue which the request thread drains and
+writes to the client as they arrive.
+"""
+
+import json
+from queue import Queue
+
+from langchain_core.callbacks import BaseCallbackHandler
+from rest_framework.renderers import BaseRenderer
+
+from modules.cleaning import StreamingCleaner
+
+DRAFT_MARKER = "DRAFT_COMPLETE:"
+
+TOOL_STATUS_MESSAGES = {
+    'Legal_Web_Search': 'Searching CanLII and justice.gc.ca…',
+}
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets DRF negotiate ``Accept: text/event-stream`` for streaming views."""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Only reached for error responses; stream them as a single event.
+        return format_sse('error', data)
+
+
+def format_sse(event, data):
+    """Encode one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class DraftMarkerFilter:
+    """
+    Watches the token stream of one LLM call for the DRAFT_COMPLETE: marker.
+
+    Tokens are held back only until it is clear whether the response starts
+    with the marker; the marker itself is stripped from the forwarded text.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self._buffer = ""
+        self._decided = False
+        self._leading = True
+        self.is_draft = False
+
+    def feed(self, token):
+        """Return ``(text_to_forward, draft_started)`` for a new token."""
+        if self._decided:
+            if self.is_draft and self._leading:
+                # Drop whitespace between the marker and the document text.
+                token = token.lstrip()
+                self._leading = not token
+            return token, False
+
+        self._buffer += token
+        stripped = self._buffer.lstrip()
+        if stripped.startswith(DRAFT_MARKER):
+            self._decided = True
+            self.is_draft = True
+            text = stripped[len(DRAFT_MARKER):].lstrip()
+            self._leading = not text
+            return text, True
+        if DRAFT_MARKER.startswith(stripped):
+            # Could still become the marker; wait for more tokens.
+            return "", False
+
+        self._decided = True
+        return self._buffer, False
+
+
+class QueueCallbackHandler(BaseCallbackHandler):
+    """
+    Pushes ``(event, data)`` tuples for tokens and tool calls onto a queue.
+
+    Draft text is cleaned line by line as it streams, so the forwarded tokens
+    already match the cleaned draft of the final ``done`` event.
+    """
+
+    def __init__(self, queue: Queue):
+        self.queue = queue
+        self.marker = DraftMarkerFilter()
+        self.cleaner = StreamingCleaner()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        # Each agent step is a new LLM call; only the last one is the answer.
+        self.marker.reset()
+        self.cleaner = StreamingCleaner()
+
+    def on_llm_new_token(self, token, **kwargs):
+        if not token:
+            return
+        text, draft_started = self.marker.feed(token)
+        if draft_started:
+            self.queue.put(('draft_start', {}))
+        if self.marker.is_draft:
+            text = self.cleaner.feed(text)
+        if text:
+            self.queue.put(('token', {'text': text}))
+
+    def on_llm_end(self, response, **kwargs):
+        if self.marker.is_draft:
+            text = self.cleaner.flush()
+            if text:
+                self.queue.put(('token', {'text': text}))
+
+    def on_tool_start(self, serialized, input_str, **kwargs):
+        name = (serialized or {}).get('name', '')
+        self.queue.put(('tool_start', {
+            'tool': name,
+            'input': input_str,
+            'message': TOOL_STATUS_MESSAGES.get(name, f'Running {name}…'),
+        }))
+
+    def on_tool_end(self, output, **kwargs):
+        self.queue.put(('tool_end', {'tool': kwargs.get('name', '')}))
@@ -1,3 +1,960 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from io import StringIO
+from unittest.mock import MagicMock, patch
 
-# Create your tests here.
+from channels.routing import URLRouter
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk
+
+from modules.agent import AgentRegistry, get_agent_executor
+from modules.cleaning import StreamingCleaner, clean_legal_document
+from modules.clause_templates import fill_template, get_template
+from modules.details import DetailsExtractor
+from modules.corpus_index import CorpusIndex
+from modules.search import (
+    SCOPES, SearchBackend, asearch_legal_sources, asearch_many, configure_search, merge_results,
+    search_legal_sources,
+)
+from modules.search_cache import SearchCache, configure_search_cache, normalize_query
+from modules.tools import LegalWebSearchTool
+from modules.sections import join_sections, select_sections, split_sections
+from chat.models import Message
+from chat_sessions.models import Session
+from documents.models import Document
+from .context import ContextWindowManager, count_message_tokens
+from .history import history_cache, load_session_history
+from .services import generate_legal_document, route_turn, select_sections_with_llm
+from .routing import websocket_urlpatterns
+from .streaming import DraftMarkerFilter
+
+
+class AgentRegistryTests(TestCase):
+    """Tests for the process-wide agent executor pool."""
+
+    def setUp(self):
+        self.registry = AgentRegistry()
+
+    def tearDown(self):
+        self.registry.clear()
+
+    def test_executor_is_built_once_per_key(self):
+        first = self.registry.get_agent_executor('key', model='model-a', temperature=0.3)
+        second = self.registry.get_agent_executor('key', model='model-a', temperature=0.3)
+
+        self.assertIs(first, second)
+        self.assertEqual(self.registry.stats()['hits'], 1)
+        self.assertEqual(self.registry.stats()['misses'], 1)
+
+    def test_distinct_settings_get_distinct_executors(self):
+        first = self.registry.get_agent_executor('key', model='model-a', temperature=0.3)
+        second = self.registry.get_agent_executor('key', model='model-a', temperature=0.7)
+
+        self.assertIsNot(first, second)
+        self.assertEqual(self.registry.stats()['executors'], 2)
+
+    def test_models_share_one_http_connection_pool(self):
+        first = self.registry.get_llm('key', model='model-a')
+        second = self.registry.get_llm('key', model='model-b')
+
+        self.assertIs(first.http_client, second.http_client)
+
+
+class FakeToolChatModel(GenericFakeChatModel):
+    """Fake chat model usable with create_tool_calling_agent (no network)."""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+class FakeToolCallModel(FakeToolChatModel):
+    """Fake model whose scripted replies keep their tool calls when streamed."""
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        message = next(self.messages)
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content=message.content,
+            tool_call_chunks=[
+                {'name': call['name'], 'args': json.dumps(call['args']), 'id': call['id'], 'index': n}
+                for n, call in enumerate(message.tool_calls)
+            ],
+        ))
+
+
+@contextmanager
+def fake_models(*replies):
+    """Patch the pooled agent executor and chat model with one scripted fake model."""
+    llm = FakeToolChatModel(messages=iter([AIMessage(content=reply) for reply in replies]))
+    with ExitStack() as stack:
+        stack.enter_context(patch('ai_agent.services.get_agent_executor',
+                                  return_value=get_agent_executor('test-key', llm=llm)))
+        stack.enter_context(patch('ai_agent.services.get_chat_model', return_value=llm))
+        yield llm
+
+
+class DraftMarkerFilterTests(TestCase):
+    """Tests for DRAFT_COMPLETE: detection on a token stream."""
+
+    def feed_all(self, tokens):
+        marker = DraftMarkerFilter()
+        forwarded, started = [], False
+        for token in tokens:
+            text, draft_started = marker.feed(token)
+            forwarded.append(text)
+            started = started or draft_started
+        return ''.join(forwarded), started
+
+    def test_marker_split_across_tokens_is_stripped(self):
+        text, started = self.feed_all(['DRAFT_', 'COMPLETE', ':', ' ', 'LEASE', ' AGREEMENT'])
+
+        self.assertTrue(started)
+        self.assertEqual(text, 'LEASE AGREEMENT')
+
+    def test_plain_answer_is_forwarded_unchanged(self):
+        text, started = self.feed_all(['DRAFT', 'ING your lease.'])
+
+        self.assertFalse(started)
+        self.assertEqual(text, 'DRAFTING your lease.')
+
+
+class CleanLegalDocumentTests(TestCase):
+    """Tests for the line-preserving draft cleaner."""
+
+    RAW = "```markdown\n**LEASE AGREEMENT**  \n\n\n\n1.  Term :  one year ,\trenewable .\n2. Rent: $900.\n```\n"
+
+    def test_keeps_lines_and_paragraphs(self):
+        self.assertEqual(
+            clean_legal_document(self.RAW),
+            '**LEASE AGREEMENT**\n\n1. Term: one year, renewable.\n2. Rent: $900.',
+        )
+
+    def test_streamed_tokens_clean_like_the_whole_text(self):
+        cleaner = StreamingCleaner()
+        streamed = ''.join(cleaner.feed(self.RAW[i:i + 3]) for i in range(0, len(self.RAW), 3))
+
+        self.assertEqual(streamed + cleaner.flush(), clean_legal_document(self.RAW))
+
+
+@override_settings(OPENROUTER_API_KEY='test-key')
+class GenerateStreamViewTests(TestCase):
+    """Tests for POST /api/ai/generate/stream/."""
+
+    def stream(self, reply, **payload):
+        with fake_models(reply):
+            response = self.client.post(
+                '/api/ai/generate/stream/', payload,
+                content_type='application/json', HTTP_ACCEPT='text/event-stream'
+            )
+            body = b''.join(response.streaming_content).decode()
+        events = []
+        for block in body.strip().split('\n\n'):
+            event_line, data_line = block.split('\n')
+            events.append((event_line[len('event: '):], json.loads(data_line[len('data: '):])))
+        return response, events
+
+    def test_streams_tokens_and_final_draft(self):
+        response, events = self.stream('DRAFT_COMPLETE: LEASE AGREEMENT between the parties.',
+                                       prompt='Draft my lease')
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        names = [name for name, _ in events]
+        self.assertEqual(names[0], 'draft_start')
+        self.assertIn('token', names)
+        self.assertEqual(names[-1], 'done')
+        done = events[-1][1]
+        self.assertTrue(done['draft_complete'])
+        self.assertEqual(done['draft'], 'LEASE AGREEMENT between the parties.')
+        streamed = ''.join(data['text'] for name, data in events if name == 'token')
+        self.assertEqual(streamed, done['draft'])
+
+    def test_streamed_draft_is_cleaned_line_by_line(self):
+        _, events = self.stream('DRAFT_COMPLETE: LEASE  AGREEMENT\n\n\n\n1. Term :  one year .',
+                                prompt='Draft my lease')
+
+        done = events[-1][1]
+        self.assertEqual(done['draft'], 'LEASE AGREEMENT\n\n1. Term: one year.')
+        streamed = ''.join(data['text'] for name, data in events if name == 'token')
+        self.assertEqual(streamed, done['draft'])
+
+    def test_interview_turn_is_not_a_draft(self):
+        _, events = self.stream('Which province is the property in?', prompt='I need a lease')
+
+        name, done = events[-1]
+        self.assertEqual(name, 'done')
+        self.assertEqual(done['result'], 'Which province is the property in?')
+        self.assertFalse(done['draft_complete'])
+        self.assertIsNone(done['draft'])
+        self.assertIn('prompt_tokens', done['metadata'])
+        self.assertEqual(done['metadata']['path'], 'direct')
+
+    def test_missing_prompt_is_rejected(self):
+        response = self.client.post('/api/ai/generate/stream/', {}, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(
+    OPENROUTER_API_KEY='test-key',
+    CHANNEL_LAYERS={'default': {'BACKEND': 'channels.layers.InMemoryChannelLayer'}},
+    RENDITION_PRERENDER=False,
+)
+class DraftingConsumerTests(TransactionTestCase):
+    """Tests for the per-session WebSocket drafting consumer."""
+
+    def setUp(self):
+        user = get_user_model().objects.create_user(
+            username='drafter', email='drafter@example.com', password='testpass123'
+        )
+        self.session = Session.objects.create(user=user, title='Lease')
+        self.application = URLRouter(websocket_urlpatterns)
+
+    def connect(self):
+        return WebsocketCommunicator(self.application, f'/ws/sessions/{self.session.id}/')
+
+    async def receive_until(self, communicator, message_type):
+        received = []
+        while True:
+            message = await communicator.receive_json_from(timeout=5)
+            received.append(message)
+            if message['type'] == message_type:
+                return received
+
+    async def test_draft_is_streamed_persisted_and_broadcast(self):
+        sender, other_tab = self.connect(), self.connect()
+        self.assertTrue((await sender.connect())[0])
+        self.assertTrue((await other_tab.connect())[0])
+
+        with fake_models('DRAFT_COMPLETE: LEASE AGREEMENT'):
+            await sender.send_json_to({'type': 'user_turn', 'prompt': 'Draft it now'})
+            sent = await self.receive_until(sender, 'draft_update')
+            seen = await self.receive_until(other_tab, 'draft_update')
+
+        self.assertIn('token', [message['type'] for message in sent])
+        self.assertNotIn('token', [message['type'] for message in seen])
+        self.assertEqual(seen[-1]['content'], 'LEASE AGREEMENT')
+        messages = next(message for message in seen if message['type'] == 'messages')['messages']
+        self.assertEqual([message['role'] for message in messages], ['user', 'assistant'])
+
+        await sender.disconnect()
+        await other_tab.disconnect()
+
+        self.assertEqual(await Message.objects.filter(session=self.session).acount(), 2)
+        document = await Document.objects.aget(session=self.session)
+        self.assertEqual(document.content, 'LEASE AGREEMENT')
+        await self.session.arefresh_from_db()
+        self.assertEqual(self.session.status, 'reviewing')
+
+    async def test_refine_without_a_draft_is_an_error(self):
+        await Session.objects.filter(pk=self.session.pk).aupdate(status='reviewing')
+        communicator = self.connect()
+        await communicator.connect()
+
+        with fake_models():  # No scripted reply: a model call fails
+            await communicator.send_json_to({'type': 'user_turn', 'prompt': 'Add a pet clause'})
+            received = await self.receive_until(communicator, 'error')
+        await communicator.disconnect()
+
+        self.assertEqual(received[-1]['error'], 'No draft to refine.')
+        self.assertEqual(await Message.objects.filter(session=self.session).acount(), 0)
+
+    async def test_unknown_session_is_rejected(self):
+        communicator = WebsocketCommunicator(
+            self.application, '/ws/sessions/00000000-0000-0000-0000-000000000000/'
+        )
+        connected, code = await communicator.connect()
+
+        self.assertFalse(connected)
+        self.assertEqual(code, 4404)
+
+    async def test_other_users_session_is_rejected(self):
+        other = await get_user_model().objects.acreate(username='other', email='other@example.com')
+        session = await Session.objects.acreate(user=other, title='Theirs')
+        communicator = WebsocketCommunicator(self.application, f'/ws/sessions/{session.id}/')
+
+        connected, code = await communicator.connect()
+
+        self.assertFalse(connected)
+        self.assertEqual(code, 4404)
+
+
+@override_settings(OPENROUTER_API_KEY='test-key', AI_ROUTING_ENABLED=False, RENDITION_PRERENDER=False)
+class SessionGenerateViewTests(TestCase):
+    """Tests for POST /api/ai/sessions/{id}/generate/ and the history cache."""
+
+    def setUp(self):
+        history_cache.clear()
+        user = get_user_model().objects.create_user(
+            username='drafter', email='drafter@example.com', password='testpass123'
+        )
+        self.session = Session.objects.create(user=user, title='Lease')
+        self.url = f'/api/ai/sessions/{self.session.id}/generate/'
+
+    def post_turn(self, prompt, output):
+        executor = MagicMock()
+        executor.invoke.return_value = {'output': output}
+        with patch('ai_agent.services.get_agent_executor', return_value=executor), \
+                self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, {'prompt': prompt}, content_type='application/json')
+        return response, executor.invoke.call_args[0][0]
+
+    def test_history_is_loaded_from_the_database(self):
+        self.post_turn('I need a lease', 'Which province?')
+        response, agent_input = self.post_turn('Ontario', 'DRAFT_COMPLETE: LEASE AGREEMENT')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [message.content for message in agent_input['history']],
+            ['I need a lease', 'Which province?'],
+        )
+        self.assertEqual(agent_input['input'], 'Ontario')
+        self.assertEqual(response.data['document']['content'], 'LEASE AGREEMENT')
+        self.assertEqual(Message.objects.filter(session=self.session).count(), 4)
+
+    def test_cached_history_tracks_writes(self):
+        self.post_turn('I need a lease', 'Which province?')
+        load_session_history(self.session.id)
+        self.assertEqual(history_cache.stats()['hits'], 1)
+
+        Message.objects.create(session=self.session, role='user', content='Edited elsewhere')
+        history = load_session_history(self.session.id)
+
+        self.assertEqual(history[-1].content, 'Edited elsewhere')
+        self.assertEqual(history_cache.stats()['misses'], 2)
+
+    def test_unknown_session_returns_404(self):
+        response = self.client.post(
+            '/api/ai/sessions/00000000-0000-0000-0000-000000000000/generate/',
+            {'prompt': 'Hello'}, content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_other_users_session_returns_404(self):
+        other = get_user_model().objects.create_user(username='other', email='other@example.com', password='x')
+        self.client.force_login(other)
+
+        response = self.client.post(self.url, {'prompt': 'Hello'}, content_type='application/json')
+        details = self.client.get(f'/api/ai/sessions/{self.session.id}/details/')
+
+        self.assertEqual((response.status_code, details.status_code), (404, 404))
+        self.assertFalse(Message.objects.filter(session=self.session).exists())
+
+
+@override_settings(OPENROUTER_API_KEY='test-key', AI_ROUTING_ENABLED=False, RENDITION_PRERENDER=False)
+class DocumentDetailsTests(TestCase):
+    """Tests for incremental details extraction and GET /api/ai/sessions/{id}/details/."""
+
+    DRAFT = ('LEASE AGREEMENT\n\nThis agreement is made between **John Smith** and Jane Doe.\n'
+             'It is effective on March 1, 2025 and shall remain in effect for one (1) year.\n'
+             'This Agreement is governed by the laws of the Province of Ontario.')
+
+    def setUp(self):
+        history_cache.clear()
+        user = get_user_model().objects.create_user(
+            username='drafter', email='drafter@example.com', password='testpass123'
+        )
+        self.session = Session.objects.create(user=user, title='Lease')
+        self.url = f'/api/ai/sessions/{self.session.id}/details/'
+
+    def test_extractor_tracks_confidence_and_provenance(self):
+        extractor = DetailsExtractor()
+        extractor.feed('The property is in Alberta.', {'index': 0})
+        extractor.feed(self.DRAFT, {'index': 1})
+        extractor.feed('Effective on March 1, 2025.', {'index': 2})
+
+        self.assertEqual(extractor.details(), {
+            'party_a': 'John Smith',
+            'party_b': 'Jane Doe',
+            'effective_date': 'March 1, 2025',
+            'term': 'one (1) year',
+            'jurisdiction': 'Ontario',
+        })
+        self.assertEqual(extractor.provenance['jurisdiction'], {'index': 1})
+        self.assertEqual(extractor.provenance['effective_date'], {'index': 2})
+        self.assertGreater(extractor.confidence['effective_date'], extractor.confidence['term'])
+
+    def test_extract_details_without_history_returns_empty_details(self):
+        response = self.client.post('/api/ai/extract-details/', {'conversation_history': None},
+                                    content_type='application/json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.data['details'].values()), {'Not Found'})
+
+    def test_details_are_recorded_with_each_turn(self):
+        executor = MagicMock()
+        executor.invoke.return_value = {'output': f'DRAFT_COMPLETE: {self.DRAFT}'}
+        with patch('ai_agent.services.get_agent_executor', return_value=executor):
+            self.client.post(f'/api/ai/sessions/{self.session.id}/generate/',
+                             {'prompt': 'Draft a lease in Ontario'}, content_type='application/json')
+
+        # The request user, the session check and the details
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['details']['party_b'], 'Jane Doe')
+        self.assertEqual(response.data['document'], self.session.document.id)
+        self.assertEqual(response.data['provenance']['party_a']['role'], 'document')
+        self.assertEqual(response.data['scanned_messages'], 2)
+
+    def test_messages_written_elsewhere_are_caught_up(self):
+        Message.objects.create(session=self.session, role='user', content='I live in Nova Scotia.')
+        self.assertEqual(self.client.get(self.url).data['details']['jurisdiction'], 'Nova Scotia')
+
+        message = Message.objects.create(session=self.session, role='user',
+                                         content='It should be governed by the laws of Quebec.')
+        data = self.client.get(self.url).data
+
+        self.assertEqual(data['details']['jurisdiction'], 'Quebec')
+        self.assertEqual(data['provenance']['jurisdiction'],
+                         {'message_id': str(message.id), 'index': 1, 'role': 'user'})
+        self.assertEqual(data['scanned_messages'], 2)
+
+
+class ContextWindowManagerTests(TestCase):
+    """Tests for history compaction against a token budget."""
+
+    def setUp(self):
+        self.calls = []
+
+        def summarize(previous, messages):
+            self.calls.append((previous, [message.content for message in messages]))
+            return f"{previous}+{len(messages)}"
+
+        self.summarize = summarize
+        self.turns = []
+        for i in range(10):
+            self.turns.append(HumanMessage(content=f"question {i} " + "detail " * 50))
+            self.turns.append(AIMessage(content=f"answer {i} " + "detail " * 50))
+
+    def test_short_history_is_untouched(self):
+        manager = ContextWindowManager(self.summarize, token_budget=100000, keep_turns=2)
+        history, stats = manager.fit(self.turns, 'next', session_key='s')
+
+        self.assertEqual(history, self.turns)
+        self.assertEqual(stats['prompt_tokens'], stats['prompt_tokens_before'])
+        self.assertEqual(self.calls, [])
+
+    def test_older_turns_are_summarized_and_recent_turns_kept(self):
+        manager = ContextWindowManager(self.summarize, token_budget=800, keep_turns=2)
+        history, stats = manager.fit(self.turns, 'next', session_key='s')
+
+        self.assertEqual(history[0].type, 'system')
+        self.assertEqual(history[1:], self.turns[-4:])
+        self.assertEqual(stats['summarized_messages'], 16)
+        self.assertLess(stats['prompt_tokens'], stats['prompt_tokens_before'])
+        self.assertLessEqual(count_message_tokens(history), 800)
+
+    def test_summary_is_extended_incrementally(self):
+        manager = ContextWindowManager(self.summarize, token_budget=800, keep_turns=2)
+        manager.fit(self.turns[:-2], 'next', session_key='s')
+        manager.fit(self.turns[:-2], 'next', session_key='s')
+        manager.fit(self.turns, 'next', session_key='s')
+
+        self.assertEqual(len(self.calls), 2)
+        self.assertEqual(len(self.calls[0][1]), 14)
+        self.assertEqual(self.calls[1], ('+14', [m.content for m in self.turns[14:16]]))
+
+
+SAMPLE_DRAFT = """PROPERTY TRANSFER AGREEMENT
+
+THIS AGREEMENT is made between John Smith and Emily Smith.
+
+### 1. PROPERTY DESCRIPTION
+
+The property is located at 789 Pine Road, Toronto, Ontario.
+
+### 2. TRANSFER TERMS
+
+The Transferor agrees to transfer the property on October 15, 2033.
+
+### 3. GOVERNING LAW
+
+This Agreement is governed by the laws of the Province of Ontario.
+
+### 4. SIGNATURES
+
+Signed by the parties.
+"""
+
+
+@override_settings(OPENROUTER_API_KEY='test-key')
+class SectionRefinementTests(TestCase):
+    """Tests for section-targeted refinement via POST /api/ai/refine/."""
+
+    def refine(self, user_request, output):
+        llm = MagicMock()
+        llm.invoke.return_value = AIMessage(content=output)
+        with patch('ai_agent.services.get_chat_model', return_value=llm):
+            response = self.client.post('/api/ai/refine/', {
+                'current_draft': SAMPLE_DRAFT, 'user_request': user_request,
+            }, content_type='application/json')
+        return response, llm.invoke.call_args[0][0][0].content
+
+    def test_split_is_lossless(self):
+        sections = split_sections(SAMPLE_DRAFT)
+
+        self.assertEqual(len(sections), 5)
+        self.assertEqual(sections[2]['heading'], '### 2. TRANSFER TERMS')
+        self.assertEqual(join_sections(sections), SAMPLE_DRAFT)
+
+    def test_lexical_ranking_picks_the_affected_section(self):
+        sections = split_sections(SAMPLE_DRAFT)
+
+        self.assertEqual(select_sections(sections, 'Move the transfer date to 2035'), [2])
+        self.assertEqual(select_sections(sections, 'Reword section 3'), [3])
+
+    def test_only_selected_sections_are_sent_and_spliced(self):
+        response, prompt = self.refine(
+            'Change the transfer date to October 15, 2035',
+            '<<<SECTION 2>>>\n### 2. TRANSFER TERMS\n\n'
+            'The Transferor agrees to transfer the property on October 15, 2035.\n<<<END SECTION 2>>>',
+        )
+
+        self.assertEqual(response.data['mode'], 'sections')
+        self.assertEqual(response.data['changed_sections'], [{'index': 2, 'heading': '### 2. TRANSFER TERMS'}])
+        self.assertIn('October 15, 2035', response.data['result'])
+        self.assertIn('789 Pine Road', response.data['result'])
+        self.assertNotIn('789 Pine Road', prompt.split('Sections To Revise')[1])
+
+    def test_section_reply_is_cleaned_before_splicing(self):
+        response, _ = self.refine(
+            'Change the transfer date to October 15, 2035',
+            '<<<SECTION 2>>>\n```markdown\nSure! Here is the revised section:\n\nDRAFT_COMPLETE: ### 2. TRANSFER TERMS\n\n'
+            'The Transferor agrees to transfer the property on October 15, 2035 .\n```\n<<<END SECTION 2>>>',
+        )
+
+        result = response.data['result']
+        self.assertEqual(response.data['changed_sections'], [{'index': 2, 'heading': '### 2. TRANSFER TERMS'}])
+        self.assertIn('### 2. TRANSFER TERMS\n\nThe Transferor agrees to transfer the property on October 15, 2035.',
+                      result)
+        for chatter in ('Sure!', '```', 'DRAFT_COMPLETE'):
+            self.assertNotIn(chatter, result)
+
+    def test_model_section_choice_ignores_all_inside_words(self):
+        sections = split_sections(SAMPLE_DRAFT)
+
+        for reply, selected in (('ALL', []), (' all. ', []), ('2, 3 (the SMALL claims clause)', [2, 3]),
+                                ('3 - the parties shall sign', [3])):
+            llm = MagicMock()
+            llm.invoke.return_value = AIMessage(content=reply)
+            with patch('ai_agent.services.get_chat_model', return_value=llm):
+                self.assertEqual(select_sections_with_llm(sections, 'Tidy it up'), selected, reply)
+
+    def test_global_edit_uses_full_document(self):
+        response, prompt = self.refine('Make the tone of the whole document friendlier', 'REWRITTEN')
+
+        self.assertEqual(response.data['result'], 'REWRITTEN')
+        self.assertEqual(response.data['mode'], 'full')
+        self.assertIsNone(response.data['changed_sections'])
+        self.assertEqual(response.data['metadata']['path'], 'direct')
+        self.assertIn('789 Pine Road', prompt)
+
+
+class RouteTurnTests(TestCase):
+    """Tests for choosing between the direct chat model and the research agent."""
+
+    def test_interview_turns_go_direct(self):
+        self.assertEqual(route_turn('The tenant is Jane Doe, starting May 1', []), 'direct')
+
+    def test_research_turns_use_the_agent(self):
+        self.assertEqual(route_turn('What does the Residential Tenancies Act require?', []), 'agent')
+        self.assertEqual(route_turn('Please check the case law on this', []), 'agent')
+
+    def test_announced_research_uses_the_agent(self):
+        history = [AIMessage(content='I will now search for relevant legal information...')]
+
+        self.assertEqual(route_turn('Go ahead', history), 'agent')
+
+    @override_settings(OPENROUTER_API_KEY='test-key')
+    def test_announced_research_runs_on_the_same_turn(self):
+        with fake_models('I will now search for relevant legal information.',
+                         'The Residential Tenancies Act caps the deposit at one month of rent.') as llm:
+            generated = generate_legal_document('The tenant is Jane Doe', [])
+
+        self.assertEqual(generated['result'], 'The Residential Tenancies Act caps the deposit at one month of rent.')
+        self.assertEqual(generated['metadata']['path'], 'agent')
+        self.assertIsNone(next(llm.messages, None))
+
+    @override_settings(AI_ROUTING_ENABLED=False)
+    def test_routing_can_be_disabled(self):
+        self.assertEqual(route_turn('Jane Doe', []), 'agent')
+
+
+@override_settings(OPENROUTER_API_KEY='test-key')
+class TemplateDraftingTests(TestCase):
+    """Tests for drafting common documents from the clause templates."""
+
+    HISTORY = [
+        {'role': 'user', 'content': 'I need a residential lease agreement.'},
+        {'role': 'assistant', 'content': 'Certainly. Who are the parties, and where is the property?'},
+        {'role': 'user', 'content': 'The lease is between John Smith and Jane Doe, effective on May 1, 2025, '
+                                    'for a term of one year, in Ontario.'},
+    ]
+
+    def generate(self, prompt, history, *replies):
+        with fake_models(*replies):
+            return self.client.post(
+                '/api/ai/generate/', {'prompt': prompt, 'conversation_history': history},
+                content_type='application/json'
+            )
+
+    def test_complete_details_are_drafted_without_the_model(self):
+        response = self.generate('Please draft it now.', self.HISTORY)  # No scripted reply: a model call fails
+
+        self.assertEqual(response.status_code, 200)
+        result, metadata = response.data['result'], response.data['metadata']
+        self.assertTrue(result.startswith('DRAFT_COMPLETE: RESIDENTIAL LEASE AGREEMENT'))
+        self.assertIn('continues for a term of one year', result)
+        self.assertIn('the Residential Tenancies Act, 2006, S.O. 2006, c. 17', result)
+        self.assertIn('John Smith, Landlord', result)
+        self.assertEqual(
+            (metadata['path'], metadata['document_type'], metadata['jurisdiction'], metadata['additional_clauses']),
+            ('template', 'lease', 'Ontario', 0),
+        )
+
+    def test_only_additional_clauses_go_to_the_model(self):
+        response = self.generate('Draft it, and include a clause allowing one small cat.', self.HISTORY,
+                                 '(a) The Tenant may keep one small cat in the Premises.')
+
+        self.assertIn('\n\n9. ADDITIONAL TERMS\n(a) The Tenant may keep one small cat in the Premises.\n\n',
+                      response.data['result'])
+        self.assertEqual(response.data['metadata']['additional_clauses'], 1)
+
+    def test_incomplete_details_go_to_the_model(self):
+        history = self.HISTORY[:2] + [{'role': 'user', 'content': 'Between John Smith and Jane Doe, in Ontario.'}]
+
+        response = self.generate('Please draft it now.', history, 'When does the lease start, and for how long?')
+
+        self.assertEqual(response.data['result'], 'When does the lease start, and for how long?')
+        self.assertEqual(response.data['metadata']['path'], 'direct')
+
+    def test_streamed_template_draft(self):
+        with fake_models():
+            response = self.client.post(
+                '/api/ai/generate/stream/', {'prompt': 'Go ahead and draft it.', 'conversation_history': self.HISTORY},
+                content_type='application/json', HTTP_ACCEPT='text/event-stream'
+            )
+            body = b''.join(response.streaming_content).decode()
+
+        names = [block.split('\n')[0][len('event: '):] for block in body.strip().split('\n\n')]
+        self.assertEqual(names, ['draft_start', 'token', 'done'])
+        self.assertIn('"path": "template"', body)
+
+    def test_slots_are_typed_and_statutes_follow_the_province(self):
+        details = {'party_a': 'John Smith', 'party_b': 'Jane Doe', 'effective_date': 'May 1, 2025', 'term': 'one year'}
+
+        self.assertIsNone(fill_template(get_template('lease', 'Ontario'), {**details, 'term': 'until sold'}))
+        manitoba = fill_template(get_template('lease', 'Manitoba'), details)
+        self.assertIn('the residential tenancy legislation of the Province of Manitoba', manitoba)
+        self.assertIn('the laws of the Northwest Territories', fill_template(
+            get_template('employment', 'northwest territories'), details))
+        self.assertIsNone(get_template('lease', 'Texas'))
+
+
+class SearchCacheTests(TestCase):
+    """Tests for the two-tier Legal_Web_Search result cache."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = f'{self.directory.name}/search_cache.sqlite3'
+
+    def tearDown(self):
+        configure_search_cache()
+        self.directory.cleanup()
+
+    def test_near_identical_queries_share_a_key(self):
+        self.assertEqual(
+            normalize_query('Residential Tenancy Act Ontario lease', 'site:canlii.org'),
+            normalize_query('  the residential tenancy act in ONTARIO, lease ', 'site:canlii.org'),
+        )
+        self.assertNotEqual(
+            normalize_query('tenant rights against landlord'),
+            normalize_query('landlord rights against tenant'),
+        )
+        self.assertNotEqual(
+            normalize_query('ontario lease', 'site:canlii.org'),
+            normalize_query('ontario lease', 'site:justice.gc.ca'),
+        )
+
+    def test_durable_tier_survives_a_new_process(self):
+        SearchCache(self.path).set('key', 'results')
+        cache = SearchCache(self.path)
+
+        self.assertEqual(cache.get('key'), 'results')
+        self.assertEqual(cache.get('key'), 'results')
+        self.assertEqual(cache.stats()['disk_hits'], 1)
+        self.assertEqual(cache.stats()['memory_hits'], 1)
+
+    def test_expired_entries_are_misses(self):
+        cache = SearchCache(self.path)
+        cache.set('key', 'results', ttl=-1)
+
+        self.assertIsNone(cache.get('key'))
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_memory_tier_is_size_bounded(self):
+        cache = SearchCache(max_memory_entries=2)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key)
+
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('c'), 'c')
+
+    def test_tool_searches_once_for_repeated_queries(self):
+        configure_search_cache(self.path)
+        backend = StubSearchBackend()
+        configure_search(backend=backend)
+        tool = LegalWebSearchTool()
+
+        try:
+            first = tool.run('Ontario residential tenancies act lease')
+            started = time.perf_counter()
+            second = tool.run('  the ONTARIO residential tenancies act for a lease?')
+            elapsed = time.perf_counter() - started
+        finally:
+            configure_search()
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(backend.queries), len(SCOPES))
+        self.assertLess(elapsed, 0.05)
+
+
+class StubSearchBackend(SearchBackend):
+    """Returns one result per query after ``delay`` seconds (forever if ``hang`` matches)."""
+
+    def __init__(self, delay=0.0, hang=None):
+        self.delay = delay
+        self.hang = hang
+        self.queries = []
+
+    def search(self, query, max_results=5):
+        self.queries.append(query)
+        time.sleep(60 if self.hang and self.hang in query else self.delay)
+        return [{'title': f'Result for {query}', 'link': f'https://example.org/{len(query)}/', 'snippet': query}]
+
+    async def asearch(self, query, max_results=5):
+        self.queries.append(query)
+        await asyncio.sleep(60 if self.hang and self.hang in query else self.delay)
+        return [{'title': f'Result for {query}', 'link': f'https://example.org/{len(query)}/', 'snippet': query}]
+
+
+class LegalSearchTests(TestCase):
+    """Tests for the parallel, timeout-bound Legal_Web_Search fan-out."""
+
+    def setUp(self):
+        configure_search_cache()
+
+    def tearDown(self):
+        configure_search()
+        configure_search_cache()
+
+    def test_scopes_are_searched_concurrently(self):
+        configure_search(backend=StubSearchBackend(delay=0.2))
+
+        started = time.perf_counter()
+        results = search_legal_sources('Ontario lease')
+        elapsed = time.perf_counter() - started
+
+        self.assertIn('site:canlii.org', results)
+        self.assertIn('site:justice.gc.ca', results)
+        self.assertLess(elapsed, 0.2 * len(SCOPES))
+
+    def test_slow_scope_times_out_without_failing_the_search(self):
+        configure_search(backend=StubSearchBackend(hang='justice.gc.ca'), timeout=0.1)
+
+        started = time.perf_counter()
+        results = asyncio.run(asearch_legal_sources('Ontario lease'))
+
+        self.assertLess(time.perf_counter() - started, 1)
+        self.assertIn('site:canlii.org', results)
+        self.assertNotIn('site:justice.gc.ca', results)
+
+    def test_threaded_search_waits_one_timeout_for_all_scopes(self):
+        configure_search(backend=StubSearchBackend(delay=0.5), timeout=0.2)
+
+        started = time.perf_counter()
+        results = search_legal_sources('Ontario lease')
+        elapsed = time.perf_counter() - started
+
+        self.assertIn('timed out after 0.2s', results)
+        self.assertLess(elapsed, 0.2 * len(SCOPES))
+
+    def test_failed_search_is_not_cached(self):
+        configure_search(backend=StubSearchBackend(hang='site:'), timeout=0.05)
+        self.assertIn('error occurred', asyncio.run(asearch_legal_sources('Ontario lease')))
+
+        configure_search(backend=StubSearchBackend())
+        self.assertIn('Result for', asyncio.run(asearch_legal_sources('Ontario lease')))
+
+    def test_async_search_reads_the_corpus_and_cache_off_the_event_loop(self):
+        configure_search(backend=StubSearchBackend())
+        loop_thread = threading.get_ident()
+        threads = []
+
+        def record(name, result):
+            def call(*args):
+                threads.append((name, threading.get_ident() != loop_thread))
+                return result
+            return call
+
+        cache = MagicMock(get=record('get', None), set=record('set', None))
+        with patch('modules.search.search_local_corpus', record('corpus', ([], False))), \
+                patch('modules.search.get_search_cache', return_value=cache):
+            asyncio.run(asearch_legal_sources('Ontario lease'))
+
+        self.assertEqual(threads, [('corpus', True), ('get', True), ('set', True)])
+
+    def test_asearch_many_runs_queries_together(self):
+        configure_search(backend=StubSearchBackend(delay=0.2))
+
+        started = time.perf_counter()
+        results = asyncio.run(asearch_many(['Ontario lease', 'Quebec will', 'BC power of attorney']))
+
+        self.assertEqual(len(results), 3)
+        self.assertLess(time.perf_counter() - started, 0.5)
+
+    def test_merge_drops_duplicate_links(self):
+        merged = merge_results([
+            [{'title': 'RTA', 'link': 'https://www.ontario.ca/laws/statute/06r17', 'snippet': 'a'}],
+            [{'title': 'RTA', 'link': 'https://www.ontario.ca/laws/statute/06r17/', 'snippet': 'b'},
+             {'title': 'Other', 'link': 'https://canlii.org/x', 'snippet': 'c'}],
+        ])
+        self.assertEqual([r['title'] for r in merged], ['RTA', 'Other'])
+
+    def test_agent_runs_tool_calls_of_one_step_in_parallel(self):
+        calls = [
+            {'name': 'Legal_Web_Search', 'args': {'query': query}, 'id': f'call_{n}'}
+            for n, query in enumerate(['Ontario lease', 'Quebec will', 'BC power of attorney'])
+        ]
+        llm = FakeToolCallModel(messages=iter([
+            AIMessage(content='', tool_calls=calls),
+            AIMessage(content='Research complete.'),
+        ]))
+        backend = StubSearchBackend(delay=0.2)
+        configure_search(backend=backend)
+        executor = get_agent_executor('key', llm=llm)
+
+        started = time.perf_counter()
+        result = executor.invoke({'input': 'research', 'history': []})
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(result['output'], 'Research complete.')
+        self.assertEqual(len(backend.queries), len(calls) * len(SCOPES))
+        self.assertLess(elapsed, 0.2 * len(calls))
+
+
+class CorpusIndexTests(TestCase):
+    """Tests for the offline BM25 corpus index and the tiered Legal_Web_Search."""
+
+    STATUTE = (
+        "RESIDENTIAL TENANCIES ACT:\n"
+        "1. TERMINATION BY LANDLORD\n"
+        "A landlord may give notice of termination of a tenancy for non-payment of rent.\n"
+        "2. RENT DEPOSIT\n"
+        "A landlord may require a rent deposit not exceeding one month's rent.\n"
+    )
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.corpus = f'{self.directory.name}/corpus'
+        os.makedirs(self.corpus)
+        self.write('ontario/rta.txt', self.STATUTE)
+        self.write('wills.md', "SUCCESSION LAW REFORM ACT:\nA will must be signed by the testator and two witnesses.\n")
+        self.index = CorpusIndex(f'{self.directory.name}/index')
+        configure_search_cache()
+
+    def tearDown(self):
+        configure_search()
+        configure_search_cache()
+        self.directory.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.corpus, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as handle:
+            handle.write(text)
+        # Make sure re-writes are seen as changes even within one mtime tick
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + len(text)))
+
+    def test_bm25_ranks_the_matching_section_first(self):
+        self.index.ingest(self.corpus)
+
+        hits = self.index.search('rent deposit landlord')
+
+        self.assertEqual(hits[0]['path'], os.path.join('ontario', 'rta.txt'))
+        self.assertEqual(hits[0]['heading'], '2. RENT DEPOSIT')
+        self.assertEqual(hits[0]['confidence'], 1.0)
+        self.assertEqual(self.index.search('witnesses')[0]['path'], 'wills.md')
+
+    def test_reindex_only_touches_changed_files(self):
+        self.index.ingest(self.corpus)
+        self.write('wills.md', "SUCCESSION LAW REFORM ACT:\nA holograph will needs no witnesses.\n")
+        os.remove(os.path.join(self.corpus, 'ontario', 'rta.txt'))
+
+        stats = self.index.ingest(self.corpus)
+
+        self.assertEqual((stats['updated'], stats['removed'], stats['added']), (1, 1, 0))
+        self.assertEqual(self.index.search('holograph')[0]['path'], 'wills.md')
+        self.assertEqual(self.index.search('testator'), [])
+        self.assertEqual(self.index.search('landlord'), [])
+        self.assertEqual(self.index.ingest(self.corpus)['unchanged'], 1)
+
+    def test_compaction_keeps_live_sections_only(self):
+        self.index.ingest(self.corpus)
+        self.write('wills.md', "SUCCESSION LAW REFORM ACT:\nA holograph will needs no witnesses.\n")
+        self.index.ingest(self.corpus)
+
+        self.index.compact()
+
+        self.assertEqual(self.index.stats()['segments'], 1)
+        self.assertEqual(self.index.stats()['sections'], 4)
+        self.assertEqual(self.index.search('holograph')[0]['path'], 'wills.md')
+
+    def test_confident_local_hits_skip_the_web(self):
+        self.index.ingest(self.corpus)
+        backend = StubSearchBackend()
+        configure_search(backend=backend, corpus=self.index)
+
+        results = search_legal_sources('landlord termination notice for non-payment of rent')
+
+        self.assertIn('corpus:ontario', results)
+        self.assertEqual(backend.queries, [])
+
+    def test_low_confidence_falls_back_to_the_web(self):
+        self.index.ingest(self.corpus)
+        backend = StubSearchBackend()
+        configure_search(backend=backend, corpus=self.index)
+
+        results = search_legal_sources('landlord obligations under the Ontario Human Rights Code')
+
+        self.assertIn('corpus:ontario', results)
+        self.assertIn('Result for', results)
+        self.assertEqual(len(backend.queries), len(SCOPES))
+
+    def test_index_corpus_command(self):
+        out = StringIO()
+        call_command('index_corpus', self.corpus, index=f'{self.directory.name}/cmd-index', stdout=out)
+
+        self.assertIn('Indexed 2 new', out.getvalue())
+        self.assertIn('from 2 files', out.getvalue())
+
+    def test_missing_folder_does_not_wipe_the_index(self):
+        self.index.ingest(self.corpus)
+
+        with self.assertRaises(NotADirectoryError):
+            self.index.ingest(f'{self.corpus}-typo')
+        with self.assertRaises(CommandError):
+            call_command('index_corpus', f'{self.corpus}-typo', index=f'{self.directory.name}/index', stdout=StringIO())
+
+        self.assertEqual(self.index.stats()['files'], 2)
@@ -1,14 +1,20 @@
 from django.urls import path
 from .views import (
     GenerateLegalDocumentView,
+    GenerateLegalDocumentStreamView,
+    SessionGenerateView,
     RefineLegalDocumentView,
     ExtractDocumentDetailsView,
+    SessionDetailsView,
     HealthCheckView
 )
 
 urlpatterns = [
     path('generate/', GenerateLegalDocumentView.as_view(), name='generate_legal_document'),
+    path('generate/stream/', GenerateLegalDocumentStreamView.as_view(), name='generate_legal_document_stream'),
+    path('sessions/<uuid:session_id>/generate/', SessionGenerateView.as_view(), name='session_generate'),
     path('refine/', RefineLegalDocumentView.as_view(), name='refine_legal_document'),
     path('extract-details/', ExtractDocumentDetailsView.as_view(), name='extract_document_details'),
+    path('sessions/<uuid:session_id>/details/', SessionDetailsView.as_view(), name='session_details'),
     path('health/', HealthCheckView.as_view(), name='ai_health_check'),
 ]
@@ -2,11 +2,23 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from django.http import StreamingHttpResponse
+from authentication.utils import get_request_user
+from chat.serializers import MessageSerializer
+from chat_sessions.models import Session
+from documents.serializers import DocumentDetailsSerializer, DocumentSerializer
+from .details import get_session_details
 from .services import (
     generate_legal_document, 
+    generate_session_turn,
+    stream_legal_document,
     refine_legal_document, 
-    extract_document_details_from_history
+    extract_document_details_from_history,
+    get_agent_pool_stats,
+    get_search_cache_stats
 )
+from .streaming import EventStreamRenderer, format_sse
 
 class GenerateLegalDocumentView(APIView):
     """
@@ -24,8 +36,12 @@ class GenerateLegalDocumentView(APIView):
     
     Response:
     {
-        "result": "AI response or DRAFT_COMPLETE: [document content]"
+        "result": "AI response or DRAFT_COMPLETE: [document content]",
+        "metadata": {"prompt_tokens": 1830, "prompt_tokens_before": 1830, "summarized_messages": 0, "token_budget": 48000}
     }
+    
+    Drafts filled from the clause templates (all details known) carry
+    "metadata": {"path": "template", "document_type": "lease", "jurisdiction": "Ontario", "additional_clauses": 0, ...}
     """
     permission_classes = [AllowAny]  # Allow access without authentication
 
@@ -37,12 +53,95 @@ class GenerateLegalDocumentView(APIView):
             return Response({'error': 'Prompt is required.'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            result = generate_legal_document(prompt, conversation_history)
-            return Response({'result': result})
+            generated = generate_legal_document(prompt, conversation_history)
+            return Response({'result': generated['result'], 'metadata': generated['metadata']})
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class SessionGenerateView(APIView):
+    """
+    Generate the next turn of a stored session using server-side history.
+    
+    POST /api/ai/sessions/{session_id}/generate/
+    Request Body:
+    {
+        "prompt": "The property is in Toronto, Ontario"
+    }
+    
+    Response:
+    {
+        "result": "AI response or DRAFT_COMPLETE: [document content]",
+        "metadata": {"prompt_tokens": ..., ...},
+        "messages": [{...user message...}, {...assistant message...}],
+        "document": {...} or null
+    }
+    """
+    permission_classes = [AllowAny]
+
+    def post(self, request, session_id):
+        prompt = request.data.get('prompt')
+        
+        if not prompt:
+            return Response({'error': 'Prompt is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        if not Session.objects.filter(pk=session_id, user=get_request_user(request)).exists():
+            return Response({'error': 'Session not found.'}, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            turn = generate_session_turn(session_id, prompt)
+            document = turn['document']
+            return Response({
+                'result': turn['result'],
+                'metadata': turn['metadata'],
+                'messages': MessageSerializer(
+                    [turn['user_message'], turn['assistant_message']], many=True
+                ).data,
+                'document': DocumentSerializer(document).data if document else None,
+            })
+        except Exception as e:
+            return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class GenerateLegalDocumentStreamView(APIView):
+    """
+    Generate legal document using AI agent, streaming the answer as Server-Sent Events.
+    
+    POST /api/ai/generate/stream/
+    Request Body: same as /api/ai/generate/
+    
+    Response (text/event-stream):
+        event: tool_start
+        data: {"tool": "Legal_Web_Search", "input": "...", "message": "Searching CanLII and justice.gc.ca…"}
+        
+        event: draft_start
+        data: {}
+        
+        event: token
+        data: {"text": "PROPERTY TRANSFER"}
+        
+        event: done
+        data: {"result": "DRAFT_COMPLETE: ...", "draft_complete": true, "draft": "...", "metadata": {...}}
+    """
+    permission_classes = [AllowAny]
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def post(self, request):
+        prompt = request.data.get('prompt')
+        conversation_history = request.data.get('conversation_history', None)
+        
+        if not prompt:
+            return Response({'error': 'Prompt is required.'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        events = stream_legal_document(prompt, conversation_history)
+        response = StreamingHttpResponse(
+            (format_sse(event, data) for event, data in events),
+            content_type='text/event-stream'
+        )
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+        return response
+
+
 class RefineLegalDocumentView(APIView):
     """
     Refine an existing legal document based on user feedback.
@@ -56,7 +155,9 @@ class RefineLegalDocumentView(APIView):
     
     Response:
     {
-        "result": "Updated document content"
+        "result": "Updated document content",
+        "mode": "sections",  # or "full" for global edits
+        "changed_sections": [{"index": 3, "heading": "### 2. TRANSFER TERMS"}]  # null in full mode
     }
     """
     permission_classes = [AllowAny]
@@ -71,8 +172,8 @@ class RefineLegalDocumentView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            result = refine_legal_document(current_draft, user_request)
-            return Response({'result': result})
+            refined = refine_legal_document(current_draft, user_request)
+            return Response(refined)
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
@@ -93,11 +194,14 @@ class ExtractDocumentDetailsView(APIView):
     Response:
     {
         "details": {
-            "Document Type": "Property Transfer Agreement",
-            "Party 1 Name": "John Smith",
-            "Party 2 Name": "Jane Doe",
-            ...
-        }
+            "party_a": "John Smith",
+            "party_b": "Jane Doe",
+            "effective_date": "October 15, 2023",
+            "term": "Not Found",
+            "jurisdiction": "Ontario"
+        },
+        "confidence": {"party_a": 0.8, ...},
+        "provenance": {"party_a": {"index": 3, "role": "assistant"}, ...}
     }
     """
     permission_classes = [AllowAny]
@@ -106,12 +210,36 @@ class ExtractDocumentDetailsView(APIView):
         conversation_history = request.data.get('conversation_history', [])
         
         try:
-            details = extract_document_details_from_history(conversation_history)
-            return Response({'details': details})
+            return Response(extract_document_details_from_history(conversation_history))
         except Exception as e:
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class SessionDetailsView(APIView):
+    """
+    Document details of a stored session, kept up to date as its turns are recorded.
+    
+    GET /api/ai/sessions/{session_id}/details/
+    
+    Response: the documents.DocumentDetails row
+    {
+        "id": 1,
+        "document": "uuid" or null,
+        "session": "uuid",
+        "details": {"party_a": "John Smith", ...},
+        "confidence": {"party_a": 0.8, ...},
+        "provenance": {"party_a": {"message_id": "uuid", "index": 3, "role": "user"}, ...},
+        ...
+    }
+    """
+    permission_classes = [AllowAny]
+
+    def get(self, request, session_id):
+        if not Session.objects.filter(pk=session_id, user=get_request_user(request)).exists():
+            return Response({'error': 'Session not found.'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(DocumentDetailsSerializer(get_session_details(session_id)).data)
+
+
 class HealthCheckView(APIView):
     """
     Health check endpoint to verify AI agent is working.
@@ -121,7 +249,9 @@ class HealthCheckView(APIView):
     {
         "status": "healthy",
         "ai_configured": true,
-        "modules_loaded": true
+        "modules_loaded": true,
+        "agent_pool": {"hits": 12, "misses": 1, "executors": 1, "llms": 1},
+        "search_cache": {"memory_hits": 40, "disk_hits": 3, "misses": 9, "hit_rate": 0.827, "memory_entries": 9}
     }
     """
     permission_classes = [AllowAny]
@@ -145,6 +275,8 @@ class HealthCheckView(APIView):
                 'status': 'healthy',
                 'ai_configured': api_key_configured,
                 'modules_loaded': modules_loaded,
+                'agent_pool': get_agent_pool_stats(),
+                'search_cache': get_search_cache_stats(),
                 'debug_mode': settings.DEBUG
             })
         except Exception as e:
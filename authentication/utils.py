@@ -0,0 +1,22 @@
+from django.contrib.auth import get_user_model
+
+User = get_user_model()
+
+
+def resolve_user(user):
+    """
+    The user a request (or WebSocket connection) acts for: ``user`` if it is
+    authenticated. Until the API requires authentication, anonymous access
+    acts for the first user to sign up (or a test user, created on first use).
+    """
+    if user is not None and user.is_authenticated:
+        return user
+    user = User.objects.order_by('date_joined', 'pk').first()
+    if not user:
+        user = User.objects.create_user(username='testuser', email='test@example.com', password='testpass123')
+    return user
+
+
+def get_request_user(request):
+    """The user a request acts for (see resolve_user)."""
+    return resolve_user(request.user)
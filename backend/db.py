@@ -0,0 +1,98 @@
+"""
+SQLite connection setup and read routing.
+
+Every new SQLite connection gets the pragmas below (see configure_sqlite):
+WAL journaling lets readers run while a writer commits, synchronous=NORMAL
+syncs at checkpoints instead of on every commit (safe with WAL), and
+busy_timeout makes a blocked writer wait for the lock instead of failing
+with "database is locked". Connections are kept open between requests
+(CONN_MAX_AGE in settings), so the setup runs once per connection.
+
+Long read-only queries can be sent to the READ_DATABASE alias, a second
+query_only connection to the same file, so they read a WAL snapshot without
+holding up the default connection:
+
+    with read_replica():
+        summaries = list(sessions)
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+READ_DATABASE = 'read'
+
+_use_read_database = ContextVar('use_read_database', default=False)
+
+
+def sqlite_pragmas(alias):
+    """The PRAGMA statements run on a new connection for ``alias``."""
+    pragmas = [
+        'synchronous = NORMAL',
+        f'busy_timeout = {settings.SQLITE_BUSY_TIMEOUT}',
+        f'mmap_size = {settings.SQLITE_MMAP_SIZE}',
+        f'cache_size = -{settings.SQLITE_CACHE_SIZE}',  # Negative: KiB rather than pages
+    ]
+    if alias == READ_DATABASE:
+        pragmas.append('query_only = ON')
+    else:
+        # Stored in the file; the read connection picks it up from there
+        pragmas.insert(0, 'journal_mode = WAL')
+    return pragmas
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for pragma in sqlite_pragmas(connection.alias):
+            cursor.execute(f'PRAGMA {pragma}')
+
+
+@contextmanager
+def read_replica():
+    """Route reads in this block (or decorated function) to READ_DATABASE."""
+    token = _use_read_database.set(True)
+    try:
+        yield
+    finally:
+        _use_read_database.reset(token)
+
+
+class ReadReplicaRouter:
+    """
+    Sends reads inside read_replica() to READ_DATABASE and everything else to
+    the default database.
+
+    Reads made inside a transaction stay on the default connection, so they
+    see that transaction's own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if (
+            _use_read_database.get()
+            and READ_DATABASE in settings.DATABASES
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return READ_DATABASE
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Also for rows read through READ_DATABASE, which cannot write
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases are the same database
+        if {obj1._state.db, obj2._state.db} <= {DEFAULT_DB_ALIAS, READ_DATABASE}:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == READ_DATABASE:
+            return False
+        return None
@@ -0,0 +1,152 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over a unique ``ordering``, e.g. ("created_at", "id").
+
+    A page starts after the ordering key of the last row seen (a WHERE the
+    index can seek to) instead of at an OFFSET, and no COUNT is run, so every
+    page costs the same however deep it is, and rows added meanwhile do not
+    shift later pages. Cursors are opaque; ``previous`` scrolls backwards.
+
+    Response:
+    {
+        "next": ".../?cursor=eyJrIjpb...", or null on the last page
+        "previous": ".../?cursor=eyJrIjpb...", or null on the first page
+        "results": [...]
+    }
+    """
+    ordering = ('created_at', 'id')
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.model = queryset.model
+        self.page_size = self.get_page_size(request)
+        key, backwards = self.decode_cursor(request)
+
+        ordering = self.reverse_ordering() if backwards else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if key is not None:
+            queryset = queryset.filter(self.seek(ordering, key))
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if backwards:
+            rows.reverse()
+        self.has_next = key is not None if backwards else has_more
+        self.has_previous = has_more if backwards else key is not None
+        self.page = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def reverse_ordering(self):
+        return tuple(name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering)
+
+    @staticmethod
+    def seek(ordering, key):
+        """
+        Rows after ``key`` in ``ordering``: ``a > x OR (a = x AND b > y)``, with
+        ``a >= x`` added so the index range starts at the key.
+        """
+        lookups = [(name.lstrip('-'), 'lt' if name.startswith('-') else 'gt') for name in ordering]
+        (last, op), value = lookups[-1], key[-1]
+        condition = Q(**{f'{last}__{op}': value})
+        for (name, op), value in zip(reversed(lookups[:-1]), reversed(key[:-1])):
+            condition = Q(**{f'{name}__{op}': value}) | (Q(**{name: value}) & condition)
+        (first, op), value = lookups[0], key[0]
+        return Q(**{f'{first}__{op}e': value}) & condition
+
+    def row_key(self, row):
+        return [self.model._meta.get_field(name.lstrip('-')).value_to_string(row) for name in self.ordering]
+
+    def encode_cursor(self, row, backwards):
+        payload = json.dumps({'k': self.row_key(row), 'b': int(backwards)}, separators=(',', ':'))
+        token = base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        """The (key, backwards) of the request's cursor; (None, False) for the first page."""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            raw_key, backwards = payload['k'], bool(payload['b'])
+            if len(raw_key) != len(self.ordering):
+                raise ValueError
+            key = [
+                self.model._meta.get_field(name.lstrip('-')).to_python(value)
+                for name, value in zip(self.ordering, raw_key)
+            ]
+        except (ValueError, KeyError, TypeError, ValidationError) as e:
+            raise NotFound(self.invalid_cursor_message) from e
+        return key, backwards
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], backwards=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], backwards=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class SessionPagination(KeysetPagination):
+    """Sessions, most recently updated first."""
+    ordering = ('-updated_at', '-id')
+
+
+class MessagePagination(KeysetPagination):
+    """A session's messages, oldest first."""
+    ordering = ('created_at', 'id')
+
+
+class UserMessagePagination(KeysetPagination):
+    """
+    All of a user's messages, session by session, oldest first within each.
+
+    Ordering by session_id lets SQLite walk the (session, created_at, id)
+    index once per session of the user, in order, without sorting.
+    """
+    ordering = ('session_id', 'created_at', 'id')
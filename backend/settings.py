@@ -39,6 +39,8 @@ LOCAL_APPS = [
     'chat',
     'documents',
     'ai_agent',
+    'jobs',
+    'backend',
 ]
 
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -75,12 +77,36 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 ASGI_APPLICATION = 'backend.asgi.application'
 
 # Database
+# SQLite connections are set up by backend.db (WAL, synchronous=NORMAL, ...)
+SQLITE_BUSY_TIMEOUT = config('SQLITE_BUSY_TIMEOUT', default=5000, cast=int)  # Milliseconds a writer waits for the lock
+SQLITE_MMAP_SIZE = config('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024, cast=int)  # Bytes
+SQLITE_CACHE_SIZE = config('SQLITE_CACHE_SIZE', default=32 * 1024, cast=int)  # KiB of page cache per connection
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)  # Seconds a connection is reused; 0 closes it per request
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            # Take the write lock at BEGIN, where busy_timeout can wait for it,
+            # instead of failing when a read transaction later writes
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': SQLITE_BUSY_TIMEOUT / 1000,
+        },
+    },
+    # Read-only connection to the same file for long reads (backend.db.read_replica)
+    'read': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {'timeout': SQLITE_BUSY_TIMEOUT / 1000},
+        'TEST': {'MIRROR': 'default'},
+    },
 }
+DATABASE_ROUTERS = ['backend.db.ReadReplicaRouter']
 
 # Custom user model
 AUTH_USER_MODEL = 'authentication.User'
@@ -115,6 +141,18 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = 'media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Rendered DOCX/PDF downloads are cached under MEDIA_ROOT/renditions and
+# pre-rendered in the background whenever a document's content is saved.
+RENDITION_PRERENDER = config('RENDITION_PRERENDER', default=True, cast=bool)
+DOCUMENT_FORMATTER_CACHE_SIZE = config('DOCUMENT_FORMATTER_CACHE_SIZE', default=64, cast=int)  # Drafts kept for incremental re-formatting
+
+# DOCX/PDF rendering runs in a process pool; downloads get 503 + Retry-After
+# once RENDER_WORKERS jobs are running and RENDER_QUEUE_SIZE more are waiting.
+RENDER_WORKERS = config('RENDER_WORKERS', default=2, cast=int)
+RENDER_QUEUE_SIZE = config('RENDER_QUEUE_SIZE', default=8, cast=int)
+RENDER_TIMEOUT = config('RENDER_TIMEOUT', default=30.0, cast=float)  # Seconds
+RENDER_RETRY_AFTER = config('RENDER_RETRY_AFTER', default=5, cast=int)  # Seconds
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -165,20 +203,75 @@ CORS_ALLOW_HEADERS = [
 ]
 
 # Channels (WebSocket)
-CHANNEL_LAYERS = {
-    'default': {
-        'BACKEND': 'channels_redis.core.RedisChannelLayer',
-        'CONFIG': {
-            "hosts": [('127.0.0.1', 6379)],
+# Redis is used when channels_redis is installed and USE_REDIS_CHANNEL_LAYER is on;
+# otherwise fall back to the in-memory layer (single process, fine for dev/tests).
+try:
+    import channels_redis  # noqa: F401
+    _channels_redis_available = True
+except ImportError:
+    _channels_redis_available = False
+
+if config('USE_REDIS_CHANNEL_LAYER', default=True, cast=bool) and _channels_redis_available:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels_redis.core.RedisChannelLayer',
+            'CONFIG': {
+                "hosts": [(config('REDIS_HOST', default='127.0.0.1'), config('REDIS_PORT', default=6379, cast=int))],
+            },
         },
-    },
-}
+    }
+else:
+    CHANNEL_LAYERS = {
+        'default': {
+            'BACKEND': 'channels.layers.InMemoryChannelLayer',
+        },
+    }
 
 # AI Configuration
 OPENROUTER_API_KEY = config('OPENROUTER_API_KEY', default='')
 OPENROUTER_BASE_URL = config('OPENROUTER_BASE_URL', default='https://openrouter.ai/api/v1')
 AI_MODEL = config('AI_MODEL', default='deepseek/deepseek-chat-v3-0324:free')
 AI_TEMPERATURE = config('AI_TEMPERATURE', default=0.3, cast=float)
+AI_ROUTING_ENABLED = config('AI_ROUTING_ENABLED', default=True, cast=bool)  # Send non-research turns straight to the chat model
+AI_TEMPLATE_DRAFTING = config('AI_TEMPLATE_DRAFTING', default=True, cast=bool)  # Fill clause templates once every detail is known
+AI_HISTORY_CACHE_SIZE = config('AI_HISTORY_CACHE_SIZE', default=256, cast=int)  # Sessions kept in the history LRU
+
+# Context window: prompt-token budget per model (system prompt + history + input).
+# Older turns beyond AI_CONTEXT_KEEP_TURNS are summarized once the budget is exceeded.
+AI_CONTEXT_TOKEN_BUDGETS = {
+    'deepseek/deepseek-chat-v3-0324:free': 48000,
+}
+AI_CONTEXT_DEFAULT_TOKEN_BUDGET = config('AI_CONTEXT_DEFAULT_TOKEN_BUDGET', default=16000, cast=int)
+AI_CONTEXT_KEEP_TURNS = config('AI_CONTEXT_KEEP_TURNS', default=6, cast=int)
+
+# Legal_Web_Search result cache (in-process LRU + SQLite file shared by workers)
+SEARCH_CACHE_PATH = config('SEARCH_CACHE_PATH', default=str(BASE_DIR / 'search_cache.sqlite3'))
+SEARCH_CACHE_TTL = config('SEARCH_CACHE_TTL', default=24 * 60 * 60, cast=int)  # Seconds
+SEARCH_CACHE_MEMORY_ENTRIES = config('SEARCH_CACHE_MEMORY_ENTRIES', default=512, cast=int)
+SEARCH_CACHE_MAX_ENTRIES = config('SEARCH_CACHE_MAX_ENTRIES', default=10000, cast=int)
+
+# Legal_Web_Search runs one sub-query per source; each is abandoned after SEARCH_TIMEOUT
+SEARCH_TIMEOUT = config('SEARCH_TIMEOUT', default=10.0, cast=float)  # Seconds
+SEARCH_MAX_RESULTS = config('SEARCH_MAX_RESULTS', default=5, cast=int)  # Per source
+
+# Offline corpus of statutes and case law, built with `manage.py index_corpus <folder>`.
+# Legal_Web_Search queries it first and only goes to the web below the confidence threshold.
+LEGAL_CORPUS_INDEX_PATH = config('LEGAL_CORPUS_INDEX_PATH', default=str(BASE_DIR / 'corpus_index'))
+LEGAL_CORPUS_MIN_CONFIDENCE = config('LEGAL_CORPUS_MIN_CONFIDENCE', default=0.6, cast=float)
+
+# Background jobs (jobs app): batch generation, generate/refine and renders.
+# With JOBS_AUTOSTART off, run the workers separately with `manage.py run_jobs`.
+JOBS_WORKERS = config('JOBS_WORKERS', default=2, cast=int)  # Concurrent jobs per process
+JOBS_AUTOSTART = config('JOBS_AUTOSTART', default=True, cast=bool)  # Run queued jobs in the web process
+JOBS_MAX_BATCH_SIZE = config('JOBS_MAX_BATCH_SIZE', default=100, cast=int)
+JOBS_STREAM_INTERVAL = config('JOBS_STREAM_INTERVAL', default=1.0, cast=float)  # Seconds between progress polls
+JOBS_STREAM_MAX_DURATION = config('JOBS_STREAM_MAX_DURATION', default=30.0, cast=float)  # Seconds a progress stream stays open
+JOBS_POLL_INTERVAL = config('JOBS_POLL_INTERVAL', default=1.0, cast=float)  # Seconds an idle worker waits
+JOBS_MAX_ATTEMPTS = config('JOBS_MAX_ATTEMPTS', default=3, cast=int)
+JOBS_RETRY_BASE_DELAY = config('JOBS_RETRY_BASE_DELAY', default=5.0, cast=float)  # Seconds, doubled per attempt
+JOBS_RETRY_MAX_DELAY = config('JOBS_RETRY_MAX_DELAY', default=300.0, cast=float)
+JOBS_LEASE_SECONDS = config('JOBS_LEASE_SECONDS', default=600, cast=int)  # A running job whose lease is not renewed this long is re-run
+JOBS_HEARTBEAT_INTERVAL = config('JOBS_HEARTBEAT_INTERVAL', default=60.0, cast=float)  # Seconds between lease renewals
 
 # File Upload Settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024  # 10MB
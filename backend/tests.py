@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.db import OperationalError, connections, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from chat.models import Message
+from chat_sessions.models import Session
+from .db import READ_DATABASE, read_replica
+
+
+def pragma(alias, name):
+    with connections[alias].cursor() as cursor:
+        cursor.execute(f'PRAGMA {name}')
+        return cursor.fetchone()[0]
+
+
+@override_settings(RENDITION_PRERENDER=False)
+class SqliteProfileTests(TransactionTestCase):
+    """Connection pragmas and routing of reads to the read-only connection."""
+    databases = {'default', READ_DATABASE}
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='owner', email='owner@example.com', password='testpass123'
+        )
+        self.session = Session.objects.create(user=self.user, title='Lease')
+        Message.objects.create(session=self.session, role='user', content='Draft my lease')
+
+    def test_connections_are_configured(self):
+        for alias in ('default', READ_DATABASE):
+            self.assertEqual(pragma(alias, 'synchronous'), 1, alias)  # NORMAL
+            self.assertEqual(pragma(alias, 'busy_timeout'), 5000, alias)
+            self.assertEqual(pragma(alias, 'cache_size'), -32 * 1024, alias)
+        self.assertEqual(pragma('default', 'query_only'), 0)
+        self.assertEqual(pragma(READ_DATABASE, 'query_only'), 1)
+
+    def test_read_connection_cannot_write(self):
+        with self.assertRaises(OperationalError):
+            Session.objects.using(READ_DATABASE).filter(pk=self.session.pk).update(title='Changed')
+
+    def test_reads_are_routed_outside_transactions_only(self):
+        with read_replica():
+            session = Session.objects.get(pk=self.session.pk)
+            with transaction.atomic():
+                self.assertEqual(Session.objects.all().db, 'default')
+        self.assertEqual(session._state.db, READ_DATABASE)
+        self.assertEqual(Session.objects.all().db, 'default')
+
+        # Rows read there are still saved through the default connection
+        session.title = 'Renamed'
+        session.save()
+        self.assertEqual(Session.objects.get(pk=session.pk).title, 'Renamed')
+
+    def test_long_reads_use_the_read_connection(self):
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connections[READ_DATABASE]) as reads:
+            summary = self.client.get('/api/sessions/summary/')
+            transcript = self.client.get(f'/api/sessions/{self.session.pk}/messages/')
+
+        self.assertEqual(summary.data['results'][0]['message_count'], 1)
+        self.assertEqual(transcript.data['results'][0]['content'], 'Draft my lease')
+        self.assertTrue(any('chat_sessions_session' in query['sql'] for query in reads))
+        self.assertTrue(any('chat_message' in query['sql'] for query in reads))
@@ -8,5 +8,6 @@ urlpatterns = [
     path('api/', include('chat_sessions.urls')),
     path('api/', include('chat.urls')),
     path('api/', include('documents.urls')),
+    path('api/', include('jobs.urls')),
     path('api/ai/', include('ai_agent.urls')),
 ]
\ No newline at end of file
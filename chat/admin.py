@@ -1,3 +1,10 @@
 from django.contrib import admin
+from .models import Message
 
-# Register your models here.
+
+@admin.register(Message)
+class MessageAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'session', 'role', 'created_at']
+    list_filter = ['role']
+    list_select_related = ['session__user']  # The session column shows the session's user
+    raw_id_fields = ['session']
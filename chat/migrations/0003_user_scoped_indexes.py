@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat', '0002_message_session_chat_session'),
+        ('chat_sessions', '0002_user_scoped_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['session', 'created_at'], name='chat_messag_session_4940cf_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 import uuid
 
 
@@ -12,17 +13,21 @@ class Message(models.Model):
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     session = models.ForeignKey(
-        'sessions.Session',
+        'chat_sessions.Session',
         on_delete=models.CASCADE,
-        related_name='messages'
+        related_name='messages',
+        db_index=False,  # Covered by the (session, created_at, id) index
     )
     role = models.CharField(max_length=20, choices=ROLE_CHOICES)
     content = models.TextField()
     metadata = models.JSONField(default=dict, blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set by the writer rather than auto_now_add, so messages saved together
+    # (see ai_agent.history.save_messages) get distinct, ordered timestamps
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     
     class Meta:
         ordering = ['created_at']
+        indexes = [models.Index(fields=['session', 'created_at', 'id'])]
         verbose_name = 'Message'
         verbose_name_plural = 'Messages'
     
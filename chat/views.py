@@ -1,5 +1,9 @@
 from rest_framework import viewsets
+from rest_framework.exceptions import NotFound
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from authentication.utils import get_request_user
+from backend.pagination import UserMessagePagination
+from chat_sessions.models import Session
 from .models import Message
 from .serializers import MessageSerializer
 
@@ -9,11 +13,20 @@ class MessageViewSet(viewsets.ModelViewSet):
     queryset = Message.objects.all()
     serializer_class = MessageSerializer
     permission_classes = [AllowAny]  # Allow access without authentication for testing
+    pagination_class = UserMessagePagination
 
     def get_queryset(self):
-        # For testing, return all messages. In production, filter by user
-        return self.queryset.all()
-        # return self.queryset.filter(session__user=self.request.user)
+        # The request user's messages; ?session= narrows the list to one
+        # session. Filtering by a subquery of session ids rather than a join
+        # keeps the (session, created_at, id) index order for the pagination.
+        sessions = Session.objects.filter(user=get_request_user(self.request)).values('pk')
+        queryset = self.queryset.filter(session__in=sessions)
+        session = self.request.query_params.get('session')
+        if session:
+            queryset = queryset.filter(session_id=session)
+        return queryset
 
     def perform_create(self, serializer):
+        if serializer.validated_data['session'].user_id != get_request_user(self.request).pk:
+            raise NotFound('Session not found.')
         serializer.save()
\ No newline at end of file
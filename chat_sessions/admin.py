@@ -1,3 +1,11 @@
 from django.contrib import admin
+from .models import Session
 
-# Register your models here.
+
+@admin.register(Session)
+class SessionAdmin(admin.ModelAdmin):
+    list_display = ['title', 'user', 'status', 'updated_at']
+    list_filter = ['status']
+    search_fields = ['title', 'user__email']
+    list_select_related = ['user']  # Session.__str__ shows the user's email
+    raw_id_fields = ['user']
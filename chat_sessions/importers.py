@@ -0,0 +1,111 @@
+"""
+Import of chats exported from the Streamlit app (app.py).
+
+An export is ``st.session_state.chats``: a dict of chat id to
+``{"title", "history", "generated_draft", "app_state"}``, where history holds
+LangChain messages serialized either as ``{"role", "content"}`` or as
+``{"type": "human"/"ai", "content"}`` (``langchain_core.messages.messages_to_dict``
+nests the content under "data").
+"""
+
+import uuid
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from ai_agent.history import DEFAULT_DOCUMENT_TYPE
+from chat.models import Message
+from documents.models import Document
+from .models import Session
+
+MESSAGE_ROLES = {'user': 'user', 'human': 'user', 'assistant': 'assistant', 'ai': 'assistant'}
+SESSION_STATUSES = {'DRAFTING': 'drafting', 'REVIEWING': 'reviewing'}
+DEFAULT_TITLE = 'New Chat'
+
+
+def parse_history(history):
+    """The (role, content) pairs of an exported history; system and tool messages are skipped."""
+    if not isinstance(history, list):
+        raise ValueError('"history" must be a list of messages')
+    messages = []
+    for entry in history:
+        if not isinstance(entry, dict):
+            raise ValueError('Each history entry must be an object')
+        role = MESSAGE_ROLES.get(entry.get('role') or entry.get('type'))
+        data = entry.get('data') if isinstance(entry.get('data'), dict) else entry
+        content = data.get('content')
+        if role is None or not isinstance(content, str):
+            continue
+        messages.append((role, content))
+    return messages
+
+
+def session_id_for(chat_id):
+    """Keep the Streamlit chat id as the session id when it is a UUID (app.py uses uuid4)."""
+    try:
+        return uuid.UUID(str(chat_id))
+    except ValueError:
+        return uuid.uuid4()
+
+
+@transaction.atomic
+def import_streamlit_chats(user, chats):
+    """
+    Create a session, its messages and its document for each exported chat.
+
+    Sessions, messages and documents are each written with one bulk INSERT,
+    all in one transaction. Chats whose id is already a session are skipped,
+    so an export can be imported again safely. Document details are caught up
+    on the first turn of each session (see ai_agent.details).
+
+    Raises:
+        ValueError: the export is not a dict of chats
+
+    Returns:
+        dict: {"imported", "skipped", "messages", "documents", "sessions"}
+    """
+    if isinstance(chats, dict) and isinstance(chats.get('chats'), dict):
+        chats = chats['chats']
+    if not isinstance(chats, dict) or not chats:
+        raise ValueError('Expected an object of chats keyed by chat id')
+
+    parsed = []
+    for chat_id, chat in chats.items():
+        if not isinstance(chat, dict):
+            raise ValueError(f'Chat {chat_id} must be an object')
+        parsed.append((session_id_for(chat_id), chat, parse_history(chat.get('history', []))))
+
+    existing = set(Session.objects.filter(pk__in=[pk for pk, _, _ in parsed]).values_list('pk', flat=True))
+    now = timezone.now()
+    sessions, messages, documents = [], [], []
+    for pk, chat, history in parsed:
+        if pk in existing:
+            continue
+        draft = chat.get('generated_draft') or ''
+        session = Session(
+            pk=pk,
+            user=user,
+            title=(str(chat.get('title') or DEFAULT_TITLE))[:255],
+            status=SESSION_STATUSES.get(chat.get('app_state'), 'drafting'),
+        )
+        sessions.append(session)
+        messages.extend(
+            Message(session=session, role=role, content=content, created_at=now + timedelta(microseconds=offset))
+            for offset, (role, content) in enumerate(history)
+        )
+        if draft:
+            documents.append(Document(session=session, document_type=DEFAULT_DOCUMENT_TYPE, content=draft))
+
+    # bulk_create sends no post_save, so renditions are rendered on first download
+    Session.objects.bulk_create(sessions)
+    Message.objects.bulk_create(messages)
+    Document.objects.bulk_create(documents)
+
+    return {
+        'imported': len(sessions),
+        'skipped': len(parsed) - len(sessions),
+        'messages': len(messages),
+        'documents': len(documents),
+        'sessions': [str(session.pk) for session in sessions],
+    }
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat_sessions', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['user', '-updated_at'], name='chat_sessio_user_id_a0da0a_idx'),
+        ),
+    ]
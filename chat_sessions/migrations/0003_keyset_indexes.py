@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat_sessions', '0002_user_scoped_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='session',
+            name='chat_sessio_user_id_a0da0a_idx',
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['user', '-updated_at', '-id'], name='chat_sessio_user_id_c6f4a6_idx'),
+        ),
+    ]
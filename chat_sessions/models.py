@@ -29,6 +29,7 @@ class Session(models.Model):
     
     class Meta:
         ordering = ['-updated_at']
+        indexes = [models.Index(fields=['user', '-updated_at', '-id'])]
         verbose_name = 'Session'
         verbose_name_plural = 'Sessions'
     
@@ -1,4 +1,6 @@
+from django.core.exceptions import ObjectDoesNotExist
 from rest_framework import serializers
+from chat.models import Message
 from .models import Session
 
 
@@ -6,4 +8,55 @@ class SessionSerializer(serializers.ModelSerializer):
     """Serializer for the Session model."""
     class Meta:
         model = Session
-        fields = ['id', 'title', 'status', 'created_at', 'updated_at']
\ No newline at end of file
+        fields = ['id', 'title', 'status', 'created_at', 'updated_at']
+
+class SessionSummarySerializer(SessionSerializer):
+    """
+    A session as the sidebar shows it: message count, last message and
+    document, read from the annotations of SessionViewSet.summary.
+    """
+    message_count = serializers.IntegerField(read_only=True)
+    last_message = serializers.SerializerMethodField()
+    document = serializers.SerializerMethodField()
+
+    class Meta(SessionSerializer.Meta):
+        fields = SessionSerializer.Meta.fields + ['message_count', 'last_message', 'document']
+
+    def get_last_message(self, session):
+        if session.last_message_at is None:
+            return None
+        return {
+            'role': session.last_message_role,
+            'preview': session.last_message_preview,
+            'created_at': serializers.DateTimeField().to_representation(session.last_message_at),
+        }
+
+    def get_document(self, session):
+        try:
+            document = session.document
+        except ObjectDoesNotExist:
+            return None
+        return {
+            'id': document.id,
+            'document_type': document.document_type,
+            'updated_at': serializers.DateTimeField().to_representation(document.updated_at),
+        }
+
+
+class TurnMessageSerializer(serializers.Serializer):
+    role = serializers.ChoiceField(choices=Message.ROLE_CHOICES)
+    content = serializers.CharField(trim_whitespace=False)
+    metadata = serializers.DictField(required=False, default=dict)
+
+
+class TurnDocumentSerializer(serializers.Serializer):
+    content = serializers.CharField(trim_whitespace=False)
+    document_type = serializers.CharField(max_length=100, required=False)
+    formatted_content = serializers.CharField(required=False, allow_blank=True, trim_whitespace=False, default='')
+
+
+class TurnSerializer(serializers.Serializer):
+    """A turn posted to SessionViewSet.turn: its messages, oldest first, and optionally the draft."""
+    messages = TurnMessageSerializer(many=True, allow_empty=False)
+    document = TurnDocumentSerializer(required=False)
+    status = serializers.ChoiceField(choices=Session.STATUS_CHOICES, required=False)
@@ -1,3 +1,357 @@
-from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
-# Create your tests here.
+from chat.models import Message
+from documents.models import Document, DocumentDetails
+from .models import Session
+
+LIST_TABLES = ('chat_sessions_session', 'chat_message', 'documents_document', 'documents_documentdetails')
+
+
+def query_plan(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@override_settings(RENDITION_PRERENDER=False)
+class UserScopedListTests(TestCase):
+    """List endpoints return the request user's rows, read through indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user(username='owner', email='owner@example.com', password='testpass123')
+        cls.other = User.objects.create_user(username='other', email='other@example.com', password='testpass123')
+        for user in (cls.user, cls.other):
+            for n in range(3):
+                session = Session.objects.create(user=user, title=f'{user.username} {n}')
+                Message.objects.bulk_create(
+                    Message(session=session, role='user', content=f'message {i}') for i in range(5)
+                )
+                document = Document.objects.create(session=session, document_type='Lease', content='LEASE')
+                DocumentDetails.objects.create(session=session, document=document, details={})
+        cls.session = cls.user.sessions.first()
+
+    def get_list(self, url):
+        """GET ``url`` as the owner; returns the response and the plans of its queries on the list tables."""
+        self.client.force_login(self.user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        plans = [
+            query_plan(query['sql']) for query in queries
+            if query['sql'].startswith('SELECT') and any(f'FROM "{table}"' in query['sql'] for table in LIST_TABLES)
+        ]
+        return response, plans
+
+    def assert_indexed(self, plans):
+        self.assertTrue(plans)
+        for plan in plans:
+            for step in plan:
+                # "SCAN <table>" reads every row; "USE TEMP B-TREE" sorts them all
+                self.assertFalse(step.startswith('SCAN'), plan)
+                self.assertNotIn('TEMP B-TREE', step, plan)
+
+    def test_sessions_are_scoped_to_the_user(self):
+        response, plans = self.get_list('/api/sessions/')
+
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertTrue(all(item['title'].startswith('owner') for item in response.data['results']))
+        self.assert_indexed(plans)
+
+    def test_session_messages_are_read_in_index_order(self):
+        response, plans = self.get_list(f'/api/sessions/{self.session.pk}/messages/')
+
+        self.assertEqual([m['content'] for m in response.data['results']], [f'message {i}' for i in range(5)])
+        self.assert_indexed(plans)
+
+    def test_messages_are_scoped_to_the_user_and_read_in_index_order(self):
+        first, plans = self.get_list('/api/messages/?page_size=10')
+        second, more_plans = self.get_list(first.data['next'])
+
+        messages = first.data['results'] + second.data['results']
+        self.assertEqual(len(first.data['results']), 10)
+        self.assertIsNone(second.data['next'])
+        self.assertEqual(
+            {message['id'] for message in messages},
+            {str(pk) for pk in Message.objects.filter(session__user=self.user).values_list('pk', flat=True)},
+        )
+        self.assertNotIn('count', first.data)
+        self.assert_indexed(plans + more_plans)
+
+    def test_documents_are_scoped_to_the_user(self):
+        response, plans = self.get_list('/api/documents/')
+
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(
+            {item['session'] for item in response.data['results']},
+            set(self.user.sessions.values_list('pk', flat=True)),
+        )
+        self.assert_indexed(plans)
+
+    def test_document_details_are_scoped_to_the_user(self):
+        response, plans = self.get_list('/api/document-details/')
+
+        self.assertEqual(response.data['count'], 3)
+        for plan in plans:
+            self.assertFalse([step for step in plan if step.startswith('SCAN documents_documentdetails')], plan)
+
+    def test_other_users_sessions_are_not_found(self):
+        self.client.force_login(self.user)
+        other_session = self.other.sessions.first()
+
+        self.assertEqual(self.client.get(f'/api/sessions/{other_session.pk}/').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/sessions/{other_session.pk}/document/').status_code, 404)
+        response = self.client.post(
+            '/api/messages/', {'session': str(other_session.pk), 'role': 'user', 'content': 'hi'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_nested_message_create_and_document(self):
+        self.client.force_login(self.user)
+
+        response = self.client.post(
+            f'/api/sessions/{self.session.pk}/messages/', {'role': 'user', 'content': 'Add a pet clause'},
+            content_type='application/json',
+        )
+        document = self.client.get(f'/api/sessions/{self.session.pk}/document/')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['session'], self.session.pk)
+        self.assertEqual(document.data['session'], self.session.pk)
+
+
+@override_settings(RENDITION_PRERENDER=False)
+class KeysetPaginationTests(TestCase):
+    """Cursor pagination of /api/sessions/ and /api/sessions/{id}/messages/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username='owner', email='owner@example.com', password='testpass123'
+        )
+        cls.session = Session.objects.create(user=cls.user, title='Long transcript')
+        # Equal timestamps, so pages also split on the id tie-breaker
+        Message.objects.bulk_create(
+            Message(session=cls.session, role='user', content=f'message {i}', created_at=cls.session.created_at)
+            for i in range(45)
+        )
+        cls.ordered = list(Message.objects.filter(session=cls.session).order_by('created_at', 'id')
+                           .values_list('content', flat=True))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def walk(self, url, link, field='content'):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            pages.append([item[field] for item in response.data['results']])
+            url = response.data[link]
+        return pages
+
+    def test_forward_and_backward_scrolling_cover_every_message_once(self):
+        forward = self.walk(f'/api/sessions/{self.session.pk}/messages/', 'next')
+        self.assertEqual([len(page) for page in forward], [20, 20, 5])
+        self.assertEqual(sum(forward, []), self.ordered)
+
+        last = self.client.get(f'/api/sessions/{self.session.pk}/messages/?page_size=40')
+        last = self.client.get(last.data['next'])
+        backward = self.walk(last.data['previous'], 'previous')
+        self.assertEqual(sum(reversed(backward), []), self.ordered[:40])
+
+    def test_new_messages_do_not_shift_pages(self):
+        first = self.client.get(f'/api/sessions/{self.session.pk}/messages/?page_size=10')
+        Message.objects.create(session=self.session, role='assistant', content='new reply')
+
+        second = self.client.get(first.data['next'])
+
+        self.assertEqual([m['content'] for m in second.data['results']], self.ordered[10:20])
+
+    def test_deep_pages_seek_through_the_index(self):
+        url = f'/api/sessions/{self.session.pk}/messages/?page_size=5'
+        for _ in range(6):
+            url = self.client.get(url).data['next']
+
+        # Chat session and page: no COUNT and no OFFSET, however deep the page
+        with self.assertNumQueries(4), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 5)
+        page_query = queries[-1]['sql']
+        self.assertNotIn('OFFSET', page_query)
+        plan = query_plan(page_query)
+        self.assertTrue(any('USING INDEX' in step and 'created_at>' in step for step in plan), plan)
+        self.assertFalse([step for step in plan if step.startswith('SCAN') or 'TEMP B-TREE' in step], plan)
+
+    def test_sessions_page_most_recent_first(self):
+        for n in range(3):
+            Session.objects.create(user=self.user, title=f'Session {n}')
+
+        pages = self.walk('/api/sessions/?page_size=2', 'next', field='title')
+
+        self.assertEqual(pages, [['Session 2', 'Session 1'], ['Session 0', 'Long transcript']])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get(f'/api/sessions/{self.session.pk}/messages/?cursor=bm90IGEgY3Vyc29y')
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(RENDITION_PRERENDER=False)
+class SessionSummaryTests(TestCase):
+    """Tests for GET /api/sessions/summary/ and the admin changelists."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser(
+            username='owner', email='owner@example.com', password='testpass123'
+        )
+        cls.empty = Session.objects.create(user=cls.user, title='Empty')
+        cls.drafted = Session.objects.create(user=cls.user, title='Drafted', status='reviewing')
+        Message.objects.create(session=cls.drafted, role='user', content='Draft my lease')
+        Message.objects.create(session=cls.drafted, role='assistant', content='DRAFT_COMPLETE: ' + 'LEASE ' * 50)
+        cls.document = Document.objects.create(session=cls.drafted, document_type='Lease', content='LEASE')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_summary_in_one_query(self):
+        for n in range(5):
+            session = Session.objects.create(user=self.user, title=f'Session {n}')
+            Message.objects.create(session=session, role='user', content=f'Hello {n}')
+
+        # Login session, user and one query for the whole page
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/sessions/summary/')
+
+        summaries = {item['title']: item for item in response.data['results']}
+        self.assertEqual(len(summaries), 7)
+        drafted = summaries['Drafted']
+        self.assertEqual((drafted['status'], drafted['message_count']), ('reviewing', 2))
+        self.assertEqual(drafted['last_message']['role'], 'assistant')
+        self.assertEqual(len(drafted['last_message']['preview']), 120)
+        self.assertEqual(drafted['document']['id'], self.document.pk)
+        self.assertEqual((summaries['Empty']['message_count'], summaries['Empty']['last_message'],
+                          summaries['Empty']['document']), (0, None, None))
+
+    def test_admin_changelists_do_not_query_per_row(self):
+        for n in range(5):
+            session = Session.objects.create(user=self.user, title=f'Session {n}')
+            Message.objects.create(session=session, role='user', content=f'Hello {n}')
+            Document.objects.create(session=session, document_type='Lease', content='LEASE')
+
+        for url in ('/admin/chat_sessions/session/', '/admin/chat/message/', '/admin/documents/document/'):
+            with CaptureQueriesContext(connection) as few:
+                self.client.get(url)
+            Session.objects.create(user=self.user, title='One more')
+            Document.objects.create(
+                session=Session.objects.create(user=self.user, title='And its document'),
+                document_type='Lease', content='LEASE',
+            )
+            Message.objects.create(session=self.empty, role='user', content='Another')
+            with CaptureQueriesContext(connection) as more:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(more), len(few), url)
+
+
+@override_settings(RENDITION_PRERENDER=False)
+class TurnPersistenceTests(TestCase):
+    """Tests for POST /api/sessions/{id}/turn/ and POST /api/sessions/import/."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username='owner', email='owner@example.com', password='testpass123'
+        )
+        cls.session = Session.objects.create(user=cls.user, title='Lease')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, url, data):
+        return self.client.post(url, data, content_type='application/json')
+
+    def test_turn_is_written_in_one_transaction(self):
+        turn = {
+            'messages': [{'role': 'user', 'content': f'message {i}'} for i in range(10)],
+            'document': {'content': 'LEASE AGREEMENT', 'document_type': 'Lease'},
+        }
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(f'/api/sessions/{self.session.pk}/turn/', turn)
+
+        self.assertEqual(response.status_code, 201)
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE')) and 'django_session' not in q['sql']]
+        self.assertEqual(len([sql for sql in writes if 'chat_message' in sql]), 1)
+        self.assertEqual(len([sql for sql in writes if 'chat_sessions_session' in sql]), 1)
+        self.assertEqual(
+            list(Message.objects.filter(session=self.session).order_by('created_at', 'id').values_list('content', flat=True)),
+            [f'message {i}' for i in range(10)],
+        )
+        self.assertEqual(response.data['session']['status'], 'reviewing')
+        self.assertEqual(response.data['document']['document_type'], 'Lease')
+
+    def test_turn_upserts_the_document(self):
+        url = f'/api/sessions/{self.session.pk}/turn/'
+        self.post(url, {'messages': [{'role': 'user', 'content': 'Draft'}], 'document': {'content': 'v1'}})
+        response = self.post(url, {
+            'messages': [{'role': 'assistant', 'content': 'Updated', 'metadata': {'draft_updated': True}}],
+            'document': {'content': 'v2'},
+            'status': 'completed',
+        })
+
+        document = Document.objects.get(session=self.session)
+        self.assertEqual((document.content, document.document_type), ('v2', 'Legal Document'))
+        self.assertEqual(response.data['session']['status'], 'completed')
+        self.assertEqual(response.data['messages'][0]['metadata'], {'draft_updated': True})
+
+    def test_invalid_turn_writes_nothing(self):
+        response = self.post(f'/api/sessions/{self.session.pk}/turn/', {'messages': [{'role': 'tool', 'content': 'x'}]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Message.objects.filter(session=self.session).exists())
+
+    def test_import_streamlit_chats(self):
+        chat_id = 'a3b1c9d2-5e6f-4a7b-8c9d-0e1f2a3b4c5d'
+        export = {
+            chat_id: {
+                'title': 'Lease for Jane',
+                'history': [
+                    {'type': 'human', 'data': {'content': 'Draft a lease'}},
+                    {'type': 'ai', 'data': {'content': 'I have prepared the initial draft.'}},
+                    {'role': 'user', 'content': 'Add a pet clause'},
+                    {'type': 'system', 'data': {'content': 'ignored'}},
+                ],
+                'generated_draft': 'LEASE AGREEMENT',
+                'app_state': 'REVIEWING',
+            },
+            'old-chat': {'title': 'New Chat', 'history': [], 'generated_draft': '', 'app_state': 'DRAFTING'},
+        }
+
+        response = self.post('/api/sessions/import/', {'chats': export})
+        again = self.post('/api/sessions/import/', export)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            {key: response.data[key] for key in ('imported', 'skipped', 'messages', 'documents')},
+            {'imported': 2, 'skipped': 0, 'messages': 3, 'documents': 1},
+        )
+        session = Session.objects.get(pk=chat_id)
+        self.assertEqual((session.user, session.status), (self.user, 'reviewing'))
+        self.assertEqual(
+            list(session.messages.order_by('created_at', 'id').values_list('role', 'content')),
+            [('user', 'Draft a lease'), ('assistant', 'I have prepared the initial draft.'), ('user', 'Add a pet clause')],
+        )
+        self.assertEqual(session.document.content, 'LEASE AGREEMENT')
+        # Only the UUID chat id is recognised on a second import
+        self.assertEqual((again.data['imported'], again.data['skipped']), (1, 1))
+
+    def test_import_rejects_malformed_exports(self):
+        for payload in ([], {'chat': 'not an object'}, {'chat': {'history': 'not a list'}}):
+            response = self.post('/api/sessions/import/', payload)
+            self.assertEqual(response.status_code, 400, payload)
+        self.assertEqual(Session.objects.count(), 1)
@@ -1,35 +1,167 @@
-from rest_framework import viewsets
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Substr
+from django.shortcuts import get_object_or_404
+from rest_framework import status, viewsets
+from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.contrib.auth import get_user_model
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from ai_agent.history import save_messages
+from authentication.utils import get_request_user
+from backend.db import read_replica
+from backend.pagination import MessagePagination, SessionPagination
+from chat.models import Message
+from chat.serializers import MessageSerializer
+from documents.models import Document
+from documents.serializers import DocumentSerializer
+from .importers import import_streamlit_chats
 from .models import Session
-from .serializers import SessionSerializer
+from .serializers import SessionSerializer, SessionSummarySerializer, TurnSerializer
 
-User = get_user_model()
+# Characters of the last message shown in the session summary
+PREVIEW_LENGTH = 120
+
+
+def with_summary(sessions):
+    """
+    Annotate sessions with their message count and last message, and join
+    their document, so a page of summaries is a single query. Each
+    subquery is answered from the (session, created_at, id) message index.
+    """
+    messages = Message.objects.filter(session=OuterRef('pk'))
+    last_message = messages.order_by('-created_at', '-id')[:1]
+    return sessions.select_related('document').annotate(
+        message_count=Coalesce(
+            Subquery(messages.order_by().values('session').annotate(count=Count('pk')).values('count')),
+            Value(0),
+        ),
+        last_message_role=Subquery(last_message.values('role')),
+        last_message_preview=Subquery(last_message.annotate(
+            preview=Substr('content', 1, PREVIEW_LENGTH)).values('preview')),
+        last_message_at=Subquery(last_message.values('created_at')),
+    )
 
 
 class SessionViewSet(viewsets.ModelViewSet):
-    """ViewSet for managing chat sessions."""
+    """
+    ViewSet for managing chat sessions.
+
+    Lists only the request user's sessions (anonymous requests act for the
+    first user, see authentication.utils.get_request_user).
+
+    GET/POST /api/sessions/{id}/messages/   the session's messages, oldest first
+    GET      /api/sessions/{id}/document/   the session's document
+    POST     /api/sessions/{id}/turn/       a turn's messages and draft in one transaction
+    GET      /api/sessions/summary/         sessions with message count, last message and document
+    POST     /api/sessions/import/          chats exported from the Streamlit app
+
+    The lists use keyset pagination (backend.pagination): follow the
+    "next"/"previous" cursor links; there is no page number or count. The
+    transcript and summary pages are read on the read-only connection
+    (backend.db.read_replica).
+    """
     queryset = Session.objects.all()
     serializer_class = SessionSerializer
+    pagination_class = SessionPagination
     permission_classes = [AllowAny]  # Allow access without authentication for testing
 
     def get_queryset(self):
-        # For testing, return all sessions. In production, filter by user
-        return self.queryset.all()
-        # return self.queryset.filter(user=self.request.user)
+        # Served by the (user, -updated_at, -id) index in list order
+        return self.queryset.filter(user=get_request_user(self.request))
 
     def perform_create(self, serializer):
-        # For testing, create a default user if none exists or use first user
+        serializer.save(user=get_request_user(self.request))
+
+    @action(detail=True, methods=['get', 'post'], serializer_class=MessageSerializer)
+    def messages(self, request, pk=None):
+        session = self.get_object()
+        if request.method == 'POST':
+            serializer = MessageSerializer(data={**request.data, 'session': session.pk})
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        # Served by the (session, created_at, id) index in list order
+        paginator = MessagePagination()
+        with read_replica():
+            page = paginator.paginate_queryset(Message.objects.filter(session=session), request, view=self)
+        return paginator.get_paginated_response(MessageSerializer(page, many=True).data)
+
+    @action(detail=True, methods=['get'])
+    def document(self, request, pk=None):
+        document = get_object_or_404(Document, session=self.get_object())
+        return Response(DocumentSerializer(document).data)
+
+    @action(detail=False, methods=['get'])
+    def summary(self, request):
+        """
+        The sidebar's sessions in one query per page, instead of a request
+        per session for its messages and document.
+
+        Response:
+        {
+            "next": ..., "previous": ...,
+            "results": [{
+                "id": "...", "title": "...", "status": "reviewing", "created_at": "...", "updated_at": "...",
+                "message_count": 12,
+                "last_message": {"role": "assistant", "preview": "DRAFT_COMPLETE: LEASE...", "created_at": "..."},
+                "document": {"id": "...", "document_type": "Lease", "updated_at": "..."} or null
+            }]
+        }
+        """
+        with read_replica():
+            page = self.paginate_queryset(with_summary(self.get_queryset()))
+        return self.get_paginated_response(SessionSummarySerializer(page, many=True).data)
+
+    @action(detail=True, methods=['post'], serializer_class=TurnSerializer)
+    def turn(self, request, pk=None):
+        """
+        Save a whole turn at once instead of a POST per message: the messages
+        in one INSERT, the document upserted and the session touched once,
+        all in one transaction.
+
+        Request body:
+        {
+            "messages": [{"role": "user", "content": "..."}, {"role": "assistant", "content": "...", "metadata": {}}],
+            "document": {"content": "...", "document_type": "Lease", "formatted_content": "..."},  (optional)
+            "status": "reviewing"  (optional; a document moves the session to reviewing)
+        }
+
+        Response (201): {"messages": [...], "document": {...} or null, "session": {...}}
+        """
+        session = self.get_object()
+        serializer = TurnSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        document = data.get('document') or {}
+
+        messages, saved_document = save_messages(
+            session.pk,
+            [(message['role'], message['content'], message['metadata']) for message in data['messages']],
+            draft=document.get('content'),
+            document_type=document.get('document_type'),
+            formatted_content=document.get('formatted_content', ''),
+            status=data.get('status'),
+        )
+        session.refresh_from_db()
+        return Response({
+            'messages': MessageSerializer(messages, many=True).data,
+            'document': DocumentSerializer(saved_document).data if saved_document else None,
+            'session': SessionSerializer(session).data,
+        }, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_chats(self, request):
+        """
+        Import ``st.session_state.chats`` from the Streamlit app, as
+        {chat_id: {"title", "history", "generated_draft", "app_state"}} or
+        wrapped in {"chats": ...}. Chats imported before are skipped.
+
+        Response (201):
+        {"imported": 2, "skipped": 0, "messages": 14, "documents": 1, "sessions": ["...", "..."]}
+        """
         try:
-            # Try to get the first user, or create a test user
-            user = User.objects.first()
-            if not user:
-                user = User.objects.create_user(
-                    username='testuser',
-                    email='test@example.com',
-                    password='testpass123'
-                )
-            serializer.save(user=user)
-        except Exception as e:
-            # Fallback: save without user (if model allows)
-            serializer.save()
\ No newline at end of file
+            result = import_streamlit_chats(get_request_user(request), request.data)
+        except ValueError as e:
+            raise ValidationError({'chats': str(e)}) from e
+        return Response(result, status=status.HTTP_201_CREATED)
@@ -1,3 +1,18 @@
 from django.contrib import admin
+from .models import Document, DocumentDetails
 
-# Register your models here.
+
+@admin.register(Document)
+class DocumentAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'document_type', 'updated_at']
+    search_fields = ['document_type', 'session__title']
+    list_select_related = ['session']  # Document.__str__ shows the session title
+    raw_id_fields = ['session']
+
+
+@admin.register(DocumentDetails)
+class DocumentDetailsAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'verified', 'scanned_messages', 'updated_at']
+    list_filter = ['verified']
+    list_select_related = ['document']  # DocumentDetails.__str__ shows the document type
+    raw_id_fields = ['document', 'session']
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chat_sessions', '0001_initial'),
+        ('documents', '0002_alter_document_session'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documentdetails',
+            name='confidence',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='documentdetails',
+            name='provenance',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='documentdetails',
+            name='scanned_messages',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='documentdetails',
+            name='session',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='details', to='chat_sessions.session'),
+        ),
+        migrations.AlterField(
+            model_name='documentdetails',
+            name='document',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='details', to='documents.document'),
+        ),
+    ]
@@ -26,14 +26,31 @@ class Document(models.Model):
 
 
 class DocumentDetails(models.Model):
-    """Document details extracted from conversation."""
+    """
+    Document details extracted from conversation.
+
+    Kept up to date per session as messages arrive (see ai_agent.details);
+    ``scanned_messages`` is how many of the session's messages have been read.
+    """
     
     document = models.OneToOneField(
         Document,
         on_delete=models.CASCADE,
-        related_name='details'
+        related_name='details',
+        null=True,
+        blank=True
+    )
+    session = models.OneToOneField(
+        'chat_sessions.Session',
+        on_delete=models.CASCADE,
+        related_name='details',
+        null=True,
+        blank=True
     )
     details = models.JSONField(default=dict)
+    confidence = models.JSONField(default=dict, blank=True)
+    provenance = models.JSONField(default=dict, blank=True)
+    scanned_messages = models.PositiveIntegerField(default=0)
     verified = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -43,4 +60,6 @@ class DocumentDetails(models.Model):
         verbose_name_plural = 'Document Details'
     
     def __str__(self):
-        return f"Details for {self.document.document_type}"
+        if self.document_id:
+            return f"Details for {self.document.document_type}"
+        return f"Details for session {self.session_id}"
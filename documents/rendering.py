@@ -0,0 +1,128 @@
+"""
+Process pool for DOCX/PDF rendering.
+
+Rendering is CPU-bound, so it runs in worker processes instead of the request
+thread. The number of queued plus running jobs is bounded; when the pool is
+saturated, submission fails fast with RenderQueueFull and the view answers
+503 with Retry-After instead of piling up work.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from django.conf import settings
+
+from modules.utils import render_document
+
+
+class RenderQueueFull(Exception):
+    """Raised when the render pool already holds its maximum number of jobs."""
+
+
+class RenderTimeout(Exception):
+    """Raised when a render job does not finish within the timeout."""
+
+
+class RenderService:
+    """
+    Bounded ``ProcessPoolExecutor`` for rendering jobs.
+
+    Args:
+        max_workers (int): Worker processes.
+        max_pending (int): Jobs allowed to wait for a free worker.
+        timeout (float): Default seconds to wait for a job.
+    """
+
+    def __init__(self, max_workers=2, max_pending=8, timeout=30.0):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # Spawned workers import only the renderers, never the server
+                # process's threads and connections.
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn')
+                )
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, fn, *args):
+        """Queue ``fn(*args)`` in a worker process; raises RenderQueueFull when saturated."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise RenderQueueFull("Document rendering is at capacity")
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the job really ends, even if the caller timed out.
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _timed_out(self, future):
+        future.cancel()  # Only stops jobs that have not started yet
+        with self._lock:
+            self.timed_out += 1
+        return RenderTimeout("Document rendering timed out")
+
+    def render(self, file_format, content, timeout=None):
+        """Render ``content`` as ``file_format`` bytes, waiting up to ``timeout`` seconds."""
+        future = self.submit(render_document, file_format, content)
+        try:
+            return future.result(timeout=timeout or self.timeout)
+        except TimeoutError:
+            raise self._timed_out(future)
+
+    async def arender(self, file_format, content, timeout=None):
+        """Async variant of render that awaits the worker without blocking the event loop."""
+        future = self.submit(render_document, file_format, content)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout or self.timeout)
+        except asyncio.TimeoutError:
+            raise self._timed_out(future)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_render_service = None
+_render_service_lock = threading.Lock()
+
+
+def get_render_service():
+    """Process-wide render service sized by the RENDER_* settings."""
+    global _render_service
+    with _render_service_lock:
+        if _render_service is None:
+            _render_service = RenderService(
+                max_workers=settings.RENDER_WORKERS,
+                max_pending=settings.RENDER_QUEUE_SIZE,
+                timeout=settings.RENDER_TIMEOUT,
+            )
+        return _render_service
@@ -0,0 +1,158 @@
+"""
+Rendition store for document downloads.
+
+Rendered DOCX/PDF files are kept on disk under
+``MEDIA_ROOT/renditions/<document id>/<content hash>.<format>``. The content
+hash covers everything the renderer reads, so a changed draft simply gets new
+file names; stale renditions are pruned when the document is saved.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+
+from modules.formatting import FormatterCache
+from .rendering import RenderQueueFull, get_render_service
+
+logger = logging.getLogger(__name__)
+
+# Bump when the renderers change output, so old renditions are not served.
+RENDITION_VERSION = 3
+
+RENDITION_CONTENT_TYPES = {
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    'pdf': 'application/pdf',
+}
+
+_prerender_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rendition')
+formatter_cache = FormatterCache(settings.DOCUMENT_FORMATTER_CACHE_SIZE)
+# Per-rendition locks so concurrent downloads of a cold file render it once.
+_render_locks = {}
+_render_locks_guard = threading.Lock()
+
+
+def content_hash(document):
+    """Hash of the rendered inputs (content, formatted content, renderer version)."""
+    digest = hashlib.sha256(f"v{RENDITION_VERSION}\0".encode())
+    digest.update(document.content.encode())
+    digest.update(b'\0')
+    digest.update((document.formatted_content or '').encode())
+    return digest.hexdigest()[:32]
+
+
+def get_etag(document, file_format):
+    return f'"{content_hash(document)}-{file_format}"'
+
+
+def format_document(document):
+    """
+    The formatted draft, as format_document_content would return it; only the
+    lines edited since this document was last formatted are re-classified.
+    """
+    return formatter_cache.format(document.pk, document.content)
+
+
+def render_source(document):
+    """Text the renderers receive: the stored formatted content, else the formatted draft."""
+    return document.formatted_content or format_document(document)
+
+
+class RenditionStore:
+    """Disk store of rendered documents keyed by (document id, content hash, format)."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def _directory(self, document_id):
+        return self.root / str(document_id)
+
+    def path_for(self, document, file_format):
+        return self._directory(document.id) / f"{content_hash(document)}.{file_format}"
+
+    def get(self, document, file_format):
+        """Path of an existing rendition, or None."""
+        path = self.path_for(document, file_format)
+        return path if path.exists() else None
+
+    def get_or_render(self, document, file_format):
+        """
+        Return the rendition path, rendering it in the render pool if needed.
+
+        Raises RenderQueueFull or RenderTimeout when the pool cannot take the job.
+
+        Args:
+            document (Document): Document to render.
+            file_format (str): 'docx' or 'pdf'.
+
+        Returns:
+            Path: Path of the rendered file.
+        """
+        path = self.path_for(document, file_format)
+        if path.exists():
+            return path
+
+        with _render_locks_guard:
+            lock = _render_locks.setdefault(str(path), threading.Lock())
+        try:
+            with lock:
+                if not path.exists():
+                    self._write(path, get_render_service().render(file_format, render_source(document)))
+        finally:
+            # Also after RenderTimeout / RenderQueueFull, or the entry leaks
+            with _render_locks_guard:
+                _render_locks.pop(str(path), None)
+        return path
+
+    def _write(self, path, data):
+        # Write to a temp file and rename, so readers never see a partial file.
+        path.parent.mkdir(parents=True, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=path.parent, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def invalidate(self, document, keep_current=True):
+        """Delete renditions of ``document`` (except those of its current content)."""
+        directory = self._directory(document.id)
+        if not directory.exists():
+            return
+        current = content_hash(document) if keep_current else None
+        for path in directory.iterdir():
+            # In-flight renders (*.tmp) are left to finish their rename.
+            if path.suffix != '.tmp' and path.stem != current:
+                path.unlink(missing_ok=True)
+
+    def delete(self, document_id):
+        shutil.rmtree(self._directory(document_id), ignore_errors=True)
+
+
+def get_rendition_store():
+    return RenditionStore(Path(settings.MEDIA_ROOT) / 'renditions')
+
+
+def prerender(document):
+    """Render every format of ``document`` in the background."""
+    def run():
+        store = get_rendition_store()
+        for file_format in RENDITION_CONTENT_TYPES:
+            try:
+                store.get_or_render(document, file_format)
+            except RenderQueueFull:
+                # Downloads take priority; this one renders on first request.
+                logger.info("Render pool busy, skipped pre-rendering document %s", document.id)
+                return
+            except Exception:
+                logger.exception("Pre-rendering %s for document %s failed", file_format, document.id)
+
+    return _prerender_executor.submit(run)
@@ -13,4 +13,8 @@ class DocumentDetailsSerializer(serializers.ModelSerializer):
     """Serializer for the DocumentDetails model."""
     class Meta:
         model = DocumentDetails
-        fields = ['id', 'document', 'details', 'verified', 'created_at', 'updated_at']
\ No newline at end of file
+        fields = [
+            'id', 'document', 'session', 'details', 'confidence', 'provenance',
+            'scanned_messages', 'verified', 'created_at', 'updated_at',
+        ]
+        read_only_fields = ['confidence', 'provenance', 'scanned_messages']
\ No newline at end of file
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Document
+from .renditions import get_rendition_store, prerender
+
+
+@receiver(post_save, sender=Document)
+def refresh_renditions(sender, instance, **kwargs):
+    """Drop renditions of older content and pre-render the new draft once saved."""
+    def refresh():
+        get_rendition_store().invalidate(instance)
+        if settings.RENDITION_PRERENDER and instance.content:
+            prerender(instance)
+
+    transaction.on_commit(refresh)
+
+
+@receiver(post_delete, sender=Document)
+def delete_renditions(sender, instance, **kwargs):
+    document_id = instance.id
+    transaction.on_commit(lambda: get_rendition_store().delete(document_id))
@@ -1,3 +1,258 @@
-from django.test import TestCase
+import asyncio
+import re
+import io
+import tempfile
+import time
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+
+from chat_sessions.models import Session
+from docx import Document as DocxDocument
+
+from modules.draft_parser import block_text, parse_draft
+from modules.formatting import IncrementalFormatter, format_document_content
+from modules.utils import create_docx, render_document
+from .models import Document
+from .rendering import RenderQueueFull, RenderService, RenderTimeout
+from .renditions import _prerender_executor, _render_locks, formatter_cache, get_rendition_store
+
+
+class RenditionDownloadTests(TestCase):
+    """Tests for cached, ETag-validated document downloads."""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        self.settings_override = override_settings(MEDIA_ROOT=self.media.name, RENDITION_PRERENDER=False)
+        self.settings_override.enable()
+        user = get_user_model().objects.create_user(
+            username='reviewer', email='reviewer@example.com', password='secret'
+        )
+        session = Session.objects.create(user=user, title='Lease')
+        self.document = Document.objects.create(
+            session=session, document_type='Lease Agreement', content='LEASE AGREEMENT\nRent is $2,000.'
+        )
+        self.url = f'/api/documents/{self.document.id}/download/docx/'
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.media.cleanup()
+
+    def test_repeat_downloads_are_served_from_the_store(self):
+        with patch('documents.renditions.get_render_service') as get_service:
+            renderer = get_service.return_value.render
+            renderer.return_value = render_document('docx', self.document.content)
+            first = self.client.get(self.url)
+            second = self.client.get(self.url)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(b''.join(first.streaming_content), b''.join(second.streaming_content))
+        self.assertEqual(first['ETag'], second['ETag'])
+        self.assertIn('attachment', first['Content-Disposition'])
+        self.assertEqual(renderer.call_count, 1)
+
+    def test_if_none_match_returns_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_content_change_invalidates_renditions(self):
+        etag = self.client.get(self.url)['ETag']
+        old_path = get_rendition_store().path_for(self.document, 'docx')
+
+        self.document.content = 'LEASE AGREEMENT\nRent is $2,500.'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.document.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertFalse(old_path.exists())
+
+    def test_saved_draft_is_prerendered(self):
+        self.document.content = 'LEASE AGREEMENT\nRent is $2,500.'
+        with override_settings(RENDITION_PRERENDER=True), self.captureOnCommitCallbacks(execute=True):
+            self.document.save()
+        # The pre-render pool has one worker, so this runs after the pre-render job.
+        _prerender_executor.submit(lambda: None).result(timeout=30)
+
+        store = get_rendition_store()
+        self.assertIsNotNone(store.get(self.document, 'docx'))
+        self.assertIsNotNone(store.get(self.document, 'pdf'))
+
+    def test_saturated_render_pool_returns_503_with_retry_after(self):
+        with patch('documents.renditions.get_render_service') as get_service:
+            get_service.return_value.render.side_effect = RenderQueueFull('Document rendering is at capacity')
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '5')
+        self.assertNotIn(str(get_rendition_store().path_for(self.document, 'docx')), _render_locks)
+
+
+class RenderServiceTests(TestCase):
+    """Tests for the bounded rendering process pool."""
+
+    def setUp(self):
+        self.service = RenderService(max_workers=1, max_pending=1, timeout=30)
+
+    def tearDown(self):
+        self.service.shutdown()
+
+    def test_renders_in_a_worker_process(self):
+        data = self.service.render('pdf', 'LEASE AGREEMENT\nRent is $2,000.')
+
+        self.assertTrue(data.startswith(b'%PDF'))
+
+    def test_rejects_jobs_beyond_the_queue_bound(self):
+        running = self.service.submit(time.sleep, 1)
+        waiting = self.service.submit(time.sleep, 0)
+
+        with self.assertRaises(RenderQueueFull):
+            self.service.submit(time.sleep, 0)
+        self.assertEqual(self.service.stats()['rejected'], 1)
+
+        running.result(timeout=30)
+        waiting.result(timeout=30)
+        self.service.submit(time.sleep, 0).result(timeout=30)
+
+    def test_arender_times_out_without_blocking_the_loop(self):
+        self.service.submit(time.sleep, 2)
+
+        async def render_with_heartbeat():
+            ticks = 0
+
+            async def heartbeat():
+                nonlocal ticks
+                while True:
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+
+            beat = asyncio.create_task(heartbeat())
+            try:
+                with self.assertRaises(RenderTimeout):
+                    await self.service.arender('docx', 'LEASE AGREEMENT', timeout=0.3)
+            finally:
+                beat.cancel()
+            return ticks
+
+        self.assertGreater(asyncio.run(render_with_heartbeat()), 5)
+        self.assertEqual(self.service.stats()['timed_out'], 1)
+
+
+SAMPLE_DRAFT = """**PROPERTY TRANSFER AGREEMENT**
+
+**THIS AGREEMENT** is made on **October 15, 2023**, by and between:
+
+**1. TRANSFEROR (Father):**
+- Full Name: **John Michael Smith**
+
+### **2. TRANSFER TERMS**
+
+1. The Transferor agrees to transfer the property.
+2. The transfer shall be **unconditional**.
+(a) Taxes are paid by the Transferee.
+1. A new list starts here.
+"""
+
+
+class DocxExportTests(TestCase):
+    """Tests for the draft parser and the structure-aware DOCX builder."""
+
+    def test_parser_recognises_draft_structure(self):
+        blocks = list(parse_draft(SAMPLE_DRAFT))
+
+        self.assertEqual([b.kind for b in blocks], [
+            'heading', 'paragraph', 'heading', 'bullet', 'heading',
+            'numbered', 'numbered', 'numbered', 'numbered',
+        ])
+        self.assertEqual(block_text(blocks[0]), 'PROPERTY TRANSFER AGREEMENT')
+        self.assertEqual(blocks[1].runs[0], ('THIS AGREEMENT', True))
+        self.assertEqual(blocks[7].marker, '(a)')
+        self.assertEqual(blocks[7].level, 2)
+
+    def test_docx_keeps_headings_lists_and_bold_runs(self):
+        document = DocxDocument(io.BytesIO(create_docx(SAMPLE_DRAFT).getvalue()))
+        paragraphs = document.paragraphs
+
+        self.assertEqual([p.style.name for p in paragraphs], [
+            'Title', 'Normal', 'Heading 1', 'List Bullet', 'Heading 2',
+            'List Number', 'List Number', 'List Continue 2', 'List Number',
+        ])
+        self.assertEqual(paragraphs[5].text, 'The Transferor agrees to transfer the property.')
+        self.assertEqual([r.bold for r in paragraphs[6].runs], [None, True, None])
+        self.assertEqual(paragraphs[7].text, '(a) Taxes are paid by the Transferee.')
+
+        num_ids = [p._p.pPr.numPr.numId.val for p in (paragraphs[5], paragraphs[6], paragraphs[8])]
+        self.assertEqual(num_ids[0], num_ids[1])
+        self.assertNotEqual(num_ids[1], num_ids[2], 'a list restarting at 1 gets its own numbering')
+
+
+class PdfExportTests(TestCase):
+    def test_pdf_embeds_unicode_font_instead_of_replacing_characters(self):
+        draft = SAMPLE_DRAFT + '\n\nLe locataire doit payer le loyer « à temps » — c’est l’été.\n'
+        data = render_document('pdf', draft)
+
+        self.assertTrue(data.startswith(b'%PDF'))
+        self.assertIn(b'DejaVuSerif', data)
+        self.assertIn(b'DejaVuSerifBold', data)
+        # The ToUnicode maps keep the text searchable and copyable.
+        cmaps = b''.join(re.findall(rb'beginbfchar(.*?)endbfchar', data, re.S))
+        for char in 'é«—’':
+            self.assertIn(f'<{ord(char):04X}>'.encode(), cmaps)
+
+    def test_pdf_output_is_stable_across_documents(self):
+        # Fonts are parsed once per process; each document must still embed its own subset.
+        def render(text):
+            # The creation date, and the file /ID derived from it, change with the clock
+            data = render_document('pdf', text)
+            return re.sub(rb'/ID \[<\w+><\w+>\]', b'', re.sub(rb'/CreationDate \(D:\d+Z\)', b'', data))
+
+        first = render('Clause é')
+        render(SAMPLE_DRAFT)
+        self.assertEqual(render('Clause é'), first)
+
+
+class FormatDocumentContentTests(TestCase):
+    def test_numbers_headings_and_indents_paragraphs(self):
+        draft = "  Agreement\nThis agreement is made.\n\n\n \nterms\nPayment due:\nMonthly rent.  \n\n"
+        self.assertEqual(format_document_content(draft), (
+            "1. AGREEMENT\n\n    This agreement is made.\n\n    \n\n"
+            "2. TERMS\n\n3. PAYMENT DUE:\n\n    Monthly rent.\n"
+        ))
+        self.assertEqual(format_document_content(""), "\n")
+
+    def test_incremental_update_matches_full_format(self):
+        draft = "Parties\nA and B.\n\nTerms\nOne year.\n\nTermination\nOn notice."
+        formatter = IncrementalFormatter(draft)
+        self.assertEqual(formatter.formatted, format_document_content(draft))
+
+        edited = draft.replace("A and B.", "Confidentiality\nA and B.")
+        self.assertEqual(formatter.update(edited), format_document_content(edited))
+        self.assertIn("4. TERMINATION", formatter.formatted)
+        self.assertEqual(formatter.changed, [(1, 2)])
+
+        self.assertEqual(formatter.update(draft), format_document_content(draft))
+        self.assertEqual(formatter.changed, [])
+
+    @override_settings(RENDITION_PRERENDER=False)
+    def test_generate_reformats_only_the_edited_lines(self):
+        user = get_user_model().objects.create_user(username='editor', email='editor@example.com', password='secret')
+        draft = "Parties\nA and B.\n\nTerms\nOne year."
+        document = Document.objects.create(session=Session.objects.create(user=user, title='Lease'), content=draft)
+        url = f'/api/documents/{document.pk}/generate/'
+        self.client.force_login(user)
+        self.client.post(url)
+
+        document.content = draft.replace("One year.", "Two years.")
+        document.save()
+        response = self.client.post(url)
+
+        self.assertEqual(response.data['formatted_content'], format_document_content(document.content))
+        self.assertEqual(formatter_cache.get(document.pk).changed, [(4, 5)])
+        document.refresh_from_db()
+        self.assertIn("    Two years.", document.formatted_content)
@@ -1,21 +1,18 @@
-import sys
-from pathlib import Path
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.http import HttpResponse
+from django.conf import settings
+from django.db.models import Q
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils.http import parse_etags
+from authentication.utils import get_request_user
+from chat_sessions.models import Session
 from .models import Document, DocumentDetails
+from .rendering import RenderQueueFull, RenderTimeout
+from .renditions import RENDITION_CONTENT_TYPES, format_document, get_etag, get_rendition_store
 from .serializers import DocumentSerializer, DocumentDetailsSerializer
 
-# Add modules to path for import
-BASE_DIR = Path(__file__).resolve().parent.parent
-if str(BASE_DIR) not in sys.path:
-    sys.path.insert(0, str(BASE_DIR))
-
-from modules.utils import create_docx, create_pdf
-from modules.ui import format_document_content
-
 
 class DocumentViewSet(viewsets.ModelViewSet):
     """ViewSet for managing documents."""
@@ -24,9 +21,9 @@ class DocumentViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]  # Allow access without authentication for testing
 
     def get_queryset(self):
-        # For testing, return all documents. In production, filter by user
-        return self.queryset.all()
-        # return self.queryset.filter(session__user=self.request.user)
+        # Walks the user's sessions by the (user, -updated_at) index and
+        # joins each document by its session, so no sort is needed
+        return self.queryset.filter(session__user=get_request_user(self.request)).order_by('-session__updated_at')
 
     def perform_create(self, serializer):
         serializer.save()
@@ -40,8 +37,8 @@ class DocumentViewSet(viewsets.ModelViewSet):
         """
         document = self.get_object()
         try:
-            # Format the document content using existing utility
-            formatted_content = format_document_content(document.content)
+            # Reformats only the lines edited since the last generate
+            formatted_content = format_document(document)
             document.formatted_content = formatted_content
             document.save()
             
@@ -54,42 +51,47 @@ class DocumentViewSet(viewsets.ModelViewSet):
                 'error': f'Error generating document: {str(e)}'
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-    @action(detail=True, methods=['get'])
-    def download(self, request, pk=None):
+    @action(detail=True, methods=['get'], url_path=r'download(?:/(?P<file_format>[a-z]+))?')
+    def download(self, request, pk=None, file_format=None):
         """
         Download document in specified format.
         
         GET /api/sessions/{session_id}/document/download/{format}/
+
+        Served from the rendition store; send If-None-Match with the last
+        ETag to get 304 Not Modified while the content is unchanged.
         """
         document = self.get_object()
-        file_format = request.query_params.get('format', 'docx').lower()
+        file_format = (file_format or request.query_params.get('format', 'docx')).lower()
         
         if file_format not in ['docx', 'pdf']:
             return Response({
                 'error': 'Invalid format. Use "docx" or "pdf"'
             }, status=status.HTTP_400_BAD_REQUEST)
         
+        etag = get_etag(document, file_format)
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+            response['ETag'] = etag
+            return response
+
         try:
-            # Use formatted content if available, otherwise format the content
-            content = document.formatted_content or format_document_content(document.content)
-            
-            if file_format == 'docx':
-                buffer = create_docx(content)
-                response = HttpResponse(
-                    buffer.getvalue(),
-                    content_type='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-                )
-                response['Content-Disposition'] = f'attachment; filename="legal_document_{document.id}.docx"'
-            else:  # pdf
-                buffer = create_pdf(content)
-                response = HttpResponse(
-                    buffer.getvalue(),
-                    content_type='application/pdf'
-                )
-                response['Content-Disposition'] = f'attachment; filename="legal_document_{document.id}.pdf"'
-            
+            path = get_rendition_store().get_or_render(document, file_format)
+            response = FileResponse(
+                open(path, 'rb'),
+                as_attachment=True,
+                filename=f'legal_document_{document.id}.{file_format}',
+                content_type=RENDITION_CONTENT_TYPES[file_format],
+            )
+            response['ETag'] = etag
+            response['Cache-Control'] = 'private, no-cache'
+            return response
+
+        except (RenderQueueFull, RenderTimeout) as e:
+            # Back-pressure: ask the client to retry instead of queueing more work
+            response = Response({'error': str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+            response['Retry-After'] = str(settings.RENDER_RETRY_AFTER)
             return response
-            
         except Exception as e:
             return Response({
                 'error': f'Error generating {file_format.upper()} file: {str(e)}'
@@ -103,9 +105,13 @@ class DocumentDetailsViewSet(viewsets.ModelViewSet):
     permission_classes = [AllowAny]  # Allow access without authentication for testing
 
     def get_queryset(self):
-        # For testing, return all document details. In production, filter by user
-        return self.queryset.all()
-        # return self.queryset.filter(document__session__user=self.request.user)
+        # Details are linked to a session, a document, or both; each branch of
+        # the OR is answered from the unique session/document indexes
+        user = get_request_user(self.request)
+        return self.queryset.filter(
+            Q(session__in=Session.objects.filter(user=user).values('pk'))
+            | Q(document__in=Document.objects.filter(session__user=user).values('pk'))
+        ).order_by('-updated_at')
 
     def perform_create(self, serializer):
         serializer.save()
\ No newline at end of file
@@ -23,7 +23,7 @@ export const useSessions = () => {
     setLoading(true);
     setError(null);
     try {
-      const response = await apiClient.getSessions();
+      const response = await apiClient.getSessionSummaries();
       setSessions(response.results || []);
     } catch (err) {
       setError(err instanceof Error ? err.message : 'Failed to fetch sessions');
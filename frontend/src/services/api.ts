@@ -21,6 +21,12 @@ export interface Session {
   user?: string;
 }
 
+export interface SessionSummary extends Session {
+  message_count: number;
+  last_message: { role: 'user' | 'assistant'; preview: string; created_at: string } | null;
+  document: { id: string; document_type: string; updated_at: string } | null;
+}
+
 export interface Document {
   id: string;
   session: string;
@@ -152,6 +158,11 @@ class APIClient {
     return this.request<{ results: Session[] }>('/api/sessions/');
   }
 
+  // Sessions with message count, last message and document, in one request
+  async getSessionSummaries(): Promise<{ results: SessionSummary[]; next: string | null }> {
+    return this.request<{ results: SessionSummary[]; next: string | null }>('/api/sessions/summary/');
+  }
+
   async getSession(id: string): Promise<Session> {
     return this.request<Session>(`/api/sessions/${id}/`);
   }
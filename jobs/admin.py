@@ -0,0 +1,18 @@
+from django.contrib import admin
+from .models import Batch, Job
+
+
+@admin.register(Batch)
+class BatchAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'user', 'status', 'created_at']
+    list_filter = ['status']
+    list_select_related = ['user']
+    raw_id_fields = ['user']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'user', 'kind', 'status', 'priority', 'attempts', 'run_after']
+    list_filter = ['status', 'kind']
+    list_select_related = ['user']
+    raw_id_fields = ['user', 'batch', 'document']
@@ -0,0 +1,144 @@
+"""
+Job handlers by kind.
+
+A handler takes a claimed jobs.Job and returns a JSON-serializable result;
+raising marks the attempt failed (and retried, see jobs.queue.fail_job).
+Handlers do their slow work (model calls, rendering) before opening a
+transaction, so the database is never locked for the length of a model call,
+and are safe to run again after a failed or abandoned attempt.
+"""
+
+import threading
+
+from django.db import transaction
+
+from ai_agent.services import (
+    draft_batch_document,
+    generate_legal_document,
+    generate_session_turn,
+    refine_legal_document,
+    research_batch,
+)
+from ai_agent.streaming import DRAFT_MARKER
+from chat.models import Message
+from chat_sessions.models import Session
+from documents.models import Document
+from documents.renditions import get_etag, get_rendition_store
+from modules.formatting import format_document_content
+from .models import Batch, Job
+
+JOB_HANDLERS = {}
+
+_research_locks = {}
+_research_locks_guard = threading.Lock()
+
+
+def handler(kind):
+    def register(function):
+        JOB_HANDLERS[kind] = function
+        return function
+    return register
+
+
+def recorded_turn(job):
+    """
+    The result of a session turn an earlier attempt of ``job`` already saved
+    (its lease expired or its completion was lost), or None.
+    """
+    prompt = Message.objects.filter(
+        session_id=job.payload['session_id'], role='user', metadata__job=str(job.pk)
+    ).first()
+    if prompt is None:
+        return None
+    reply = (Message.objects.filter(session_id=prompt.session_id, created_at__gt=prompt.created_at)
+             .order_by('created_at', 'id').first())
+    document = Document.objects.filter(session_id=prompt.session_id).first()
+    drafted = reply is not None and bool(reply.metadata.get('draft_complete') or reply.metadata.get('draft_updated'))
+    if drafted and document is not None:
+        result = f"{DRAFT_MARKER} {document.content}"
+    else:
+        result = reply.content if reply is not None else ''
+    return {
+        'result': result,
+        'metadata': {'recorded': True},
+        'messages': [str(prompt.id)] + ([str(reply.id)] if reply is not None else []),
+        'document': str(document.id) if drafted and document is not None else None,
+    }
+
+
+@handler('generate')
+def run_generate(job):
+    """payload: {"prompt", "conversation_history"} or {"prompt", "session_id"}"""
+    payload = job.payload
+    if payload.get('session_id'):
+        # A retry must not add the turn to the session a second time
+        recorded = recorded_turn(job)
+        if recorded is not None:
+            return recorded
+        turn = generate_session_turn(payload['session_id'], payload['prompt'], job_id=str(job.pk))
+        return {
+            'result': turn['result'],
+            'metadata': turn['metadata'],
+            'messages': [str(turn['user_message'].id), str(turn['assistant_message'].id)],
+            'document': str(turn['document'].id) if turn['document'] else None,
+        }
+    return generate_legal_document(payload['prompt'], payload.get('conversation_history'))
+
+
+@handler('refine')
+def run_refine(job):
+    """payload: {"current_draft", "user_request"}"""
+    return refine_legal_document(job.payload['current_draft'], job.payload['user_request'])
+
+
+@handler('render')
+def run_render(job):
+    """payload: {"document_id", "format"}; the rendition lands in the rendition store."""
+    document = Document.objects.get(pk=job.payload['document_id'])
+    file_format = job.payload['format']
+    get_rendition_store().get_or_render(document, file_format)
+    return {
+        'document': str(document.id),
+        'format': file_format,
+        'etag': get_etag(document, file_format),
+        'download_url': f'/api/documents/{document.id}/download/{file_format}/',
+    }
+
+
+def get_batch_research(batch_id):
+    """The batch's research, running Legal_Web_Search the first time only."""
+    with _research_locks_guard:
+        lock = _research_locks.setdefault(batch_id, threading.Lock())
+    with lock:
+        batch = Batch.objects.get(pk=batch_id)
+        if not batch.researched:
+            batch.research = research_batch(batch.document_type, batch.instructions)
+            batch.researched = True
+            batch.save(update_fields=['research', 'researched', 'updated_at'])
+    with _research_locks_guard:
+        _research_locks.pop(batch_id, None)
+    return batch.research
+
+
+@handler('batch_document')
+def run_batch_document(job):
+    """One document of a jobs.Batch; payload is the record of party details."""
+    batch = job.batch
+    if job.document_id is None:
+        research = get_batch_research(batch.pk)
+        draft = draft_batch_document(batch.document_type, job.payload, batch.instructions, research)
+        with transaction.atomic():
+            session = Session.objects.create(
+                user_id=batch.user_id,
+                title=f"{batch.document_type} #{job.position + 1}",
+                status='reviewing',
+            )
+            job.document = Document.objects.create(
+                session=session,
+                document_type=batch.document_type,
+                content=draft,
+                formatted_content=format_document_content(draft),
+            )
+            # Linked at once, so a retry after a lost completion does not draft it again.
+            Job.objects.filter(pk=job.pk).update(document=job.document)
+    return {'document': str(job.document_id)}
@@ -0,0 +1,52 @@
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.queue import default_worker_id
+from jobs.worker import work
+
+
+class Command(BaseCommand):
+    help = "Run job queue workers (generation, refinement, renders and batches) until stopped."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.JOBS_WORKERS,
+                            help="Worker threads (default: JOBS_WORKERS)")
+        parser.add_argument('--poll-interval', type=float, default=settings.JOBS_POLL_INTERVAL,
+                            help="Seconds an idle worker waits before checking again (default: JOBS_POLL_INTERVAL)")
+        parser.add_argument('--once', action='store_true',
+                            help="Exit once no job is queued instead of waiting for more")
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        worker_id = default_worker_id()
+
+        def shutdown(signum, frame):
+            self.stdout.write("Stopping after the jobs in progress...")
+            stop.set()
+
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, shutdown)
+
+        self.stdout.write(f"Starting {options['workers']} job worker(s) as {worker_id}")
+        threads = [
+            threading.Thread(
+                target=work,
+                args=(stop, f"{worker_id}:{n}", options['poll_interval'], options['once']),
+                name=f'jobs-{n}',
+            )
+            for n in range(options['workers'])
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            for thread in threads:
+                while thread.is_alive():
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            shutdown(None, None)
+            for thread in threads:
+                thread.join()
+        self.stdout.write(self.style.SUCCESS("Job workers stopped"))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def set_batch_job_users(apps, schema_editor):
+    Job = apps.get_model('jobs', 'Job')
+    Batch = apps.get_model('jobs', 'Batch')
+    Job.objects.filter(batch__isnull=False).update(
+        user_id=models.Subquery(Batch.objects.filter(pk=models.OuterRef('batch_id')).values('user_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0003_details_provenance'),
+        ('jobs', '0002_durable_jobs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='user',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(set_batch_job_users, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='job',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=255, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['user', '-created_at'], name='jobs_job_user_id_58dc09_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='job',
+            constraint=models.UniqueConstraint(fields=('user', 'idempotency_key'), name='unique_job_idempotency_key_per_user'),
+        ),
+    ]
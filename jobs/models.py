@@ -0,0 +1,116 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+import uuid
+
+
+class Batch(models.Model):
+    """A batch of documents of one type, drafted from per-party detail records."""
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='batches'
+    )
+    document_type = models.CharField(max_length=100)
+    instructions = models.TextField(blank=True)
+    research = models.TextField(blank=True)
+    researched = models.BooleanField(default=False)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Batch'
+        verbose_name_plural = 'Batches'
+
+    def __str__(self):
+        return f"{self.document_type} batch ({self.status})"
+
+
+class Job(models.Model):
+    """
+    One unit of background work; the rows double as the work queue.
+
+    ``kind`` picks the handler (see jobs.handlers) and ``payload`` is its
+    input; ``user`` is who queued it. Jobs with a higher ``priority`` run
+    first. A failed attempt is re-queued with ``run_after`` pushed back
+    exponentially until ``max_attempts`` is reached. A running job is leased to one worker
+    (``locked_by``) until ``locked_until``, which the worker renews while the
+    job runs; if that worker dies the lease expires and another worker takes
+    the job over.
+    """
+
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    ]
+
+    # Priority lanes: interactive requests overtake renders, which overtake batches.
+    PRIORITY_INTERACTIVE = 20
+    PRIORITY_RENDER = 10
+    PRIORITY_BATCH = 0
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='jobs',
+        null=True,
+        blank=True
+    )
+    kind = models.CharField(max_length=50, default='batch_document')
+    batch = models.ForeignKey(Batch, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    position = models.PositiveIntegerField(null=True, blank=True)
+    payload = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    priority = models.SmallIntegerField(default=PRIORITY_BATCH)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    idempotency_key = models.CharField(max_length=255, null=True, blank=True)
+    locked_by = models.CharField(max_length=64, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    document = models.OneToOneField(
+        'documents.Document',
+        on_delete=models.SET_NULL,
+        related_name='job',
+        null=True,
+        blank=True
+    )
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['batch', 'position', 'created_at']
+        indexes = [
+            models.Index(fields=['status', 'priority', 'run_after']),
+            models.Index(fields=['user', '-created_at']),
+        ]
+        constraints = [
+            # Idempotency keys are chosen by clients, so each user has their own
+            models.UniqueConstraint(fields=['user', 'idempotency_key'], name='unique_job_idempotency_key_per_user'),
+        ]
+        verbose_name = 'Job'
+        verbose_name_plural = 'Jobs'
+
+    def __str__(self):
+        return f"{self.kind} job {self.id} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
@@ -0,0 +1,186 @@
+"""
+Database-backed job queue.
+
+Every jobs.Job row is a queue entry. A worker claims a job with a single
+conditional UPDATE: the row picked by a ``LIMIT 1`` subquery (highest
+priority, then oldest ``run_after``) is switched to ``running`` and stamped
+with a fresh claim token, and the worker then loads the row carrying its
+token. SQLite runs the UPDATE under its write lock, so the select-and-mark is
+atomic and two workers never take the same job, without SELECT ... FOR UPDATE.
+
+Finishing a job is conditional on the claim token too, so a worker whose
+lease expired (and whose job was taken over) cannot overwrite the new
+attempt's outcome.
+"""
+
+import os
+import socket
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from .models import Batch, Job
+
+JOB_STATUSES = [status for status, _ in Job.STATUS_CHOICES]
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused for a different job."""
+
+    def __init__(self, job):
+        super().__init__(f"Idempotency key already used for {job.kind} job {job.pk} with a different payload")
+        self.job = job
+
+
+def _existing_job(user, idempotency_key, kind, payload):
+    job = Job.objects.filter(user=user, idempotency_key=idempotency_key).first()
+    if job is not None and (job.kind != kind or job.payload != payload):
+        raise IdempotencyConflict(job)
+    return job
+
+
+def enqueue(kind, payload, priority=Job.PRIORITY_INTERACTIVE, idempotency_key=None, max_attempts=None, user=None):
+    """
+    Queue a job for ``user``; returns ``(job, created)``.
+
+    With an ``idempotency_key`` the user already used for the same kind and
+    payload, the existing job is returned instead, so a retried request does
+    not run the work twice. Reusing a key for a different job raises
+    IdempotencyConflict.
+    """
+    if idempotency_key:
+        existing = _existing_job(user, idempotency_key, kind, payload)
+        if existing is not None:
+            return existing, False
+    try:
+        with transaction.atomic():
+            job = Job.objects.create(
+                user=user,
+                kind=kind,
+                payload=payload,
+                priority=priority,
+                idempotency_key=idempotency_key or None,
+                max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+            )
+    except IntegrityError:
+        # A concurrent request with the same key won the race.
+        return _existing_job(user, idempotency_key, kind, payload), False
+    return job, True
+
+
+def create_batch(user, document_type, records, instructions=''):
+    """Create a batch and queue one job per detail record."""
+    with transaction.atomic():
+        batch = Batch.objects.create(user=user, document_type=document_type, instructions=instructions)
+        Job.objects.bulk_create([
+            Job(
+                user=user,
+                kind='batch_document',
+                batch=batch,
+                position=position,
+                payload=details,
+                priority=Job.PRIORITY_BATCH,
+                max_attempts=settings.JOBS_MAX_ATTEMPTS,
+            )
+            for position, details in enumerate(records)
+        ])
+    return batch
+
+
+def _claimable(now):
+    # Queued jobs that are due, and running jobs whose worker's lease expired.
+    return Q(status='queued', run_after__lte=now) | Q(status='running', locked_until__lt=now)
+
+
+def claim_next_job(worker_id=None):
+    """Claim the next due job and mark it running; None when nothing is due."""
+    while True:
+        now = timezone.now()
+        token = f"{worker_id or default_worker_id()}:{uuid.uuid4().hex[:8]}"[-64:]
+        candidate = Job.objects.filter(_claimable(now)).order_by('-priority', 'run_after', 'created_at')
+        claimed = Job.objects.filter(_claimable(now), pk__in=candidate.values('pk')[:1]).update(
+            status='running',
+            locked_by=token,
+            locked_until=now + timedelta(seconds=settings.JOBS_LEASE_SECONDS),
+            attempts=F('attempts') + 1,
+            started_at=now,
+        )
+        if claimed:
+            job = Job.objects.select_related('batch').get(locked_by=token)
+            if job.batch_id:
+                Batch.objects.filter(pk=job.batch_id, status='queued').update(status='running', updated_at=now)
+            return job
+        if not Job.objects.filter(_claimable(now)).exists():
+            return None
+        # Another worker took the candidate first; try the next one.
+
+
+def renew_lease(job):
+    """Extend a running job's lease by JOBS_LEASE_SECONDS; False if the lease was lost."""
+    return bool(Job.objects.filter(pk=job.pk, locked_by=job.locked_by, status='running').update(
+        locked_until=timezone.now() + timedelta(seconds=settings.JOBS_LEASE_SECONDS),
+    ))
+
+
+def next_due_at():
+    """When the earliest queued job becomes due (None if the queue is empty)."""
+    return Job.objects.filter(status='queued').aggregate(due=Min('run_after'))['due']
+
+
+def retry_delay(attempts):
+    """Exponential backoff: JOBS_RETRY_BASE_DELAY doubled per attempt, capped at JOBS_RETRY_MAX_DELAY."""
+    return min(settings.JOBS_RETRY_BASE_DELAY * 2 ** max(attempts - 1, 0), settings.JOBS_RETRY_MAX_DELAY)
+
+
+def complete_job(job, result=None):
+    """Record a successful attempt; False if the job's lease was lost meanwhile."""
+    return bool(Job.objects.filter(pk=job.pk, locked_by=job.locked_by, status='running').update(
+        status='succeeded', result=result, document=job.document, error='',
+        locked_until=None, finished_at=timezone.now(),
+    ))
+
+
+def fail_job(job, error):
+    """
+    Record a failed attempt: re-queue it with backoff, or fail it for good
+    once ``max_attempts`` is used up. Returns the new status (None if the
+    job's lease was lost meanwhile).
+    """
+    now = timezone.now()
+    if job.attempts < job.max_attempts:
+        fields = {'status': 'queued', 'run_after': now + timedelta(seconds=retry_delay(job.attempts))}
+    else:
+        fields = {'status': 'failed', 'finished_at': now}
+    updated = Job.objects.filter(pk=job.pk, locked_by=job.locked_by, status='running').update(
+        error=error, locked_until=None, **fields
+    )
+    return fields['status'] if updated else None
+
+
+def get_progress(batch_id):
+    """Job counts per status, with ``total`` and ``done`` (succeeded + failed)."""
+    counts = dict.fromkeys(JOB_STATUSES, 0)
+    rows = Job.objects.filter(batch_id=batch_id).values('status').annotate(count=Count('pk')).order_by()
+    for row in rows:
+        counts[row['status']] = row['count']
+    counts['total'] = sum(counts[status] for status in JOB_STATUSES)
+    counts['done'] = counts['succeeded'] + counts['failed']
+    return counts
+
+
+def finish_batch(batch_id):
+    """Mark the batch completed (or failed, if nothing succeeded) once no job is left to run."""
+    progress = get_progress(batch_id)
+    if progress['done'] < progress['total']:
+        return False
+    status = 'completed' if progress['succeeded'] else 'failed'
+    Batch.objects.filter(pk=batch_id).exclude(status=status).update(status=status, updated_at=timezone.now())
+    return True
@@ -0,0 +1,102 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+from authentication.utils import get_request_user
+from chat_sessions.models import Session
+from documents.models import Document
+from documents.renditions import RENDITION_CONTENT_TYPES
+from .models import Batch, Job
+from .queue import get_progress
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for the Job model."""
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'batch', 'position', 'payload', 'result', 'status', 'priority',
+            'attempts', 'max_attempts', 'run_after', 'document', 'error',
+            'created_at', 'started_at', 'finished_at',
+        ]
+
+
+def owned(queryset, pk):
+    """Whether ``pk`` (from a job payload, so possibly malformed) is in ``queryset``."""
+    try:
+        return queryset.filter(pk=pk).exists()
+    except (DjangoValidationError, ValueError, TypeError):
+        return False
+
+
+class JobCreateSerializer(serializers.Serializer):
+    """Request body of POST /api/jobs/; needs the request in its context."""
+    KIND_PRIORITIES = {
+        'generate': Job.PRIORITY_INTERACTIVE,
+        'refine': Job.PRIORITY_INTERACTIVE,
+        'render': Job.PRIORITY_RENDER,
+    }
+
+    kind = serializers.ChoiceField(choices=list(KIND_PRIORITIES))
+    payload = serializers.DictField()
+    idempotency_key = serializers.CharField(max_length=255, required=False, allow_blank=True, default='')
+
+    def validate(self, data):
+        payload = data['payload']
+        required = {
+            'generate': ['prompt'],
+            'refine': ['current_draft', 'user_request'],
+            'render': ['document_id', 'format'],
+        }[data['kind']]
+        missing = [field for field in required if not payload.get(field)]
+        if missing:
+            raise serializers.ValidationError({'payload': f"Missing: {', '.join(missing)}"})
+        user = get_request_user(self.context['request'])
+        if data['kind'] == 'generate' and payload.get('session_id'):
+            if not owned(Session.objects.filter(user=user), payload['session_id']):
+                raise serializers.ValidationError({'payload': 'Session not found.'})
+        if data['kind'] == 'render':
+            if payload['format'] not in RENDITION_CONTENT_TYPES:
+                raise serializers.ValidationError({'payload': f"Unsupported format: {payload['format']}"})
+            if not owned(Document.objects.filter(session__user=user), payload['document_id']):
+                raise serializers.ValidationError({'payload': 'Document not found.'})
+        data['priority'] = self.KIND_PRIORITIES[data['kind']]
+        return data
+
+
+class BatchSerializer(serializers.ModelSerializer):
+    """Serializer for the Batch model, with job counts per status."""
+    progress = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Batch
+        fields = ['id', 'document_type', 'instructions', 'status', 'progress', 'created_at', 'updated_at']
+
+    def get_progress(self, batch):
+        return get_progress(batch.pk)
+
+
+class BatchDetailSerializer(BatchSerializer):
+    """Batch with its jobs."""
+    jobs = JobSerializer(many=True, read_only=True)
+
+    class Meta(BatchSerializer.Meta):
+        fields = BatchSerializer.Meta.fields + ['jobs']
+
+
+class BatchCreateSerializer(serializers.Serializer):
+    """Request body of POST /api/batches/."""
+    document_type = serializers.CharField(max_length=100)
+    instructions = serializers.CharField(required=False, allow_blank=True, default='')
+    records = serializers.ListField(
+        child=serializers.DictField(),
+        allow_empty=False,
+    )
+
+    def validate_records(self, records):
+        if len(records) > settings.JOBS_MAX_BATCH_SIZE:
+            raise serializers.ValidationError(
+                f'A batch can have at most {settings.JOBS_MAX_BATCH_SIZE} records.'
+            )
+        if not all(records):
+            raise serializers.ValidationError('Every record needs at least one detail.')
+        return records
@@ -0,0 +1,285 @@
+import json
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+
+from chat.models import Message
+from chat_sessions.models import Session
+from documents.models import Document
+from .handlers import run_generate
+from .models import Batch, Job
+from .queue import claim_next_job, create_batch, enqueue, get_progress
+from .worker import run_job, run_pending
+
+RECORDS = [
+    {'tenant': 'Jane Doe', 'unit': '101'},
+    {'tenant': 'John Roe', 'unit': '102'},
+    {'tenant': 'Ann Poe', 'unit': '103'},
+]
+
+
+@override_settings(OPENROUTER_API_KEY='test-key', JOBS_AUTOSTART=False, RENDITION_PRERENDER=False)
+class BatchGenerationTests(TestCase):
+    """Tests for POST /api/batches/ and the local job queue."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='paralegal', email='paralegal@example.com', password='testpass123'
+        )
+
+    def post_batch(self, **payload):
+        body = {'document_type': 'Residential Lease', 'records': RECORDS, **payload}
+        return self.client.post('/api/batches/', body, content_type='application/json')
+
+    def run_batch(self, replies):
+        llm = GenericFakeChatModel(messages=iter(replies))
+        with patch('ai_agent.services.get_chat_model', return_value=llm), \
+                patch('jobs.handlers.research_batch', return_value='RTA, 2006 s. 12') as research:
+            ran = run_pending()
+        return ran, research
+
+    def test_batch_drafts_one_document_per_record(self):
+        response = self.post_batch(instructions='Leases at 100 Main Street, Toronto, Ontario.')
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['progress']['queued'], 3)
+        batch_id = response.data['id']
+
+        replies = [AIMessage(content=f'LEASE AGREEMENT\n\nUnit {unit}') for unit in ('101', '102', '103')]
+        ran, research = self.run_batch(replies)
+
+        self.assertEqual(ran, 3)
+        research.assert_called_once_with('Residential Lease', 'Leases at 100 Main Street, Toronto, Ontario.')
+        detail = self.client.get(f'/api/batches/{batch_id}/').data
+        self.assertEqual(detail['status'], 'completed')
+        self.assertEqual(detail['progress']['succeeded'], 3)
+        self.assertEqual([job['status'] for job in detail['jobs']], ['succeeded'] * 3)
+        document = Document.objects.get(pk=detail['jobs'][1]['document'])
+        self.assertEqual(document.content, 'LEASE AGREEMENT\n\nUnit 102')
+        self.assertEqual(document.session.user, self.user)
+        self.assertIn('    Unit 102', document.formatted_content)
+
+    @override_settings(JOBS_MAX_ATTEMPTS=1)
+    def test_failed_jobs_are_recorded(self):
+        batch = create_batch(self.user, 'Residential Lease', RECORDS[:2])
+
+        ran, _ = self.run_batch([AIMessage(content='LEASE AGREEMENT')])  # The second draft fails
+
+        self.assertEqual(ran, 2)
+        progress = get_progress(batch.pk)
+        self.assertEqual((progress['succeeded'], progress['failed'], progress['done']), (1, 1, 2))
+        self.assertEqual(Batch.objects.get(pk=batch.pk).status, 'completed')
+        self.assertTrue(Job.objects.get(batch=batch, position=1).error)
+
+    def test_a_claimed_job_is_not_claimed_again(self):
+        create_batch(self.user, 'Residential Lease', RECORDS[:2])
+
+        first, second = claim_next_job(), claim_next_job()
+
+        self.assertEqual((first.position, second.position), (0, 1))
+        self.assertIsNone(claim_next_job())
+        self.assertEqual(Batch.objects.get().status, 'running')
+
+    def test_stream_ends_with_done(self):
+        batch = create_batch(self.user, 'Residential Lease', RECORDS[:1])
+        self.run_batch([AIMessage(content='LEASE AGREEMENT')])
+
+        response = self.client.get(f'/api/batches/{batch.pk}/stream/', HTTP_ACCEPT='text/event-stream')
+        body = b''.join(response.streaming_content).decode()
+
+        event, data = body.strip().split('\n')
+        self.assertEqual(event, 'event: done')
+        self.assertEqual(json.loads(data[len('data: '):])['progress']['succeeded'], 1)
+
+    @override_settings(JOBS_STREAM_INTERVAL=0.01, JOBS_STREAM_MAX_DURATION=0.05)
+    def test_stream_times_out_and_points_to_polling(self):
+        batch = create_batch(self.user, 'Residential Lease', RECORDS[:1])
+
+        response = self.client.get(f'/api/batches/{batch.pk}/stream/', HTTP_ACCEPT='text/event-stream')
+        events = b''.join(response.streaming_content).decode().strip().split('\n\n')
+
+        self.assertEqual(events[0].split('\n')[0], 'event: progress')
+        self.assertEqual(events[-1], f'event: timeout\ndata: {{"poll": "/api/batches/{batch.pk}/"}}')
+
+    def test_invalid_batches_are_rejected(self):
+        self.assertEqual(self.post_batch(records=[]).status_code, 400)
+        self.assertEqual(self.post_batch(records=[{}]).status_code, 400)
+        with self.settings(JOBS_MAX_BATCH_SIZE=2):
+            self.assertEqual(self.post_batch().status_code, 400)
+        self.assertFalse(Batch.objects.exists())
+
+
+@override_settings(OPENROUTER_API_KEY='test-key', JOBS_AUTOSTART=False, RENDITION_PRERENDER=False)
+class JobQueueTests(TestCase):
+    """Tests for POST /api/jobs/, priorities, retries and leases."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='paralegal', email='paralegal@example.com', password='testpass123'
+        )
+        self.client.force_login(self.user)
+
+    def post_job(self, **body):
+        return self.client.post('/api/jobs/', body, content_type='application/json', **body.pop('headers', {}))
+
+    def test_refine_job_runs_in_the_background(self):
+        response = self.post_job(kind='refine', payload={'current_draft': 'NDA', 'user_request': 'Add a term'})
+
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual((response.data['status'], response.data['priority']), ('queued', Job.PRIORITY_INTERACTIVE))
+
+        llm = GenericFakeChatModel(messages=iter([AIMessage(content='DRAFT_COMPLETE: NDA, term: 2 years')]))
+        with patch('ai_agent.services.get_chat_model', return_value=llm):
+            self.assertEqual(run_pending(), 1)
+
+        job = self.client.get(f"/api/jobs/{response.data['id']}/").data
+        self.assertEqual((job['status'], job['attempts']), ('succeeded', 1))
+        self.assertIn('term: 2 years', job['result']['result'])
+
+        stream = self.client.get(f"/api/jobs/{job['id']}/stream/", HTTP_ACCEPT='text/event-stream')
+        event, data = b''.join(stream.streaming_content).decode().strip().split('\n')
+        self.assertEqual(event, 'event: done')
+        self.assertEqual(json.loads(data[len('data: '):])['status'], 'succeeded')
+
+    def test_idempotency_key_returns_the_original_job(self):
+        body = {'kind': 'refine', 'payload': {'current_draft': 'NDA', 'user_request': 'Add a term'}}
+        first = self.post_job(**body, headers={'HTTP_IDEMPOTENCY_KEY': 'refine-1'})
+        second = self.post_job(**body, headers={'HTTP_IDEMPOTENCY_KEY': 'refine-1'})
+
+        self.assertEqual((first.status_code, second.status_code), (202, 200))
+        self.assertEqual(first.data['id'], second.data['id'])
+        self.assertEqual(Job.objects.count(), 1)
+
+    def test_idempotency_keys_are_per_user_and_payload(self):
+        body = {'kind': 'refine', 'payload': {'current_draft': 'NDA', 'user_request': 'Add a term'}}
+        first = self.post_job(**body, idempotency_key='refine-1')
+        changed = self.post_job(kind='refine', payload={'current_draft': 'NDA', 'user_request': 'Remove it'},
+                                idempotency_key='refine-1')
+        other = get_user_model().objects.create_user(username='other', email='other@example.com', password='x')
+        self.client.force_login(other)
+        theirs = self.post_job(**body, idempotency_key='refine-1')
+
+        self.assertEqual((first.status_code, changed.status_code, theirs.status_code), (202, 422, 202))
+        self.assertNotEqual(theirs.data['id'], first.data['id'])
+        self.assertEqual(Job.objects.filter(idempotency_key='refine-1').count(), 2)
+
+    def test_jobs_are_scoped_to_the_user(self):
+        mine = self.post_job(kind='refine', payload={'current_draft': 'NDA', 'user_request': 'Add a term'})
+        other = get_user_model().objects.create_user(username='other', email='other@example.com', password='x')
+        self.client.force_login(other)
+
+        self.assertEqual(self.client.get(f"/api/jobs/{mine.data['id']}/").status_code, 404)
+        self.assertEqual(self.client.get('/api/jobs/').data['results'], [])
+
+    def test_retried_session_turn_is_recorded_once(self):
+        session = Session.objects.create(user=self.user, title='Lease')
+        response = self.post_job(kind='generate', payload={'prompt': 'Draft my lease', 'session_id': str(session.pk)})
+        job = Job.objects.get(pk=response.data['id'])
+
+        reply = {'result': 'Which province is the property in?', 'metadata': {}}
+        with patch('ai_agent.services.generate_legal_document', return_value=reply) as generate:
+            first = run_generate(job)
+            retried = run_generate(job)  # e.g. after the first attempt's lease expired
+
+        generate.assert_called_once()
+        self.assertEqual(Message.objects.filter(session=session).count(), 2)
+        self.assertEqual(retried['messages'], first['messages'])
+        self.assertEqual(retried['result'], 'Which province is the property in?')
+
+    def test_payload_must_belong_to_the_user(self):
+        other = get_user_model().objects.create_user(username='other', email='other@example.com', password='x')
+        session = Session.objects.create(user=other, title='Theirs')
+        document = Document.objects.create(session=session, document_type='Lease', content='LEASE')
+
+        generate = self.post_job(kind='generate', payload={'prompt': 'Hi', 'session_id': str(session.pk)})
+        render = self.post_job(kind='render', payload={'document_id': str(document.pk), 'format': 'pdf'})
+
+        self.assertEqual((generate.status_code, render.status_code), (400, 400))
+        self.assertFalse(Job.objects.exists())
+
+    def test_invalid_jobs_are_rejected(self):
+        self.assertEqual(self.post_job(kind='shred', payload={'x': 1}).status_code, 400)
+        self.assertEqual(self.post_job(kind='refine', payload={'current_draft': 'NDA'}).status_code, 400)
+        self.assertEqual(self.post_job(kind='render', payload={'document_id': 'nope', 'format': 'pdf'}).status_code, 400)
+        self.assertFalse(Job.objects.exists())
+
+    def test_interactive_jobs_overtake_batches(self):
+        create_batch(self.user, 'Residential Lease', RECORDS[:2])
+        render, _ = enqueue('render', {}, priority=Job.PRIORITY_RENDER)
+        refine, _ = enqueue('refine', {})
+
+        order = [claim_next_job() for _ in range(4)]
+
+        self.assertEqual([job.kind for job in order], ['refine', 'render', 'batch_document', 'batch_document'])
+
+    def test_failed_attempts_are_retried_with_backoff(self):
+        job, _ = enqueue('refine', {}, max_attempts=2)
+
+        with patch.dict('jobs.worker.JOB_HANDLERS', refine=lambda job: 1 / 0):
+            self.assertEqual(run_job(claim_next_job()), 'queued')
+            job.refresh_from_db()
+            self.assertEqual((job.attempts, job.error), (1, 'division by zero'))
+            self.assertGreater(job.run_after, timezone.now() + timedelta(seconds=4))
+            self.assertIsNone(claim_next_job())  # Not due yet
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            self.assertEqual(run_job(claim_next_job()), 'failed')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_expired_lease_is_taken_over(self):
+        enqueue('refine', {})
+        abandoned = claim_next_job('crashed-worker')
+        self.assertIsNone(claim_next_job())
+
+        Job.objects.filter(pk=abandoned.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+        taken_over = claim_next_job('healthy-worker')
+
+        self.assertEqual((taken_over.pk, taken_over.attempts), (abandoned.pk, 2))
+        with patch.dict('jobs.worker.JOB_HANDLERS', refine=lambda job: {'ok': True}):
+            self.assertIsNone(run_job(abandoned))  # The crashed worker's late result is discarded
+            self.assertEqual(run_job(taken_over), 'succeeded')
+
+
+@override_settings(OPENROUTER_API_KEY='test-key', JOBS_AUTOSTART=False, RENDITION_PRERENDER=False)
+class RunJobsCommandTests(TransactionTestCase):
+    """manage.py run_jobs runs the queue in worker threads with their own connections."""
+
+    def test_once_drains_the_queue(self):
+        jobs = [enqueue('refine', {'n': n})[0] for n in range(3)]
+
+        with patch.dict('jobs.worker.JOB_HANDLERS', refine=lambda job: {'n': job.payload['n']}):
+            call_command('run_jobs', '--once', '--workers', '2', stdout=StringIO())
+
+        for job in jobs:
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.result), ('succeeded', job.payload))
+
+
+@override_settings(
+    OPENROUTER_API_KEY='test-key', JOBS_AUTOSTART=False, RENDITION_PRERENDER=False,
+    JOBS_LEASE_SECONDS=1, JOBS_HEARTBEAT_INTERVAL=0.1,
+)
+class LeaseHeartbeatTests(TransactionTestCase):
+    """A running job's lease is renewed from another thread while its handler runs."""
+
+    def test_long_running_job_is_not_taken_over(self):
+        job, _ = enqueue('refine', {})
+
+        def slow(job):
+            time.sleep(1.5)  # Longer than the lease
+            return {'taken_over': claim_next_job('other-worker') is not None}
+
+        with patch.dict('jobs.worker.JOB_HANDLERS', refine=slow):
+            self.assertEqual(run_job(claim_next_job()), 'succeeded')
+
+        job.refresh_from_db()
+        self.assertEqual((job.result, job.attempts), ({'taken_over': False}, 1))
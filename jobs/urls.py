@@ -0,0 +1,9 @@
+from rest_framework.routers import DefaultRouter
+from .views import BatchViewSet, JobViewSet
+
+
+router = DefaultRouter()
+router.register(r'batches', BatchViewSet, basename='batch')
+router.register(r'jobs', JobViewSet, basename='job')
+
+urlpatterns = router.urls
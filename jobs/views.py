@@ -0,0 +1,216 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import AllowAny
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from ai_agent.streaming import EventStreamRenderer, format_sse
+from authentication.utils import get_request_user
+from .models import Batch, Job
+from .queue import IdempotencyConflict, create_batch, enqueue, get_progress
+from .serializers import (
+    BatchCreateSerializer,
+    BatchDetailSerializer,
+    BatchSerializer,
+    JobCreateSerializer,
+    JobSerializer,
+)
+from .worker import notify_workers
+
+
+def poll_events(read_state, poll_url, event='progress'):
+    """
+    Server-Sent Events for a job or batch, polled every JOBS_STREAM_INTERVAL.
+
+    ``read_state`` returns ``(finished, state)``; a changed state is sent
+    as ``event`` and the final one as "done". The stream holds a worker
+    thread while open, so it closes after JOBS_STREAM_MAX_DURATION with a
+    "timeout" event telling the client to poll ``poll_url`` instead.
+    """
+    deadline = time.monotonic() + settings.JOBS_STREAM_MAX_DURATION
+    last = None
+    while True:
+        finished, state = read_state()
+        if finished:
+            yield format_sse('done', state)
+            return
+        if state != last:
+            yield format_sse(event, state)
+            last = state
+        if time.monotonic() + settings.JOBS_STREAM_INTERVAL > deadline:
+            yield format_sse('timeout', {'poll': poll_url})
+            return
+        time.sleep(settings.JOBS_STREAM_INTERVAL)
+
+
+def event_stream_response(events):
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
+
+
+class BatchViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Batch document generation.
+
+    POST /api/batches/
+    Request Body:
+    {
+        "document_type": "Residential Lease Agreement",
+        "instructions": "12-month leases at 100 Main Street, Toronto, Ontario; rent due on the 1st",
+        "records": [
+            {"tenant": "Jane Doe", "unit": "101", "rent": "$1,900"},
+            {"tenant": "John Roe", "unit": "102", "rent": "$2,050"}
+        ]
+    }
+
+    Response (202): the batch, with "progress" job counts. Jobs are drafted by
+    the local worker pool (JOBS_WORKERS); each produces a Document.
+
+    GET /api/batches/{id}/          batch, progress and jobs (poll this)
+    GET /api/batches/{id}/stream/   progress as Server-Sent Events until the batch is done
+                                    (or JOBS_STREAM_MAX_DURATION has passed; then poll)
+    """
+    queryset = Batch.objects.all()
+    serializer_class = BatchSerializer
+    permission_classes = [AllowAny]  # Allow access without authentication for testing
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return BatchDetailSerializer
+        return BatchSerializer
+
+    def get_queryset(self):
+        queryset = self.queryset.filter(user=get_request_user(self.request))
+        if self.action == 'retrieve':
+            return queryset.prefetch_related('jobs')
+        return queryset
+
+    def create(self, request):
+        serializer = BatchCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        batch = create_batch(
+            get_request_user(request),
+            serializer.validated_data['document_type'],
+            serializer.validated_data['records'],
+            serializer.validated_data['instructions'],
+        )
+        transaction.on_commit(notify_workers)
+        return Response(BatchSerializer(batch).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'], renderer_classes=[JSONRenderer, EventStreamRenderer])
+    def stream(self, request, pk=None):
+        """
+        Stream batch progress.
+
+        Response (text/event-stream):
+            event: progress
+            data: {"status": "running", "progress": {"queued": 30, "running": 2, "succeeded": 8, ...}}
+
+            event: done
+            data: {"status": "completed", "progress": {...}}
+
+            event: timeout      (instead of done, when the stream is closed first)
+            data: {"poll": "/api/batches/<id>/"}
+        """
+        batch = self.get_object()
+        return event_stream_response(self._progress_events(batch.pk))
+
+    def _progress_events(self, batch_id):
+        def read_state():
+            batch_status = Batch.objects.values_list('status', flat=True).get(pk=batch_id)
+            state = {'status': batch_status, 'progress': get_progress(batch_id)}
+            return batch_status in ('completed', 'failed'), state
+
+        return poll_events(read_state, f'/api/batches/{batch_id}/')
+
+
+class JobViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Background jobs: generation, refinement and renders run by the job workers,
+    so the request returns as soon as the job is queued.
+
+    POST /api/jobs/
+    Headers (optional):
+        Idempotency-Key: <client-chosen key>
+    Request Body:
+    {
+        "kind": "generate",          // or "refine", "render"
+        "payload": {"prompt": "Draft an NDA for...", "session_id": "<uuid>"}
+        // refine: {"current_draft": "...", "user_request": "..."}
+        // render: {"document_id": "<uuid>", "format": "pdf"}
+    }
+
+    Response (202): the job. Repeating a request with the same idempotency key
+    returns the original job (200) instead of queuing it again; reusing a key
+    for a different kind or payload is rejected (422). Keys are per user.
+
+    GET /api/jobs/{id}/          the job, with "result" once it has succeeded (poll this)
+    GET /api/jobs/{id}/stream/   status changes as Server-Sent Events until the job is finished
+                                 (or JOBS_STREAM_MAX_DURATION has passed; then poll)
+    """
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [AllowAny]  # Allow access without authentication for testing
+
+    def get_queryset(self):
+        queryset = self.queryset.filter(user=get_request_user(self.request))
+        kind = self.request.query_params.get('kind')
+        if kind:
+            queryset = queryset.filter(kind=kind)
+        return queryset.order_by('-created_at')
+
+    def create(self, request):
+        serializer = JobCreateSerializer(data=request.data, context={'request': request})
+        serializer.is_valid(raise_exception=True)
+        try:
+            job, created = enqueue(
+                serializer.validated_data['kind'],
+                serializer.validated_data['payload'],
+                priority=serializer.validated_data['priority'],
+                idempotency_key=(
+                    serializer.validated_data['idempotency_key'] or request.headers.get('Idempotency-Key')
+                ),
+                user=get_request_user(request),
+            )
+        except IdempotencyConflict as e:
+            return Response({'error': str(e)}, status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+        if created:
+            transaction.on_commit(notify_workers)
+        return Response(
+            JobSerializer(job).data,
+            status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK,
+        )
+
+    @action(detail=True, methods=['get'], renderer_classes=[JSONRenderer, EventStreamRenderer])
+    def stream(self, request, pk=None):
+        """
+        Stream job status.
+
+        Response (text/event-stream):
+            event: status
+            data: {"status": "running", "attempts": 1}
+
+            event: done
+            data: {<the job>}
+
+            event: timeout      (instead of done, when the stream is closed first)
+            data: {"poll": "/api/jobs/<id>/"}
+        """
+        job = self.get_object()
+        return event_stream_response(self._status_events(job.pk))
+
+    def _status_events(self, job_id):
+        def read_state():
+            job = Job.objects.get(pk=job_id)
+            if job.is_finished:
+                return True, JobSerializer(job).data
+            return False, {'status': job.status, 'attempts': job.attempts}
+
+        return poll_events(read_state, f'/api/jobs/{job_id}/', event='status')
@@ -0,0 +1,168 @@
+"""
+Workers for the job queue.
+
+``run_job`` runs one claimed job through its handler (jobs.handlers) and
+records the outcome: success, a retry with backoff, or a final failure.
+``work`` is the worker loop shared by the in-process ``JobRunner`` (started
+by the web process when JOBS_AUTOSTART is set) and ``manage.py run_jobs``
+(a separate worker process that survives web worker restarts).
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+from django.utils import timezone
+
+from .handlers import JOB_HANDLERS
+from .queue import claim_next_job, complete_job, fail_job, finish_batch, next_due_at, renew_lease
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def lease_heartbeat(job):
+    """
+    Renew ``job``'s lease every JOBS_HEARTBEAT_INTERVAL while the block runs,
+    so a handler that outlasts JOBS_LEASE_SECONDS is not taken over; only a
+    worker that has died (and stopped renewing) loses its job.
+    """
+    stop = threading.Event()
+
+    def beat():
+        try:
+            while not stop.wait(settings.JOBS_HEARTBEAT_INTERVAL):
+                if not renew_lease(job):
+                    return
+        except Exception:
+            logger.exception("Could not renew the lease of job %s", job.pk)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=beat, name=f'jobs-heartbeat-{job.pk}', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_job(job):
+    """Run a claimed job and record the outcome; returns the job's new status."""
+    handler = JOB_HANDLERS.get(job.kind)
+    if job.attempts > job.max_attempts:
+        # Taken over after its last attempt's worker died.
+        status = fail_job(job, job.error or 'Worker lease expired.')
+    elif handler is None:
+        job.attempts = job.max_attempts
+        status = fail_job(job, f"Unknown job kind: {job.kind}")
+    else:
+        try:
+            with lease_heartbeat(job):
+                result = handler(job)
+        except Exception as e:
+            logger.exception("Job %s (%s) attempt %s failed", job.pk, job.kind, job.attempts)
+            status = fail_job(job, str(e) or type(e).__name__)
+        else:
+            status = 'succeeded' if complete_job(job, result) else None
+    if status is None:
+        logger.warning("Job %s was taken over by another worker; discarded this attempt", job.pk)
+    if job.batch_id:
+        finish_batch(job.batch_id)
+    return status
+
+
+def run_pending(limit=None, worker_id=None):
+    """Run due jobs in this thread until none is due (or ``limit`` jobs ran)."""
+    ran = 0
+    while limit is None or ran < limit:
+        job = claim_next_job(worker_id)
+        if job is None:
+            break
+        run_job(job)
+        ran += 1
+    return ran
+
+
+def work(stop, worker_id=None, poll_interval=None, exit_when_idle=False):
+    """
+    Worker loop: run due jobs, then wait for the next one to become due.
+
+    ``stop`` is a threading.Event; the job in progress is finished before the
+    loop returns. With ``exit_when_idle`` the loop also returns once no job is
+    queued (jobs waiting for a retry keep it polling).
+    """
+    poll_interval = poll_interval or settings.JOBS_POLL_INTERVAL
+    try:
+        while not stop.is_set():
+            # Workers outlive requests; drop a connection past CONN_MAX_AGE or unusable
+            close_old_connections()
+            if run_pending(limit=1, worker_id=worker_id):
+                continue
+            due = next_due_at()
+            if due is None and exit_when_idle:
+                return
+            wait = poll_interval if due is None else (due - timezone.now()).total_seconds()
+            stop.wait(min(max(wait, 0.01), poll_interval))
+    finally:
+        connection.close()
+
+
+class JobRunner:
+    """Thread pool of at most ``max_workers`` queue workers in the web process."""
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='jobs')
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._active = 0
+
+    def kick(self):
+        """Start idle workers; call after queuing jobs (once committed)."""
+        with self._lock:
+            idle = self.max_workers - self._active
+            self._active += idle
+        for _ in range(idle):
+            self._executor.submit(self._work)
+
+    def _work(self):
+        try:
+            work(self._stop, exit_when_idle=True)
+        except Exception:
+            logger.exception("Job worker stopped")
+        finally:
+            with self._lock:
+                self._active -= 1
+        # A job queued while this worker was finishing found no idle worker.
+        try:
+            if next_due_at() is not None and not self._stop.is_set():
+                self.kick()
+        finally:
+            connection.close()
+
+    def stats(self):
+        with self._lock:
+            return {'workers': self.max_workers, 'active': self._active}
+
+
+_runner = None
+_runner_lock = threading.Lock()
+
+
+def get_job_runner():
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = JobRunner(settings.JOBS_WORKERS)
+        return _runner
+
+
+def notify_workers():
+    """Start in-process workers for newly queued jobs, when the web process runs them."""
+    if settings.JOBS_AUTOSTART:
+        get_job_runner().kick()
@@ -1,10 +1,22 @@
+import concurrent.futures
+import contextvars
+import os
+import threading
+import httpx
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain.agents import create_tool_calling_agent, AgentExecutor
 from .tools import LegalWebSearchTool
 
-def get_drafting_prompt():
-    system_prompt = """
+DEFAULT_MODEL = "deepseek/deepseek-chat-v3-0324:free"
+DEFAULT_TEMPERATURE = 0.3
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+DEFAULT_HEADERS = {
+    "HTTP-Referer": "http://localhost:8501",
+    "X-Title": "Agentic Legal AI",
+}
+
+DRAFTING_SYSTEM_PROMPT = """
     You are an expert AI legal assistant operating in Canada. Your persona is that of a professional, meticulous, and formal Canadian lawyer.
 
     **Your Mandate:**
@@ -19,13 +31,33 @@ def get_drafting_prompt():
     -   If legal context is needed, state "I will now search for relevant legal information..." and then use the Legal_Web_Search tool.
     -   When ready to draft, output the `DRAFT_COMPLETE:` command followed by the document.
     """
+
+INTERVIEW_SYSTEM_PROMPT = """
+    You are an expert AI legal assistant operating in Canada. Your persona is that of a professional, meticulous, and formal Canadian lawyer.
+
+    **Your Mandate:**
+    1.  **Engage Professionally:** Communicate with the user in a formal, clear, and respectful tone.
+    2.  **Information Gathering:** Gather all necessary information to draft a specific legal document, asking targeted, sequential questions.
+    3.  **Research:** If legal context, statutes, or case law are needed before drafting, state "I will now search for relevant legal information..." and stop; the research will be done on the next turn.
+    4.  **Draft Generation:** Once you have ALL necessary information, generate the complete, final draft. Your entire response MUST begin with `DRAFT_COMPLETE:` followed immediately by the full text of the legal document.
+    """
+
+def get_drafting_prompt():
     return ChatPromptTemplate.from_messages([
-        ("system", system_prompt),
+        ("system", DRAFTING_SYSTEM_PROMPT),
         MessagesPlaceholder(variable_name="history"),
         ("human", "{input}"),
         MessagesPlaceholder(variable_name="agent_scratchpad"),
     ])
 
+def get_interview_prompt():
+    """Lean prompt for turns answered by the chat model directly (no tools)."""
+    return ChatPromptTemplate.from_messages([
+        ("system", INTERVIEW_SYSTEM_PROMPT),
+        MessagesPlaceholder(variable_name="history"),
+        ("human", "{input}"),
+    ])
+
 def get_refinement_prompt(document: str, user_request: str) -> str:
     return f"""
     You are an expert AI legal assistant acting as a reviewing lawyer in Canada. Your task is to refine an existing legal document based on a user's specific request.
@@ -46,22 +78,254 @@ def get_refinement_prompt(document: str, user_request: str) -> str:
     3.  Return the **ENTIRE, FULLY UPDATED** document as your response. Do not provide conversational text or summaries of changes.
     """
 
-def get_agent_executor(openrouter_api_key: str):
-    llm = ChatOpenAI(
-        model="deepseek/deepseek-chat-v3-0324:free",
-        temperature=0.3,
+def get_section_refinement_prompt(outline: str, sections: str, user_request: str) -> str:
+    return f"""
+    You are an expert AI legal assistant acting as a reviewing lawyer in Canada. Your task is to refine selected sections of an existing legal document based on a user's specific request.
+
+    **Document Outline (for context only):**
+    ---
+    {outline}
+    ---
+
+    **Sections To Revise:**
+    ---
+    {sections}
+    ---
+
+    **User's Refinement Request:**
+    ---
+    "{user_request}"
+    ---
+
+    **Your Instructions:**
+    1.  Apply the requested changes to the sections above, maintaining a professional and formal legal tone.
+    2.  Return EVERY section listed above, each wrapped in the same `<<<SECTION n>>>` and `<<<END SECTION n>>>` markers, including its heading line. Return a section unchanged if the request does not affect it.
+    3.  Do not return any other text, conversational remarks, or summaries of changes.
+    """
+
+def get_section_selection_prompt(outline: str, user_request: str) -> str:
+    return f"""
+    You are reviewing a legal document. Below is its outline, one section per line as "number: heading (first words)".
+
+    ---
+    {outline}
+    ---
+
+    The user asked: "{user_request}"
+
+    Reply with only the comma-separated numbers of the sections that must change to satisfy the request, or ALL if the change affects the whole document.
+    """
+
+def get_batch_drafting_prompt(document_type: str, details: str, instructions: str = "", research: str = "") -> str:
+    return f"""
+    You are an expert AI legal assistant acting as a drafting lawyer in Canada. Your task is to draft one document of a batch of {document_type} documents that share the same terms and differ only in the party details below.
+
+    **Instructions For The Whole Batch:**
+    ---
+    {instructions or "(none)"}
+    ---
+
+    **Legal Research For The Whole Batch:**
+    ---
+    {research or "(none)"}
+    ---
+
+    **Details For This Document:**
+    ---
+    {details}
+    ---
+
+    **Your Instructions:**
+    1.  Draft the complete, final {document_type} using every detail above, in a professional and formal legal tone.
+    2.  Where a detail is missing, leave a clearly marked blank (e.g. "[Tenant Name]") instead of inventing it.
+    3.  Return only the document text. Do not provide conversational text or questions.
+    """
+
+def get_additional_clauses_prompt(document_type: str, details: str, requests: str) -> str:
+    return f"""
+    You are an expert AI legal assistant acting as a drafting lawyer in Canada. The standard clauses of a {document_type} have already been drafted; your task is to draft only the additional clauses the client asked for.
+
+    **Details Of The Document:**
+    ---
+    {details}
+    ---
+
+    **Client's Requests:**
+    ---
+    {requests}
+    ---
+
+    **Your Instructions:**
+    1.  Draft one clause per request, labelled (a), (b), (c) and so on, in a professional and formal legal tone consistent with the details above.
+    2.  Do not repeat standard clauses (parties, term, governing law, signatures).
+    3.  Return only the clauses. Do not provide headings, conversational text or questions.
+    """
+
+def get_summary_prompt(previous_summary: str, transcript: str) -> str:
+    return f"""
+    You are assisting a Canadian lawyer who is interviewing a client in order to draft a legal document. Condense the conversation below into a brief factual summary.
+
+    **Summary So Far:**
+    ---
+    {previous_summary or "(none)"}
+    ---
+
+    **New Conversation Turns:**
+    ---
+    {transcript}
+    ---
+
+    **Your Instructions:**
+    1.  Produce an updated summary that merges the summary so far with the new turns.
+    2.  Keep every fact needed for the draft: document type, parties, addresses, dates, amounts, jurisdiction, and any specific clauses requested or research findings.
+    3.  Write plain sentences only. Do not add advice, commentary, or questions.
+    """
+
+def get_llm(openrouter_api_key: str, model: str = DEFAULT_MODEL,
+            temperature: float = DEFAULT_TEMPERATURE, base_url: str = DEFAULT_BASE_URL,
+            http_client: httpx.Client = None) -> ChatOpenAI:
+    return ChatOpenAI(
+        model=model,
+        temperature=temperature,
         api_key=openrouter_api_key,
-        base_url="https://openrouter.ai/api/v1",
-        default_headers={
-            "HTTP-Referer": "http://localhost:8501",
-            "X-Title": "Agentic Legal AI",
-        }
+        base_url=base_url,
+        default_headers=DEFAULT_HEADERS,
+        http_client=http_client,
     )
 
+# Tool calls from one agent step (e.g. several Legal_Web_Search queries)
+_tool_executor = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="agent-tools")
+
+
+class ParallelToolAgentExecutor(AgentExecutor):
+    """
+    AgentExecutor that runs all tool calls of one step concurrently.
+
+    The stock sync executor performs the calls of a multi-tool step one after
+    another; here each call is submitted to a thread pool as soon as the step
+    is planned and the observations are collected in the original order.
+    """
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action, run_manager=None):
+        # Copy the context so callbacks and tracing see the parent run.
+        context = contextvars.copy_context()
+        return _tool_executor.submit(
+            context.run, super()._perform_agent_action,
+            name_to_tool_map, color_mapping, agent_action, run_manager,
+        )
+
+    def _iter_next_step(self, *args, **kwargs):
+        pending = []
+        for item in super()._iter_next_step(*args, **kwargs):
+            if isinstance(item, concurrent.futures.Future):
+                pending.append(item)
+            else:
+                yield item
+        for future in pending:
+            yield future.result()
+
+
+def get_agent_executor(openrouter_api_key: str, model: str = DEFAULT_MODEL,
+                       temperature: float = DEFAULT_TEMPERATURE, base_url: str = DEFAULT_BASE_URL,
+                       llm: ChatOpenAI = None):
+    if llm is None:
+        llm = get_llm(openrouter_api_key, model, temperature, base_url)
+
     tools = [LegalWebSearchTool()]
 
     prompt = get_drafting_prompt()
     agent = create_tool_calling_agent(llm, tools, prompt)
-    agent_executor = AgentExecutor(agent=agent, tools=tools, verbose=True)
+    agent_executor = ParallelToolAgentExecutor(agent=agent, tools=tools, verbose=True)
     
     return agent_executor
+
+
+class AgentRegistry:
+    """
+    Process-wide pool of chat models and agent executors.
+
+    Entries are keyed by (model, temperature, api key, base URL) and built once
+    per worker process. All models share one keep-alive HTTP connection pool, so
+    consecutive turns reuse the TLS session to OpenRouter instead of opening a
+    new one. Safe to call from multiple threads.
+    """
+
+    def __init__(self, max_connections: int = 20, keepalive_expiry: float = 120.0,
+                 timeout: float = 120.0):
+        self.max_connections = max_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._http_client = None
+        self._llms = {}
+        self._executors = {}
+        self.hits = 0
+        self.misses = 0
+
+    def _check_pid(self):
+        # Connection pools must not be shared across a fork (e.g. gunicorn
+        # pre-fork workers); each child starts with an empty registry.
+        if self._pid != os.getpid():
+            self._reset()
+
+    def _get_http_client(self) -> httpx.Client:
+        if self._http_client is None:
+            self._http_client = httpx.Client(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                timeout=self.timeout,
+            )
+        return self._http_client
+
+    def get_llm(self, openrouter_api_key: str, model: str = DEFAULT_MODEL,
+                temperature: float = DEFAULT_TEMPERATURE, base_url: str = DEFAULT_BASE_URL) -> ChatOpenAI:
+        key = (model, float(temperature), openrouter_api_key, base_url)
+        with self._lock:
+            self._check_pid()
+            llm = self._llms.get(key)
+            if llm is None:
+                llm = get_llm(openrouter_api_key, model, temperature, base_url,
+                              http_client=self._get_http_client())
+                self._llms[key] = llm
+            return llm
+
+    def get_agent_executor(self, openrouter_api_key: str, model: str = DEFAULT_MODEL,
+                           temperature: float = DEFAULT_TEMPERATURE, base_url: str = DEFAULT_BASE_URL):
+        key = (model, float(temperature), openrouter_api_key, base_url)
+        with self._lock:
+            self._check_pid()
+            executor = self._executors.get(key)
+            if executor is not None:
+                self.hits += 1
+                return executor
+            self.misses += 1
+        # Build outside the lock; if two threads race, the first one stored wins.
+        llm = self.get_llm(openrouter_api_key, model, temperature, base_url)
+        executor = get_agent_executor(openrouter_api_key, model, temperature, base_url, llm=llm)
+        with self._lock:
+            return self._executors.setdefault(key, executor)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "executors": len(self._executors),
+                "llms": len(self._llms),
+            }
+
+    def clear(self):
+        with self._lock:
+            if self._http_client is not None and self._pid == os.getpid():
+                self._http_client.close()
+            self._reset()
+
+
+registry = AgentRegistry()
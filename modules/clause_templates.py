@@ -0,0 +1,345 @@
+"""
+Clause templates for the common document types.
+
+Each document type (property transfer, lease, power of attorney, will,
+employment contract) has a standard clause set and, per province or
+territory, the statute its clauses cite. Every (type, province) pair is
+compiled once at import into literal text and typed slots for the party,
+date and term details, so filling a draft is a join; a value that does not
+fit its slot's type (e.g. a term that is not a duration) leaves the template
+unfilled and the turn goes to the model.
+"""
+
+import re
+from collections import namedtuple
+
+from .details import DATE_PATTERN, DURATION_PATTERN, PROVINCES, canonical_province
+
+DocumentTemplate = namedtuple("DocumentTemplate", "key title pattern topic statutes preamble clauses closing")
+
+# A compiled template: ``body`` and ``closing`` are lists of (literal, slot)
+# pairs, ``slot`` being None after the last literal; ``slots`` are the detail
+# fields the template needs.
+CompiledTemplate = namedtuple("CompiledTemplate", "template jurisdiction body closing clause_count slots")
+
+SLOT_TYPES = {
+    "party_a": "party",
+    "party_b": "party",
+    "effective_date": "date",
+    "term": "duration",
+}
+_SLOT_VALUES = {
+    "party": re.compile(r"[^\n]{1,120}"),
+    "date": re.compile(DATE_PATTERN, re.IGNORECASE),
+    "duration": re.compile(DURATION_PATTERN, re.IGNORECASE),
+}
+_PLACEHOLDER = re.compile(r"\{(\w+)\}")
+_TERRITORIES = {"Yukon": "Yukon", "Northwest Territories": "the Northwest Territories", "Nunavut": "Nunavut"}
+
+_SIGNATURE_LINE = "______________________________"
+_GOVERNING_LAW = (
+    "GOVERNING LAW",
+    "This {document} is governed by the laws of {place} and the federal laws of Canada applicable "
+    "therein, including {statute}. If any provision of this {document} conflicts with that "
+    "legislation, the legislation prevails to the extent of the conflict.",
+)
+_ENTIRE_AGREEMENT = (
+    "ENTIRE AGREEMENT",
+    "This Agreement, including its Schedules, is the entire agreement between the parties. "
+    "It may be amended only in writing signed by both parties.",
+)
+
+
+def _signatures(*signers):
+    return "\n\n".join(f"{_SIGNATURE_LINE}\n{signer}" for signer in signers)
+
+
+TEMPLATES = {
+    template.key: template
+    for template in (
+        DocumentTemplate(
+            key="property_transfer",
+            title="PROPERTY TRANSFER AGREEMENT",
+            pattern=r"\b(?:property|land|real\s+estate|house|home)\s+(?:transfer|sale|conveyance)"
+                    r"|\btransfer(?:ring)?\s+(?:of\s+)?(?:the\s+|my\s+|a\s+)?(?:property|land|house|home|title)\b",
+            topic="land titles",
+            statutes={
+                "Ontario": "the Land Titles Act, R.S.O. 1990, c. L.5",
+                "British Columbia": "the Land Title Act, R.S.B.C. 1996, c. 250",
+                "Alberta": "the Land Titles Act, R.S.A. 2000, c. L-4",
+                "Quebec": "the Civil Code of Québec",
+            },
+            preamble='This Property Transfer Agreement (the "Agreement") is made effective as of '
+                     '{effective_date} between {party_a} (the "Transferor") and {party_b} (the "Transferee").',
+            clauses=(
+                ("PROPERTY",
+                 "The Transferor agrees to transfer to the Transferee, and the Transferee agrees to accept, "
+                 "all of the Transferor's right, title and interest in the lands and premises described in "
+                 'Schedule A (the "Property").'),
+                ("CONSIDERATION",
+                 "The Transferee shall pay the Transferor the consideration set out in Schedule A on the "
+                 "Closing Date."),
+                ("CLOSING",
+                 'The transfer shall be completed on {effective_date} (the "Closing Date"), when the '
+                 "Transferor shall deliver a registrable transfer of the Property and vacant possession, "
+                 "unless the parties agree otherwise in writing."),
+                ("TITLE",
+                 "The Transferor shall convey good title to the Property, free of all registered "
+                 "encumbrances except those listed in Schedule A. The transfer shall be registered in "
+                 "accordance with {statute}."),
+                ("ADJUSTMENTS",
+                 "Realty taxes, utilities and other usual items shall be adjusted as of the Closing Date."),
+                ("RISK",
+                 "The Property remains at the risk of the Transferor until the transfer is completed on "
+                 "the Closing Date."),
+                _GOVERNING_LAW,
+                _ENTIRE_AGREEMENT,
+            ),
+            closing="IN WITNESS WHEREOF the parties have signed this Agreement as of the date first written above."
+                    "\n\n" + _signatures("{party_a}, Transferor", "{party_b}, Transferee"),
+        ),
+        DocumentTemplate(
+            key="lease",
+            title="RESIDENTIAL LEASE AGREEMENT",
+            pattern=r"\b(?:lease|leasing|tenancy|rental\s+agreement|landlord|tenant)\b",
+            topic="residential tenancy",
+            statutes={
+                "Ontario": "the Residential Tenancies Act, 2006, S.O. 2006, c. 17",
+                "British Columbia": "the Residential Tenancy Act, S.B.C. 2002, c. 78",
+                "Alberta": "the Residential Tenancies Act, S.A. 2004, c. R-17.1",
+                "Quebec": "the Civil Code of Québec",
+            },
+            preamble='This Residential Lease Agreement (the "Agreement") is made effective as of '
+                     '{effective_date} between {party_a} (the "Landlord") and {party_b} (the "Tenant").',
+            clauses=(
+                ("PREMISES",
+                 "The Landlord agrees to rent to the Tenant, and the Tenant agrees to rent from the "
+                 'Landlord, the residential premises described in Schedule A (the "Premises").'),
+                ("TERM",
+                 "The tenancy begins on {effective_date} and continues for a term of {term}. Unless it is "
+                 "ended in accordance with {statute}, the tenancy then continues on a month-to-month basis."),
+                ("RENT",
+                 "The Tenant shall pay the rent set out in Schedule A on the day it falls due. The rent may "
+                 "be increased only as permitted by {statute}."),
+                ("DEPOSIT",
+                 "Any deposit paid by the Tenant shall not exceed the amount permitted by {statute}, and "
+                 "shall be held, applied and returned in accordance with that legislation."),
+                ("MAINTENANCE AND REPAIRS",
+                 "The Landlord shall maintain the Premises in a good state of repair and fit for habitation. "
+                 "The Tenant shall keep the Premises reasonably clean and shall repair any damage caused by "
+                 "the Tenant or the Tenant's guests."),
+                ("ENTRY",
+                 "Except in an emergency, the Landlord may enter the Premises only after giving the Tenant "
+                 "the written notice required by {statute}."),
+                _GOVERNING_LAW,
+                _ENTIRE_AGREEMENT,
+            ),
+            closing="IN WITNESS WHEREOF the parties have signed this Agreement as of the date first written above."
+                    "\n\n" + _signatures("{party_a}, Landlord", "{party_b}, Tenant"),
+        ),
+        DocumentTemplate(
+            key="power_of_attorney",
+            title="POWER OF ATTORNEY FOR PROPERTY",
+            pattern=r"\bpower\s+of\s+attorney\b",
+            topic="powers of attorney",
+            statutes={
+                "Ontario": "the Substitute Decisions Act, 1992, S.O. 1992, c. 30",
+                "British Columbia": "the Power of Attorney Act, R.S.B.C. 1996, c. 370",
+                "Alberta": "the Powers of Attorney Act, R.S.A. 2000, c. P-20",
+                "Quebec": "the Civil Code of Québec",
+            },
+            preamble='This Power of Attorney for Property is given on {effective_date} by {party_a} '
+                     '(the "Grantor").',
+            clauses=(
+                ("REVOCATION",
+                 "The Grantor revokes every previous power of attorney for property given by the Grantor."),
+                ("APPOINTMENT",
+                 'The Grantor appoints {party_b} (the "Attorney") as the Grantor\'s attorney for property '
+                 "in accordance with {statute}."),
+                ("AUTHORITY",
+                 "The Attorney may do on the Grantor's behalf anything in respect of property that the "
+                 "Grantor could lawfully do if capable of managing property, except make a will."),
+                ("CONTINUING EFFECT",
+                 "This power of attorney is effective on {effective_date} and, to the extent permitted by "
+                 "{statute}, continues in effect if the Grantor later becomes mentally incapable of "
+                 "managing property."),
+                ("DUTIES OF THE ATTORNEY",
+                 "The Attorney shall act honestly, in good faith and in the Grantor's best interests, keep "
+                 "accounts of all transactions made on the Grantor's behalf, and keep the Grantor's property "
+                 "separate from the Attorney's own."),
+                ("GOVERNING LAW",
+                 "This Power of Attorney is governed by the laws of {place}, including {statute}."),
+            ),
+            closing="Signed by the Grantor on {effective_date} in the presence of the witnesses below, neither "
+                    "of whom is the Attorney or the spouse or partner of the Grantor or the Attorney."
+                    "\n\n" + _signatures("{party_a}, Grantor", "Witness", "Witness"),
+        ),
+        DocumentTemplate(
+            key="will",
+            title="LAST WILL AND TESTAMENT",
+            pattern=r"\b(?:last\s+will|will\s+and\s+testament|(?:a|my|his|her|their)\s+will|testament|executor)\b",
+            topic="wills and succession",
+            statutes={
+                "Ontario": "the Succession Law Reform Act, R.S.O. 1990, c. S.26",
+                "British Columbia": "the Wills, Estates and Succession Act, S.B.C. 2009, c. 13",
+                "Alberta": "the Wills and Succession Act, S.A. 2010, c. W-12.2",
+                "Quebec": "the Civil Code of Québec",
+            },
+            preamble='This is the Last Will and Testament of {party_a} (the "Testator"), made on {effective_date}.',
+            clauses=(
+                ("REVOCATION",
+                 "The Testator revokes all former wills and codicils."),
+                ("APPOINTMENT OF EXECUTOR",
+                 'The Testator appoints {party_b} as executor and trustee of this Will (the "Executor").'),
+                ("DEBTS AND EXPENSES",
+                 "The Executor shall pay the Testator's just debts, funeral and testamentary expenses, and "
+                 "all taxes payable by reason of the Testator's death."),
+                ("DISTRIBUTION OF ESTATE",
+                 "The Executor shall distribute the residue of the Testator's estate to the beneficiaries, "
+                 "and in the shares, set out in Schedule A."),
+                ("POWERS OF THE EXECUTOR",
+                 "The Executor may sell, retain or convert any property of the estate, at such times and on "
+                 "such terms as the Executor considers advisable."),
+                ("GOVERNING LAW",
+                 "This Will shall be construed in accordance with the laws of {place}, including {statute}."),
+            ),
+            closing="IN WITNESS WHEREOF the Testator has signed this Will on {effective_date} in the presence of "
+                    "the witnesses below, both present at the same time, who have signed in the presence of "
+                    "the Testator and of each other."
+                    "\n\n" + _signatures("{party_a}, Testator", "Witness", "Witness"),
+        ),
+        DocumentTemplate(
+            key="employment",
+            title="EMPLOYMENT AGREEMENT",
+            pattern=r"\bemployment\s+(?:contract|agreement)\b|\bemploy(?:er|ee)\b|\bjob\s+offer\b",
+            topic="employment standards",
+            statutes={
+                "Ontario": "the Employment Standards Act, 2000, S.O. 2000, c. 41",
+                "British Columbia": "the Employment Standards Act, R.S.B.C. 1996, c. 113",
+                "Alberta": "the Employment Standards Code, R.S.A. 2000, c. E-9",
+                "Quebec": "the Act respecting labour standards, CQLR c. N-1.1",
+            },
+            preamble='This Employment Agreement (the "Agreement") is made effective as of {effective_date} '
+                     'between {party_a} (the "Employer") and {party_b} (the "Employee").',
+            clauses=(
+                ("POSITION AND DUTIES",
+                 "The Employer employs the Employee in the position, and with the duties, described in "
+                 "Schedule A. The Employee shall perform those duties diligently and in the Employer's best "
+                 "interests."),
+                ("TERM",
+                 "The employment begins on {effective_date} and continues for a term of {term}, unless it is "
+                 "ended earlier in accordance with this Agreement."),
+                ("COMPENSATION",
+                 "The Employer shall pay the Employee the salary set out in Schedule A, less required "
+                 "deductions, in accordance with the Employer's regular payroll practices."),
+                ("HOURS, VACATION AND LEAVE",
+                 "The Employee's hours of work, overtime, vacation, public holidays and leaves of absence "
+                 "shall be no less favourable than the minimum standards under {statute}."),
+                ("TERMINATION",
+                 "Either party may end the employment by written notice. If the Employer ends the employment "
+                 "without cause, it shall provide the notice or pay in lieu of notice, severance pay and "
+                 "benefit continuation required by {statute}. Nothing in this Agreement provides the Employee "
+                 "with less than those minimum entitlements."),
+                ("CONFIDENTIALITY",
+                 "During and after the employment, the Employee shall keep confidential all non-public "
+                 "information of the Employer and use it only to perform the Employee's duties."),
+                _GOVERNING_LAW,
+                _ENTIRE_AGREEMENT,
+            ),
+            closing="IN WITNESS WHEREOF the parties have signed this Agreement as of the date first written above."
+                    "\n\n" + _signatures("{party_a}, Employer", "{party_b}, Employee"),
+        ),
+    )
+}
+
+_DOCUMENT_TYPES = re.compile(
+    "|".join(f"(?P<{key}>{template.pattern})" for key, template in TEMPLATES.items()),
+    re.IGNORECASE,
+)
+_DOCUMENT_NOUNS = {"power_of_attorney": "Power of Attorney", "will": "Will"}
+
+
+def _place(province: str) -> str:
+    return _TERRITORIES.get(province) or f"the Province of {province}"
+
+
+def _compile(text: str, constants: dict) -> list:
+    """Split ``text`` into (literal, slot) pairs, inlining ``constants``; unknown names raise KeyError."""
+    segments, literal, position = [], [], 0
+    for match in _PLACEHOLDER.finditer(text):
+        literal.append(text[position:match.start()])
+        name = match.group(1)
+        if name in SLOT_TYPES:
+            segments.append(("".join(literal), name))
+            literal = []
+        else:
+            literal.append(constants[name])
+        position = match.end()
+    literal.append(text[position:])
+    segments.append(("".join(literal), None))
+    return segments
+
+
+def compile_template(template: DocumentTemplate, province: str) -> CompiledTemplate:
+    place = _place(province)
+    constants = {
+        "place": place,
+        "statute": template.statutes.get(province, f"the {template.topic} legislation of {place}"),
+        "document": _DOCUMENT_NOUNS.get(template.key, "Agreement"),
+    }
+    parts = [template.title, template.preamble]
+    for number, (heading, text) in enumerate(template.clauses, start=1):
+        parts.append(f"{number}. {heading}\n{text}")
+    body = _compile("\n\n".join(parts), constants)
+    closing = _compile(template.closing, constants)
+    slots = {slot for _, slot in body + closing if slot}
+    return CompiledTemplate(template, province, body, closing, len(template.clauses), slots)
+
+
+_COMPILED = {
+    (key, province): compile_template(template, province)
+    for key, template in TEMPLATES.items()
+    for province in dict.fromkeys(canonical_province(name) for name in PROVINCES)
+}
+
+
+def detect_document_type(texts):
+    """The template key of the first document type mentioned in ``texts`` (oldest first), or None."""
+    for text in texts:
+        match = _DOCUMENT_TYPES.search(text)
+        if match:
+            return match.lastgroup
+    return None
+
+
+def get_template(document_type: str, jurisdiction: str):
+    """The compiled template for a document type and province or territory; None if there is none."""
+    return _COMPILED.get((document_type, canonical_province(jurisdiction or "")))
+
+
+def missing_details(compiled: CompiledTemplate, details: dict) -> list:
+    """The slots of ``compiled`` without a value of the slot's type in ``details``."""
+    return sorted(
+        slot for slot in compiled.slots
+        if not _SLOT_VALUES[SLOT_TYPES[slot]].fullmatch(str(details.get(slot) or "").strip())
+    )
+
+
+def _fill(segments, details):
+    return "".join(literal + (details[slot].strip() if slot else "") for literal, slot in segments)
+
+
+def fill_template(compiled: CompiledTemplate, details: dict, additional_terms: str = ""):
+    """
+    The draft for ``details``, or None if a slot is missing or mistyped.
+
+    ``additional_terms`` (e.g. model-drafted clauses the user asked for)
+    become the last numbered section, before the signatures.
+    """
+    if missing_details(compiled, details):
+        return None
+    parts = [_fill(compiled.body, details)]
+    if additional_terms.strip():
+        parts.append(f"{compiled.clause_count + 1}. ADDITIONAL TERMS\n{additional_terms.strip()}")
+    parts.append(_fill(compiled.closing, details))
+    return "\n\n".join(parts)
@@ -0,0 +1,85 @@
+import re
+
+# Line stages: each takes one line and returns the cleaned line, or None to drop it.
+_DRAFT_MARKER = re.compile(r"DRAFT_COMPLETE:\s*")
+_CODE_FENCE = re.compile(r"^\s*```[\w-]*\s*$")
+_INLINE_WHITESPACE = re.compile(r"[^\S\n]+")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r" +([.,;:])")
+
+
+def strip_markers(line: str):
+    """Drop code-fence lines and stray DRAFT_COMPLETE: markers."""
+    if _CODE_FENCE.match(line):
+        return None
+    return _DRAFT_MARKER.sub("", line) if "DRAFT_COMPLETE:" in line else line
+
+
+def normalize_whitespace(line: str) -> str:
+    """Collapse runs of spaces and tabs inside the line and trim its ends."""
+    return _INLINE_WHITESPACE.sub(" ", line).strip()
+
+
+def fix_punctuation_spacing(line: str) -> str:
+    """Remove spaces before . , ; and :."""
+    return _SPACE_BEFORE_PUNCTUATION.sub(r"\1", line)
+
+
+LINE_STAGES = (strip_markers, normalize_whitespace, fix_punctuation_spacing)
+
+
+class StreamingCleaner:
+    """
+    Cleans a draft in one pass, as its text arrives.
+
+    ``feed`` accepts arbitrary chunks (whole documents or single LLM tokens)
+    and returns the cleaned text of every line completed so far; ``flush``
+    returns the rest. Each line runs through the line stages, then paragraph
+    normalization keeps line breaks, collapses runs of blank lines into one
+    and drops leading and trailing blank lines. Feeding a text in any split
+    gives the same output as ``clean_legal_document``.
+    """
+
+    def __init__(self, stages=LINE_STAGES):
+        self.stages = stages
+        self._partial = ""
+        self._started = False
+        self._blank = False
+
+    def feed(self, chunk: str) -> str:
+        if "\n" not in chunk:
+            self._partial += chunk
+            return ""
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines.pop()
+        return "".join(map(self._clean_line, lines))
+
+    def flush(self) -> str:
+        line, self._partial = self._partial, ""
+        return self._clean_line(line)
+
+    def _clean_line(self, line: str) -> str:
+        for stage in self.stages:
+            line = stage(line)
+            if line is None:
+                return ""
+        if not line:
+            self._blank = self._started
+            return ""
+        if not self._started:
+            self._started = True
+            return line
+        separator = "\n\n" if self._blank else "\n"
+        self._blank = False
+        return separator + line
+
+
+def clean_legal_document(raw_text: str) -> str:
+    """
+    Cleans and normalizes the raw legal text:
+    - Removes extra spaces
+    - Fixes punctuation spacing
+    - Strips code fences and DRAFT_COMPLETE: markers
+    - Standardizes line breaks, keeping paragraphs and headings on their own lines
+    """
+    cleaner = StreamingCleaner()
+    return cleaner.feed(raw_text) + cleaner.flush()
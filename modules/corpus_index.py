@@ -0,0 +1,350 @@
+import hashlib
+import math
+import os
+import re
+import sqlite3
+import threading
+from array import array
+from collections import Counter
+import numpy as np
+from .sections import split_sections
+
+# Files picked up by ingest (exported statutes and decisions as plain text)
+CORPUS_EXTENSIONS = (".txt", ".md")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Compact into one segment when this many segments exist or this share of
+# sections has been superseded by re-indexed files.
+MAX_SEGMENTS = 8
+MAX_DEAD_SHARE = 0.25
+SNIPPET_CHARS = 300
+
+_WORD = re.compile(r"[a-z0-9]+(?:['’][a-z]+)?")
+_STOPWORDS = frozenset("""
+    a an and are as at be been by can could do does for from had has have how i if in into is it its may
+    me my no not of on or other our shall should so such than that the their them then there these they
+    this those to under upon was we were what when where which who will with would you your
+""".split())
+
+
+def tokenize(text: str) -> list:
+    """Lowercased word tokens without stopwords (used for both indexing and queries)."""
+    return [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS and len(w) > 1]
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class CorpusIndex:
+    """
+    On-disk BM25 index over a folder of legal texts.
+
+    Each file is split into sections (see ``modules.sections``) and every
+    section is one retrievable unit. Metadata and the term dictionary live in
+    ``index.sqlite3``; postings are little-endian ``uint32`` runs (the term's
+    section ids in ascending order, then their term frequencies) in one
+    ``seg_<n>.post`` file per segment, memory-mapped with numpy and scored
+    a whole postings list at a time.
+
+    Re-indexing is incremental: unchanged files are skipped, changed files
+    get a new segment and their old sections are marked dead. Segments are
+    compacted once they pile up.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._generation = None
+        os.makedirs(self.path, exist_ok=True)
+        self._connect().executescript("""
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY, mtime REAL NOT NULL, size INTEGER NOT NULL, digest TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS sections (
+                id INTEGER PRIMARY KEY, path TEXT NOT NULL, segment INTEGER NOT NULL, heading TEXT NOT NULL,
+                text TEXT NOT NULL, length INTEGER NOT NULL, live INTEGER NOT NULL DEFAULT 1);
+            CREATE INDEX IF NOT EXISTS sections_path ON sections (path, live);
+            CREATE TABLE IF NOT EXISTS segments (id INTEGER PRIMARY KEY AUTOINCREMENT, sections INTEGER NOT NULL);
+            CREATE TABLE IF NOT EXISTS terms (
+                term TEXT NOT NULL, segment INTEGER NOT NULL, df INTEGER NOT NULL, offset INTEGER NOT NULL,
+                PRIMARY KEY (term, segment)) WITHOUT ROWID;
+            INSERT OR IGNORE INTO meta (key, value) VALUES ('generation', 0);
+        """)
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(os.path.join(self.path, "index.sqlite3"), timeout=30,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+        return connection
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.path, f"seg_{segment}.post")
+
+    # Ingest -----------------------------------------------------------------
+
+    def ingest(self, folder, force: bool = False) -> dict:
+        """
+        Index new and changed files under ``folder`` and drop removed ones.
+
+        Returns counts of added, updated, removed and unchanged files.
+        Raises NotADirectoryError if ``folder`` is missing, rather than
+        treating every indexed file as removed.
+        """
+        folder = os.path.abspath(folder)
+        if not os.path.isdir(folder):
+            raise NotADirectoryError(f"Corpus folder not found: {folder}")
+        connection = self._connect()
+        known = {row[0]: row[1:] for row in connection.execute("SELECT path, mtime, size, digest FROM files")}
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0, "sections": 0}
+        changed, seen = [], set()
+
+        for root, _, names in os.walk(folder):
+            for name in sorted(names):
+                if not name.lower().endswith(CORPUS_EXTENSIONS):
+                    continue
+                full_path = os.path.join(root, name)
+                relative = os.path.relpath(full_path, folder)
+                seen.add(relative)
+                stat = os.stat(full_path)
+                previous = known.get(relative)
+                if not force and previous and previous[0] == stat.st_mtime and previous[1] == stat.st_size:
+                    stats["unchanged"] += 1
+                    continue
+                digest = _file_digest(full_path)
+                if not force and previous and previous[2] == digest:
+                    connection.execute("UPDATE files SET mtime = ?, size = ? WHERE path = ?",
+                                       (stat.st_mtime, stat.st_size, relative))
+                    stats["unchanged"] += 1
+                    continue
+                stats["updated" if previous else "added"] += 1
+                changed.append((relative, full_path, stat, digest))
+
+        removed = [path for path in known if path not in seen]
+        stats["removed"] = len(removed)
+        if not changed and not removed:
+            return stats
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            for path in removed:
+                connection.execute("UPDATE sections SET live = 0 WHERE path = ? AND live = 1", (path,))
+                connection.execute("DELETE FROM files WHERE path = ?", (path,))
+            new_sections = []
+            for relative, full_path, stat, digest in changed:
+                connection.execute("UPDATE sections SET live = 0 WHERE path = ? AND live = 1", (relative,))
+                with open(full_path, encoding="utf-8", errors="replace") as handle:
+                    text = handle.read()
+                for section in split_sections(text):
+                    if section["text"].strip():
+                        new_sections.append((relative, section["heading"], section["text"]))
+                connection.execute(
+                    "INSERT OR REPLACE INTO files (path, mtime, size, digest) VALUES (?, ?, ?, ?)",
+                    (relative, stat.st_mtime, stat.st_size, digest),
+                )
+            stats["sections"] = len(new_sections)
+            self._write_segment(connection, new_sections)
+            obsolete = self._maybe_compact(connection)
+            connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self._remove_segment_files(obsolete)
+        return stats
+
+    def _write_segment(self, connection, sections):
+        """Write ``[(path, heading, text)]`` as a new segment."""
+        if not sections:
+            return
+        segment = connection.execute("INSERT INTO segments (sections) VALUES (?)", (len(sections),)).lastrowid
+        postings = {}
+        for path, heading, text in sections:
+            counts = Counter(tokenize(text))
+            section_id = connection.execute(
+                "INSERT INTO sections (path, segment, heading, text, length) VALUES (?, ?, ?, ?, ?)",
+                (path, segment, heading, text, sum(counts.values())),
+            ).lastrowid
+            for term, tf in counts.items():
+                entry = postings.get(term)
+                if entry is None:
+                    entry = postings[term] = (array("I"), array("I"))
+                entry[0].append(section_id)
+                entry[1].append(tf)
+
+        offset, rows = 0, []
+        with open(self._segment_path(segment), "wb") as handle:
+            for term in sorted(postings):
+                section_ids, frequencies = postings[term]
+                for values in (section_ids, frequencies):
+                    handle.write(np.asarray(values, dtype="<u4").tobytes())
+                rows.append((term, segment, len(section_ids), offset))
+                offset += 2 * len(section_ids)
+        connection.executemany("INSERT INTO terms (term, segment, df, offset) VALUES (?, ?, ?, ?)", rows)
+
+    def _maybe_compact(self, connection, force: bool = False) -> list:
+        segments = [row[0] for row in connection.execute("SELECT id FROM segments")]
+        total, dead = connection.execute("SELECT COUNT(*), COUNT(*) - SUM(live) FROM sections").fetchone()
+        if not force and len(segments) <= MAX_SEGMENTS and (not total or dead / total <= MAX_DEAD_SHARE):
+            return []
+        live = connection.execute(
+            "SELECT path, heading, text FROM sections WHERE live = 1 ORDER BY id"
+        ).fetchall()
+        connection.execute("DELETE FROM sections")
+        connection.execute("DELETE FROM terms")
+        connection.execute("DELETE FROM segments")
+        self._write_segment(connection, live)
+        return [self._segment_path(segment) for segment in segments]
+
+    def compact(self):
+        """Merge all segments into one and drop dead sections."""
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            obsolete = self._maybe_compact(connection, force=True)
+            connection.execute("UPDATE meta SET value = value + 1 WHERE key = 'generation'")
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        self._remove_segment_files(obsolete)
+
+    def _remove_segment_files(self, paths):
+        for path in paths:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    # Search -----------------------------------------------------------------
+
+    def _load(self):
+        """(Re)load section lengths, liveness and postings maps when the index changed."""
+        connection = self._connect()
+        generation = connection.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+        if generation == self._generation:
+            return
+        with self._lock:
+            if generation == self._generation:
+                return
+            # One read transaction, so a concurrent ingest is seen whole or not at all.
+            connection.execute("BEGIN")
+            try:
+                self._read_snapshot(connection)
+            finally:
+                connection.execute("COMMIT")
+
+    def _read_snapshot(self, connection):
+        generation = connection.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()[0]
+        max_id = connection.execute("SELECT COALESCE(MAX(id), 0) FROM sections").fetchone()[0]
+        ids, section_lengths = array("q"), array("q")
+        for section_id, length in connection.execute("SELECT id, length FROM sections WHERE live = 1"):
+            ids.append(section_id)
+            section_lengths.append(length)
+        # Dead and missing ids keep length 0 and are masked out by ``live``.
+        lengths = np.zeros(max_id + 1, dtype=np.float32)
+        live = np.zeros(max_id + 1, dtype=bool)
+        lengths[ids] = section_lengths
+        live[ids] = True
+        postings = {}
+        for (segment,) in connection.execute("SELECT id FROM segments"):
+            path = self._segment_path(segment)
+            if os.path.getsize(path):
+                postings[segment] = np.memmap(path, dtype="<u4", mode="r")
+        self._lengths, self._live, self._postings = lengths, live, postings
+        self._count = len(ids)
+        self._avg_length = float(lengths.sum()) / len(ids) if ids else 0.0
+        self._generation = generation
+
+    def search(self, query: str, limit: int = 5) -> list:
+        """
+        Top ``limit`` sections for ``query`` by BM25.
+
+        Each hit is ``{"id", "path", "heading", "snippet", "score", "confidence"}``;
+        ``confidence`` is the share of the query's idf weight that the hit
+        covers (1.0 = every query term appears in the section).
+        """
+        self._load()
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or not self._count:
+            return []
+
+        connection = self._connect()
+        rows = connection.execute(
+            f"SELECT term, segment, df, offset FROM terms WHERE term IN ({','.join('?' * len(terms))})", terms
+        ).fetchall()
+        df = Counter()
+        for term, _, term_df, _ in rows:
+            df[term] += term_df
+
+        n, avg_length = self._count, self._avg_length or 1.0
+        idf = {term: math.log(1 + (n - min(df[term], n) + 0.5) / (min(df[term], n) + 0.5)) for term in terms}
+        total_idf = sum(idf.values())
+
+        lengths, live = self._lengths, self._live
+        scores = np.zeros(len(lengths), dtype=np.float32)
+        matched = np.zeros(len(lengths), dtype=np.float32)
+        norm = BM25_K1 * (1 - BM25_B)
+        slope = BM25_K1 * BM25_B / avg_length
+        for term, segment, term_df, offset in rows:
+            view = self._postings.get(segment)
+            if view is None:
+                continue
+            # Section ids are unique within one term's postings, so fancy-index += is safe.
+            section_ids = view[offset:offset + term_df]
+            frequencies = view[offset + term_df:offset + 2 * term_df].astype(np.float32)
+            scores[section_ids] += idf[term] * (BM25_K1 + 1) * frequencies / (
+                frequencies + norm + slope * lengths[section_ids])
+            matched[section_ids] += idf[term]
+        scores[~live] = 0
+
+        candidates = np.flatnonzero(scores)
+        if not len(candidates):
+            return []
+        if len(candidates) > limit:
+            candidates = candidates[np.argpartition(scores[candidates], -limit)[-limit:]]
+        top = [(int(i), float(scores[i])) for i in candidates[np.argsort(-scores[candidates])]]
+        details = {
+            row[0]: row[1:] for row in connection.execute(
+                f"SELECT id, path, heading, text FROM sections WHERE id IN ({','.join('?' * len(top))})",
+                [section_id for section_id, _ in top],
+            )
+        }
+        hits = []
+        for section_id, score in top:
+            path, heading, text = details[section_id]
+            hits.append({
+                "id": section_id,
+                "path": path,
+                "heading": heading,
+                "snippet": " ".join(text.split())[:SNIPPET_CHARS],
+                "score": round(score, 4),
+                "confidence": round(float(matched[section_id]) / total_idf, 3) if total_idf else 0.0,
+            })
+        return hits
+
+    def stats(self) -> dict:
+        self._load()
+        connection = self._connect()
+        return {
+            "files": connection.execute("SELECT COUNT(*) FROM files").fetchone()[0],
+            "sections": self._count,
+            "segments": len(self._postings),
+            "terms": connection.execute("SELECT COUNT(DISTINCT term) FROM terms").fetchone()[0],
+        }
+
+
+def open_corpus_index(path):
+    """Open an existing index, or return None if ``path`` holds none."""
+    if not path or not os.path.exists(os.path.join(str(path), "index.sqlite3")):
+        return None
+    return CorpusIndex(path)
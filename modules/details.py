@@ -0,0 +1,100 @@
+import re
+
+DETAIL_FIELDS = ("party_a", "party_b", "effective_date", "term", "jurisdiction")
+NOT_FOUND = "Not Found"
+
+PROVINCES = (
+    "Alberta", "British Columbia", "Manitoba", "New Brunswick", "Newfoundland and Labrador",
+    "Northwest Territories", "Nova Scotia", "Nunavut", "Ontario", "Prince Edward Island",
+    "Quebec", "Québec", "Saskatchewan", "Yukon",
+)
+_CANONICAL_PROVINCE = {name.lower(): name for name in PROVINCES}
+_CANONICAL_PROVINCE["québec"] = "Quebec"
+
+_PROVINCE = "|".join(sorted((re.escape(p).replace(r"\ ", r"\s+") for p in PROVINCES), key=len, reverse=True))
+DATE_PATTERN = (
+    r"(?:[a-z]+\.?\s+\d{1,2}(?:st|nd|rd|th)?,?\s+\d{4}"
+    r"|(?:the\s+)?\d{1,2}(?:st|nd|rd|th)?\s+(?:day\s+of\s+)?[a-z]+,?\s+\d{4}"
+    r"|\d{4}-\d{2}-\d{2})"
+)
+DURATION_PATTERN = r"(?:[\w-]+\s+)?(?:\(\d+\)\s+)?(?:years?|months?|weeks?|days?)"
+
+# One alternative per way a field is stated, with the confidence of a match.
+# Group names are "<field>" or "<field>__<n>"; the parties pattern sets two fields.
+_ALTERNATIVES = (
+    (r"\bbetween\s+(?P<party_a>[^\n,;:]+?),?\s+and\s+(?P<party_b>[^\n,;:]+?)"
+     r"(?=\s*(?:[,;.(\n]|\bon\b|\bdated\b|\beffective\b|$))", 0.8),
+    (rf"\beffective\s+(?:on\s+|as\s+of\s+|from\s+|date\s*(?:is|:)?\s*)(?P<effective_date>{DATE_PATTERN})", 0.9),
+    (rf"\b(?:start(?:s|ing)?|commenc\w*)\s+(?:date\s+)?(?:is\s+|of\s+|on\s+)?(?P<effective_date__2>{DATE_PATTERN})", 0.7),
+    (rf"\b(?:remain\s+in\s+(?:full\s+force\s+and\s+)?effect\s+for|term\s+of)\s+(?P<term>{DURATION_PATTERN})", 0.9),
+    (rf"\bfor\s+a\s+period\s+of\s+(?P<term__2>{DURATION_PATTERN})", 0.6),
+    (rf"\b(?:laws?|jurisdiction|courts?)\s+of\s+(?:the\s+)?(?:province\s+of\s+)?(?P<jurisdiction>{_PROVINCE})\b", 0.9),
+    (rf"\b(?:in|province\s+of)\s+(?P<jurisdiction__2>{_PROVINCE})\b", 0.5),
+)
+_DETAILS = re.compile("|".join(f"(?:{pattern})" for pattern, _ in _ALTERNATIVES), re.IGNORECASE)
+_GROUP_CONFIDENCE = {
+    name: confidence
+    for pattern, confidence in _ALTERNATIVES
+    for name in re.compile(pattern).groupindex
+}
+# A value stated again in a later message is corroborated.
+CORROBORATION_BONUS = 0.05
+
+
+def canonical_province(name: str):
+    """The province or territory as spelled in PROVINCES ("Quebec" for "Québec"); None if unknown."""
+    return _CANONICAL_PROVINCE.get(" ".join(name.split()).lower())
+
+
+def _normalize(field: str, value: str) -> str:
+    value = " ".join(value.split()).strip(" .,;:")
+    if field == "jurisdiction":
+        return canonical_province(value) or value
+    return value
+
+
+def scan_details(text: str):
+    """Yield ``(field, value, confidence)`` for every detail stated in ``text``, in one pass."""
+    for match in _DETAILS.finditer(text.replace("**", "")):
+        for name, value in match.groupdict().items():
+            if value:
+                field = name.split("__")[0]
+                yield field, _normalize(field, value), _GROUP_CONFIDENCE[name]
+
+
+class DetailsExtractor:
+    """
+    Incremental extractor of document details.
+
+    Holds the best value per field with its confidence and provenance (the
+    message it came from); ``feed`` scans one new message. A later value
+    replaces an earlier one unless it is less confident, so corrections made
+    later in the conversation win; restating the same value raises its
+    confidence. The state is three JSON-serializable dicts, so it can be
+    persisted and resumed.
+    """
+
+    def __init__(self, values=None, confidence=None, provenance=None):
+        self.values = dict(values or {})
+        self.confidence = dict(confidence or {})
+        self.provenance = dict(provenance or {})
+
+    def feed(self, text: str, source=None) -> list:
+        """Scan one message; returns the fields that changed."""
+        changed = []
+        for field, value, confidence in scan_details(text):
+            current = self.values.get(field)
+            if current is not None and current.lower() == value.lower():
+                confidence = min(1.0, max(confidence, self.confidence[field]) + CORROBORATION_BONUS)
+            elif current is not None and confidence < self.confidence[field]:
+                continue
+            self.values[field] = value
+            self.confidence[field] = round(confidence, 2)
+            self.provenance[field] = source
+            if field not in changed:
+                changed.append(field)
+        return changed
+
+    def details(self) -> dict:
+        """Values for every field, with "Not Found" for the missing ones."""
+        return {field: self.values.get(field, NOT_FOUND) for field in DETAIL_FIELDS}
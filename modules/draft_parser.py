@@ -0,0 +1,106 @@
+import re
+from collections import namedtuple
+from .sections import LEGAL_HEADINGS
+
+# One structural element of a draft. ``kind`` is "heading", "bullet",
+# "numbered" or "paragraph"; ``marker`` is a numbered clause's label as
+# written ("1.", "(a)", "2.1)"); ``runs`` is a list of (text, bold) pairs.
+Block = namedtuple("Block", "kind level marker runs")
+
+_LEGAL_HEADINGS_UPPER = frozenset(h.upper() for h in LEGAL_HEADINGS)
+_MARKDOWN_HEADING = re.compile(r"^(#{1,6})\s+(.*)$")
+_BULLET = re.compile(r"^[-*•]\s+(.*)$")
+_NUMBERED = re.compile(r"^(\(?(\d+(?:\.\d+)*|[a-z]|[ivx]+|[A-Z])[.)])\s+(.*)$")
+_NUMBERED_TITLE = re.compile(r"^\d+(?:\.\d+)*[.)]?\s+[A-Z][A-Z0-9 ,;&'’()/\-]*:?$")
+_ROMAN = re.compile(r"^[ivx]+$")
+_MAX_HEADING_CHARS = 100
+
+
+def block_text(block: Block) -> str:
+    return "".join(text for text, _ in block.runs)
+
+
+def parse_runs(text: str) -> list:
+    """Split ``**bold**`` markup into (text, bold) runs; unmatched ``**`` stays literal."""
+    if "**" not in text:
+        return [(text, False)] if text else []
+    parts = text.split("**")
+    if len(parts) % 2 == 0:
+        parts[-2:] = ["**".join(parts[-2:])]
+    return [(part, i % 2 == 1) for i, part in enumerate(parts) if part]
+
+
+def _strip_bold(text: str) -> str:
+    return text.replace("**", "").strip()
+
+
+def _is_bold_heading(line: str) -> bool:
+    # A line that is bold as a whole: "**TITLE**", "**1. PARTIES:**", "**Recitals**:".
+    if not line.startswith("**") or line.count("**") != 2:
+        return False
+    inner = _strip_bold(line).rstrip(":")
+    if not inner or len(inner) > _MAX_HEADING_CHARS:
+        return False
+    return inner.upper() == inner or line.rstrip(":").endswith("**")
+
+
+def _is_plain_heading(line: str) -> bool:
+    if len(line) > _MAX_HEADING_CHARS:
+        return False
+    bare = line.rstrip(":")
+    return (bare.upper() in _LEGAL_HEADINGS_UPPER
+            or bool(_NUMBERED_TITLE.match(line))
+            or (bare.upper() == bare and any(c.isalpha() for c in bare) and len(bare.split()) <= 12))
+
+
+def _numbered_level(marker: str) -> int:
+    if marker[0].isdigit():
+        return marker.count(".") + 1
+    return 3 if _ROMAN.match(marker) and marker != "i" else 2
+
+
+def parse_draft(text: str):
+    """
+    Parse a markdown-ish draft into blocks in a single pass (a generator).
+
+    Recognises ``#`` headings, whole-line bold or ALL CAPS headings, numbered
+    clauses ("1.", "2.1", "(a)", "iv)"), bullets ("-", "*", "•") and inline
+    ``**bold**`` runs. Blank lines only separate blocks; every other line is
+    its own block, so signature blocks and addresses keep their line breaks.
+    """
+    seen_heading = False
+    for raw_line in text.splitlines():
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        match = _MARKDOWN_HEADING.match(line)
+        if match:
+            seen_heading = True
+            yield Block("heading", len(match.group(1)), None, [(_strip_bold(match.group(2)), False)])
+            continue
+
+        if _is_bold_heading(line) or (not line.startswith(("-", "•")) and _is_plain_heading(_strip_bold(line))):
+            # The first heading of a draft is its title.
+            level = 2 if seen_heading else 1
+            seen_heading = True
+            yield Block("heading", level, None, [(_strip_bold(line), False)])
+            continue
+
+        match = _BULLET.match(line)
+        if match:
+            yield Block("bullet", 1, None, parse_runs(match.group(1)))
+            continue
+
+        match = _NUMBERED.match(line)
+        if match:
+            yield Block("numbered", _numbered_level(match.group(2)), match.group(1), parse_runs(match.group(3)))
+            continue
+
+        yield Block("paragraph", 0, None, parse_runs(line))
+
+
+def marker_number(marker: str):
+    """The integer of a plain "N." / "N)" marker, else None."""
+    core = marker[:-1]
+    return int(core) if core.isdigit() else None
@@ -0,0 +1,142 @@
+import difflib
+import threading
+from collections import OrderedDict
+
+from .sections import _LEGAL_HEADINGS_UPPER
+
+# Per-line classification: (kind, formatted text without the section number).
+_BLANK = 0
+_HEADING = 1
+_TEXT = 2
+_BLANK_LINE = (_BLANK, "")
+
+
+def _classify(line: str) -> tuple:
+    stripped = line.strip()
+    if not stripped:
+        return _BLANK_LINE
+    upper = stripped.upper()
+    # Same test as sections.is_heading_line, without stripping twice.
+    if upper in _LEGAL_HEADINGS_UPPER or stripped.endswith(":"):
+        return (_HEADING, upper)
+    return (_TEXT, "    " + stripped)
+
+
+def _render(classified) -> str:
+    """Number headings, collapse blank runs and join the formatted lines."""
+    parts = []
+    number = 1
+    blank = False
+    for kind, text in classified:
+        if kind == _BLANK:
+            # Leading blanks are dropped, a run of blanks becomes one.
+            blank = bool(parts)
+            continue
+        if blank:
+            parts.append("    ")
+            blank = False
+        if kind == _HEADING:
+            parts.append(f"{number}. {text}")
+            number += 1
+        else:
+            parts.append(text)
+    return "\n\n".join(parts).strip() + "\n"
+
+
+def format_document_content(content: str) -> str:
+    """
+    Format raw AI-generated legal draft into a clean, readable legal document.
+    - Normalizes whitespace
+    - Formats headings
+    - Capitalizes clause titles
+    - Numbers main sections
+    - Adds consistent indentation
+
+    One pass over the lines: each line is classified once (a frozenset lookup
+    for known headings) and headings are numbered as they are emitted.
+    """
+    return _render(map(_classify, content.split("\n")))
+
+
+class IncrementalFormatter:
+    """
+    Keeps a formatted draft up to date across edits.
+
+    ``update`` diffs the new content against the previous one line by line
+    and classifies only the inserted or replaced lines; unchanged lines reuse
+    their earlier classification. Section numbers are reassigned while the
+    output is joined, so inserting or removing a heading renumbers the rest.
+    The result is always equal to ``format_document_content(content)``.
+    """
+
+    def __init__(self, content: str = ""):
+        self._lines = []
+        self._classified = []
+        # Line ranges [start, end) of the current content that were re-formatted by the last update
+        self.changed = []
+        self.formatted = self.update(content)
+
+    def update(self, content: str) -> str:
+        lines = content.split("\n")
+        old_lines, old_classified = self._lines, self._classified
+
+        # Edits are usually local: skip the common prefix and suffix before diffing.
+        prefix = 0
+        limit = min(len(old_lines), len(lines))
+        while prefix < limit and old_lines[prefix] == lines[prefix]:
+            prefix += 1
+        suffix = 0
+        while suffix < limit - prefix and old_lines[-1 - suffix] == lines[-1 - suffix]:
+            suffix += 1
+
+        classified = old_classified[:prefix]
+        changed = []
+        old_middle = old_lines[prefix:len(old_lines) - suffix]
+        new_middle = lines[prefix:len(lines) - suffix]
+        matcher = difflib.SequenceMatcher(None, old_middle, new_middle, autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == "equal":
+                classified.extend(old_classified[prefix + i1:prefix + i2])
+            elif j1 < j2:
+                classified.extend(map(_classify, new_middle[j1:j2]))
+                changed.append((prefix + j1, prefix + j2))
+        if suffix:
+            classified.extend(old_classified[-suffix:])
+
+        self._lines, self._classified, self.changed = lines, classified, changed
+        self.formatted = _render(classified)
+        return self.formatted
+
+
+class FormatterCache:
+    """
+    LRU of IncrementalFormatter by key (a document id), so re-formatting an
+    edited draft only classifies its changed lines.
+    """
+
+    def __init__(self, max_size=64):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def format(self, key, content: str) -> str:
+        # Taken out while in use, so two threads never update one formatter
+        with self._lock:
+            formatter = self._entries.pop(key, None)
+        if formatter is None:
+            formatter = IncrementalFormatter(content)
+        else:
+            formatter.update(content)
+        with self._lock:
+            self._entries[key] = formatter
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return formatter.formatted
+
+    def get(self, key):
+        with self._lock:
+            return self._entries.get(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,198 @@
+import asyncio
+import concurrent.futures
+from .search_cache import get_search_cache, normalize_query
+
+# Legal_Web_Search fans out to one sub-query per source.
+SCOPES = ("site:canlii.org", "site:justice.gc.ca")
+SITE_FILTER = " OR ".join(SCOPES)
+
+DEFAULT_TIMEOUT = 10.0
+DEFAULT_MAX_RESULTS = 5
+# Local corpus hits at or above this confidence answer the query without the web
+DEFAULT_MIN_CONFIDENCE = 0.6
+
+# Runs the per-scope sub-queries of the sync search path
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="legal-search")
+
+
+class SearchBackend:
+    """
+    Pluggable search backend.
+
+    ``search`` returns a list of ``{"title", "link", "snippet"}`` dicts.
+    Backends with a native async client should override ``asearch``; the
+    default runs ``search`` in a worker thread.
+    """
+
+    def search(self, query: str, max_results: int = DEFAULT_MAX_RESULTS) -> list:
+        raise NotImplementedError
+
+    async def asearch(self, query: str, max_results: int = DEFAULT_MAX_RESULTS) -> list:
+        return await asyncio.to_thread(self.search, query, max_results)
+
+
+class DuckDuckGoBackend(SearchBackend):
+    """DuckDuckGo web search (the library is sync-only, so asearch uses a thread)."""
+
+    def __init__(self):
+        self._wrapper = None
+
+    def search(self, query: str, max_results: int = DEFAULT_MAX_RESULTS) -> list:
+        if self._wrapper is None:
+            from langchain_community.utilities import DuckDuckGoSearchAPIWrapper
+            self._wrapper = DuckDuckGoSearchAPIWrapper()
+        return self._wrapper.results(query, max_results)
+
+
+_config = {
+    "backend": None,
+    "timeout": DEFAULT_TIMEOUT,
+    "max_results": DEFAULT_MAX_RESULTS,
+    "corpus": None,
+    "min_confidence": DEFAULT_MIN_CONFIDENCE,
+}
+
+
+def configure_search(backend: SearchBackend = None, timeout: float = DEFAULT_TIMEOUT,
+                     max_results: int = DEFAULT_MAX_RESULTS, corpus=None,
+                     min_confidence: float = DEFAULT_MIN_CONFIDENCE):
+    """
+    Set the process-wide search backend, per-query timeout and result count.
+
+    ``corpus`` is an optional ``CorpusIndex`` queried before the web; the web
+    is only searched when its best hit is below ``min_confidence``.
+    """
+    _config.update(backend=backend, timeout=timeout, max_results=max_results,
+                   corpus=corpus, min_confidence=min_confidence)
+
+
+def get_search_backend() -> SearchBackend:
+    if _config["backend"] is None:
+        _config["backend"] = DuckDuckGoBackend()
+    return _config["backend"]
+
+
+def merge_results(result_lists) -> list:
+    """Interleave per-scope results, dropping duplicates (same link or same text)."""
+    merged, seen = [], set()
+    for rank in range(max((len(r) for r in result_lists), default=0)):
+        for results in result_lists:
+            if rank >= len(results):
+                continue
+            result = results[rank]
+            link = (result.get("link") or "").strip().rstrip("/").lower()
+            key = link or (result.get("title", ""), result.get("snippet", ""))
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(result)
+    return merged
+
+
+def format_results(results: list) -> str:
+    if not results:
+        return "No results found."
+    return "\n\n".join(
+        f"{r.get('title', '').strip()}\n{r.get('link', '').strip()}\n{r.get('snippet', '').strip()}"
+        for r in results
+    )
+
+
+def _scoped_queries(query: str) -> list:
+    return [f"{query} {scope}" for scope in SCOPES]
+
+
+def search_local_corpus(query: str) -> tuple:
+    """
+    Query the local corpus index, if one is configured.
+
+    Returns ``(results, confident)`` where results use the web result shape.
+    """
+    corpus = _config["corpus"]
+    if corpus is None:
+        return [], False
+    hits = corpus.search(query, limit=_config["max_results"])
+    results = [
+        {
+            "title": f"{hit['heading'] or hit['path']} ({hit['path']})",
+            "link": f"corpus:{hit['path']}#{hit['id']}",
+            "snippet": hit["snippet"],
+        }
+        for hit in hits
+    ]
+    return results, bool(hits) and hits[0]["confidence"] >= _config["min_confidence"]
+
+
+def _with_local(local, web):
+    return f"{format_results(local)}\n\n{web}" if local else web
+
+
+def _finish(cache_key, outcomes, local):
+    """Merge per-scope outcomes; cache only if at least one scope succeeded."""
+    successes = [o for o in outcomes if not isinstance(o, BaseException)]
+    if not successes:
+        if local:
+            return format_results(local)
+        return f"An error occurred during the search: {outcomes[0]!r}"
+    results = format_results(merge_results(successes))
+    get_search_cache().set(cache_key, results)
+    return _with_local(local, results)
+
+
+def search_legal_sources(query: str) -> str:
+    """
+    Search the local corpus, then (unless it was confident) every web source
+    in parallel threads, all within one timeout.
+    """
+    local, confident = search_local_corpus(query)
+    if confident:
+        return format_results(local)
+    cache_key = normalize_query(query, SITE_FILTER)
+    cached = get_search_cache().get(cache_key)
+    if cached is not None:
+        return _with_local(local, cached)
+
+    backend, timeout, max_results = get_search_backend(), _config["timeout"], _config["max_results"]
+    queries = _scoped_queries(query)
+    futures = [_executor.submit(backend.search, q, max_results) for q in queries]
+    # One deadline for every source, not one timeout per source in turn
+    done, _ = concurrent.futures.wait(futures, timeout=timeout)
+    outcomes = []
+    for q, future in zip(queries, futures):
+        if future not in done:
+            # A running search cannot be stopped; its result is dropped
+            future.cancel()
+            outcomes.append(concurrent.futures.TimeoutError(f"{q!r} timed out after {timeout}s"))
+        elif future.exception() is not None:
+            outcomes.append(future.exception())
+        else:
+            outcomes.append(future.result())
+    return _finish(cache_key, outcomes, local)
+
+
+async def asearch_legal_sources(query: str) -> str:
+    """
+    Async variant of search_legal_sources; slow sub-queries are cancelled on
+    timeout. The corpus index and the cache read SQLite, so they run in
+    threads rather than on the event loop.
+    """
+    local, confident = await asyncio.to_thread(search_local_corpus, query)
+    if confident:
+        return format_results(local)
+    cache_key = normalize_query(query, SITE_FILTER)
+    cached = await asyncio.to_thread(get_search_cache().get, cache_key)
+    if cached is not None:
+        return _with_local(local, cached)
+
+    backend, timeout, max_results = get_search_backend(), _config["timeout"], _config["max_results"]
+    outcomes = await asyncio.gather(
+        *(asyncio.wait_for(backend.asearch(q, max_results), timeout) for q in _scoped_queries(query)),
+        return_exceptions=True,
+    )
+    return await asyncio.to_thread(_finish, cache_key, list(outcomes), local)
+
+
+async def asearch_many(queries: list) -> list:
+    """Run several Legal_Web_Search queries concurrently."""
+    return await asyncio.gather(*(asearch_legal_sources(q) for q in queries))
+
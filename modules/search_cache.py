@@ -0,0 +1,175 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Words that do not change what a legal search returns
+_STOPWORDS = frozenset("""
+    a an and are as at be by can could do does for from how i in is it me my of on or please
+    should that the this to under what when where which who will with would you your
+""".split())
+_WORD = re.compile(r"[a-z0-9]+(?:[.'’][a-z0-9]+)*")
+
+
+def normalize_query(query: str, site_filter: str = "") -> str:
+    """
+    Cache key for a search: lowercased, punctuation, extra whitespace and
+    stopwords dropped, with the site filter appended. Word order is kept, since
+    "tenant rights against landlord" is not "landlord rights against tenant".
+
+    "Residential Tenancy Act Ontario lease" and "the residential tenancy act
+    in ONTARIO, lease" map to the same key.
+    """
+    words = [w for w in _WORD.findall(query.lower()) if w not in _STOPWORDS]
+    return " ".join(words) + " | " + site_filter.strip().lower()
+
+
+class SearchCache:
+    """
+    Two-tier, TTL-bound cache for search results.
+
+    Tier 1 is an in-process LRU; tier 2 is an optional SQLite table that
+    survives restarts and is shared by every worker on the host. Entries expire
+    after ``ttl`` seconds and both tiers are size-bounded (least recently used
+    entries are evicted first).
+    """
+
+    def __init__(self, path=None, ttl: float = 86400, max_memory_entries: int = 512,
+                 max_disk_entries: int = 10000):
+        self.path = str(path) if path else None
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes_since_evict = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.path:
+            self._connect().execute(
+                "CREATE TABLE IF NOT EXISTS search_cache ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._connect().execute(
+                "CREATE INDEX IF NOT EXISTS search_cache_accessed ON search_cache (accessed_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread (and per process after a fork).
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key: str):
+        """Return the cached value for ``key``, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.memory_hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+        if self.path:
+            try:
+                connection = self._connect()
+                row = connection.execute(
+                    "SELECT value, expires_at FROM search_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    connection.execute("UPDATE search_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                    self._remember(key, row[0], row[1])
+                    with self._lock:
+                        self.disk_hits += 1
+                    return row[0]
+            except sqlite3.Error:
+                pass  # The durable tier is best-effort
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, key: str, value: str, ttl: float = None):
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        self._remember(key, value, expires_at)
+        if not self.path:
+            return
+        try:
+            connection = self._connect()
+            connection.execute(
+                "INSERT OR REPLACE INTO search_cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+            with self._lock:
+                self._writes_since_evict += 1
+                evict = self._writes_since_evict >= 64
+                if evict:
+                    self._writes_since_evict = 0
+            if evict:
+                self._evict_disk(connection, now)
+        except sqlite3.Error:
+            pass
+
+    def _remember(self, key, value, expires_at):
+        with self._lock:
+            self._memory[key] = (expires_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_entries:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self, connection, now):
+        connection.execute("DELETE FROM search_cache WHERE expires_at <= ?", (now,))
+        connection.execute(
+            "DELETE FROM search_cache WHERE key IN ("
+            " SELECT key FROM search_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_disk_entries,),
+        )
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self.memory_hits = self.disk_hits = self.misses = 0
+        if self.path:
+            self._connect().execute("DELETE FROM search_cache")
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+
+_search_cache = SearchCache()
+
+
+def get_search_cache() -> SearchCache:
+    return _search_cache
+
+
+def configure_search_cache(path=None, ttl: float = 86400, max_memory_entries: int = 512,
+                           max_disk_entries: int = 10000) -> SearchCache:
+    """Replace the process-wide cache (e.g. to add the SQLite tier at startup)."""
+    global _search_cache
+    _search_cache = SearchCache(path, ttl, max_memory_entries, max_disk_entries)
+    return _search_cache
@@ -0,0 +1,190 @@
+import math
+import re
+
+# Headings recognised by format_document_content
+LEGAL_HEADINGS = [
+    "agreement", "parties", "definitions", "terms", "termination",
+    "confidentiality", "governing law", "dispute resolution",
+    "miscellaneous", "signatures", "witnesseth", "now, therefore"
+]
+_LEGAL_HEADINGS_UPPER = frozenset(h.upper() for h in LEGAL_HEADINGS)
+
+# Markdown headings ("### 2. TRANSFER TERMS") and bold/plain numbered titles
+# ("**3. GOVERNING LAW**", "4. TERMINATION") as emitted by the model.
+_MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+\S")
+_NUMBERED_TITLE = re.compile(r"^(?:\*\*)?\d+(?:\.\d+)*[.)]?\s+[A-Z][A-Z0-9 ,;&'’()/\-]*(?:\*\*)?:?$")
+_SECTION_NUMBER = re.compile(r"^[#*\s]*(\d+)")
+
+_WORD = re.compile(r"[a-z0-9]+(?:['’][a-z]+)?")
+_EXPLICIT_REFERENCE = re.compile(r"\b(?:section|clause|paragraph|article)\s+(\d+)", re.IGNORECASE)
+_GLOBAL_EDIT = re.compile(
+    r"\b(?:entire|whole|throughout|everywhere|overall|globally|all\s+(?:sections|clauses|references|"
+    r"instances|occurrences|mentions)|every\s+(?:section|clause|reference)|tone|translate|translation|"
+    r"french|rewrite|reformat|proofread|renumber|consistent|consistency)\b",
+    re.IGNORECASE,
+)
+_STOPWORDS = frozenset("""
+    a an and are as at be by can could for from has have i in into is it its me my of on or our please
+    should so that the their them then there these this to us was we were what when where which will with
+    would you your change changes update modify edit make add remove replace instead set new
+    section sections clause clauses paragraph document agreement draft
+""".split())
+
+
+def is_heading_line(line: str) -> bool:
+    """Heading test used by format_document_content: a known heading or a line ending with ':'."""
+    stripped = line.strip()
+    return stripped.upper() in _LEGAL_HEADINGS_UPPER or stripped.endswith(":")
+
+
+def is_section_heading(line: str) -> bool:
+    stripped = line.strip()
+    if not stripped:
+        return False
+    return (is_heading_line(stripped)
+            or bool(_MARKDOWN_HEADING.match(stripped))
+            or bool(_NUMBERED_TITLE.match(stripped)))
+
+
+def split_sections(text: str) -> list:
+    """
+    Split a draft into sections at heading lines.
+
+    Returns a list of dicts ``{"index", "heading", "text"}``; text before the
+    first heading becomes section 0 with an empty heading. Splitting is
+    lossless: ``join_sections(split_sections(text)) == text``.
+    """
+    sections = []
+    heading, lines = "", []
+    for line in text.splitlines(keepends=True):
+        if is_section_heading(line) and (lines or heading):
+            sections.append({"index": len(sections), "heading": heading, "text": "".join(lines)})
+            heading, lines = line.strip(), []
+        elif is_section_heading(line):
+            heading = line.strip()
+        lines.append(line)
+    if lines:
+        sections.append({"index": len(sections), "heading": heading, "text": "".join(lines)})
+    return sections
+
+
+def join_sections(sections: list) -> str:
+    return "".join(section["text"] for section in sections)
+
+
+def outline_sections(sections: list) -> str:
+    """One line per section: "index: heading (first words)"."""
+    lines = []
+    for section in sections:
+        words = section["text"].split()
+        preview = " ".join(words[:8]) + ("…" if len(words) > 8 else "")
+        lines.append(f"{section['index']}: {section['heading'] or '(untitled)'} ({preview})")
+    return "\n".join(lines)
+
+
+def is_global_edit(user_request: str) -> bool:
+    """True if the request reads as a whole-document edit (tone, translation, ...)."""
+    return bool(_GLOBAL_EDIT.search(user_request))
+
+
+def _terms(text: str) -> list:
+    return [w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS and len(w) > 1]
+
+
+def rank_sections(sections: list, user_request: str) -> list:
+    """
+    Rank sections by lexical relevance to the request.
+
+    Explicit references ("section 3", "clause 2") win outright; otherwise each
+    request term scores tf * idf within a section, with a bonus for matches in
+    the heading. Returns ``[(score, index), ...]`` for sections scoring > 0,
+    best first.
+    """
+    referenced = {int(n) for n in _EXPLICIT_REFERENCE.findall(user_request)}
+    if referenced:
+        hits = []
+        for section in sections:
+            match = _SECTION_NUMBER.match(section["heading"])
+            if match and int(match.group(1)) in referenced:
+                hits.append((float("inf"), section["index"]))
+        if hits:
+            return hits
+
+    terms = set(_terms(user_request))
+    if not terms:
+        return []
+
+    section_terms = [_terms(section["text"]) for section in sections]
+    heading_terms = [set(_terms(section["heading"])) for section in sections]
+    n = len(sections)
+    df = {term: sum(1 for words in section_terms if term in words) for term in terms}
+
+    ranked = []
+    for section, words, heading_words in zip(sections, section_terms, heading_terms):
+        score = 0.0
+        for term in terms:
+            tf = words.count(term)
+            if not tf:
+                continue
+            idf = math.log(1 + n / df[term])
+            score += (1 + math.log(tf)) * idf * (2 if term in heading_words else 1)
+        if score > 0:
+            ranked.append((score, section["index"]))
+    ranked.sort(reverse=True)
+    return ranked
+
+
+def select_sections(sections: list, user_request: str, max_sections: int = 3,
+                    relative_cutoff: float = 0.5) -> list:
+    """
+    Pick the section indexes a request should touch, using lexical ranking.
+
+    Returns an empty list when nothing matched lexically.
+    """
+    ranked = rank_sections(sections, user_request)
+    if not ranked:
+        return []
+    top = ranked[0][0]
+    if top == float("inf"):
+        return sorted(index for _, index in ranked)
+    chosen = [index for score, index in ranked if score >= top * relative_cutoff]
+    return sorted(chosen[:max_sections])
+
+
+_SECTION_BLOCK = re.compile(r"<<<SECTION (\d+)>>>\n?(.*?)\n?<<<END SECTION \1>>>", re.DOTALL)
+
+
+def format_section_blocks(sections: list) -> str:
+    return "\n\n".join(
+        f"<<<SECTION {s['index']}>>>\n{s['text'].strip()}\n<<<END SECTION {s['index']}>>>" for s in sections
+    )
+
+
+def parse_section_blocks(text: str) -> dict:
+    """Parse ``<<<SECTION n>>> ... <<<END SECTION n>>>`` blocks into {n: text}."""
+    return {int(index): body.strip() for index, body in _SECTION_BLOCK.findall(text)}
+
+
+def splice_sections(sections: list, replacements: dict) -> tuple:
+    """
+    Replace section texts by index, keeping the original surrounding whitespace.
+
+    Returns ``(new_sections, changed_indexes)``.
+    """
+    updated, changed = [], []
+    for section in sections:
+        new_text = replacements.get(section["index"])
+        if new_text is None or new_text == section["text"].strip():
+            updated.append(section)
+            continue
+        text = section["text"]
+        leading = text[:len(text) - len(text.lstrip())]
+        trailing = text[len(text.rstrip()):]
+        first_line = new_text.splitlines()[0] if new_text else ""
+        updated.append({
+            "index": section["index"],
+            "heading": first_line.strip() if is_section_heading(first_line) else section["heading"],
+            "text": leading + new_text + trailing,
+        })
+        changed.append(section["index"])
+    return updated, changed
@@ -1,7 +1,7 @@
-from langchain_community.tools import DuckDuckGoSearchRun
 from langchain.tools import BaseTool
 from typing import Type
 from pydantic import BaseModel, Field
+from .search import asearch_legal_sources, search_legal_sources
 
 class LegalSearchInput(BaseModel):
     query: str = Field(description="A detailed search query to find information on Canadian legal topics.")
@@ -12,18 +12,8 @@ class LegalWebSearchTool(BaseTool):
     args_schema: Type[BaseModel] = LegalSearchInput
 
     def _run(self, query: str):
-        """Executes the web search using DuckDuckGo."""
-        # Append the site filter to the user's query
-        scoped_query = f"{query} site:canlii.org OR site:justice.gc.ca"
-        
-        # Initialize the DuckDuckGo search tool
-        ddg_search = DuckDuckGoSearchRun()
-        
-        try:
-            results = ddg_search.run(scoped_query)
-            return results
-        except Exception as e:
-            return f"An error occurred during the search: {e}"
+        """Searches each legal source in parallel, answering repeats from the search cache."""
+        return search_legal_sources(query)
 
-    def _arun(self, query: str):
-        raise NotImplementedError("LegalWebSearchTool does not support async")
+    async def _arun(self, query: str):
+        return await asearch_legal_sources(query)
@@ -1,32 +1,210 @@
+import copy
 import io
+import os
+import re
+import threading
 from docx import Document
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+from docx.oxml.numbering import CT_Num
+from docx.text.paragraph import Paragraph
+from lxml.etree import SubElement
+from fontTools import ttLib
 from fpdf import FPDF
+from fpdf.fonts import SubsetMap
+from .draft_parser import block_text, marker_number, parse_draft
+
+_CONTROL_CHARS = re.compile(r"[\x00-\x08\x0b-\x1f]")
+
+
+class _DocxWriter:
+    """
+    Appends parsed draft blocks to a python-docx Document.
+
+    Paragraph and run XML is built directly and styled by cached style id:
+    python-docx's ``add_paragraph(style=...)`` re-scans every style in the
+    template and every body child on each call, and ``add_run`` appends text
+    character by character, which dominates on 100-page drafts.
+    """
+
+    def __init__(self, document):
+        self.document = document
+        self._style_ids = {}
+        self._anchor = document.element.body.sectPr
+        self._parent = document._body
+        numbering = document.part.numbering_part.numbering_definitions._numbering
+        list_style = document.styles["List Number"]
+        abstract = numbering.num_having_numId(list_style.element.pPr.numPr.numId.val).abstractNumId
+        self._numbering = numbering
+        self._abstract_num_id = abstract.val
+        self._free_num_id = numbering._next_numId
+        self._num_id = None
+        self._next_number = None
+
+    def style_id(self, name):
+        style_id = self._style_ids.get(name)
+        if style_id is None:
+            style_id = self._style_ids[name] = self.document.styles[name].style_id
+        return style_id
+
+    def _list_num_id(self, number):
+        # Continue the current list if this is its next number, else start a
+        # new list (a w:num sharing List Number's format, restarting at number).
+        if self._num_id is None or number != self._next_number:
+            num = CT_Num.new(self._free_num_id, self._abstract_num_id)
+            num.add_lvlOverride(ilvl=0).add_startOverride(number)
+            self._numbering._insert_num(num)
+            self._num_id = self._free_num_id
+            self._free_num_id += 1
+        self._next_number = number + 1
+        return self._num_id
+
+    def paragraph(self, runs, style_name=None, num_id=None):
+        p = OxmlElement("w:p")
+        if style_name is not None:
+            pPr = SubElement(p, qn("w:pPr"))
+            SubElement(pPr, qn("w:pStyle")).set(qn("w:val"), self.style_id(style_name))
+            if num_id is not None:
+                numPr = SubElement(pPr, qn("w:numPr"))
+                SubElement(numPr, qn("w:ilvl")).set(qn("w:val"), "0")
+                SubElement(numPr, qn("w:numId")).set(qn("w:val"), str(num_id))
+        if self._anchor is not None:
+            self._anchor.addprevious(p)
+        else:
+            self.document.element.body.append(p)
+
+        for text, bold in runs:
+            if _CONTROL_CHARS.search(text) or "\t" in text:
+                # Rare; let python-docx translate tabs and drop invalid characters.
+                Paragraph(p, self._parent).add_run(_CONTROL_CHARS.sub("", text)).bold = bold or None
+                continue
+            r = SubElement(p, qn("w:r"))
+            if bold:
+                SubElement(SubElement(r, qn("w:rPr")), qn("w:b"))
+            t = SubElement(r, qn("w:t"))
+            t.text = text
+            if text[:1].isspace() or text[-1:].isspace():
+                t.set(qn("xml:space"), "preserve")
+
+    def add(self, block):
+        if block.kind == "heading":
+            name = "Title" if block.level == 1 else f"Heading {min(block.level - 1, 3)}"
+            self.paragraph([(block_text(block), False)], name)
+        elif block.kind == "bullet":
+            self.paragraph(block.runs, "List Bullet")
+        elif block.kind == "numbered" and marker_number(block.marker) is not None:
+            self.paragraph(block.runs, "List Number", self._list_num_id(marker_number(block.marker)))
+        elif block.kind == "numbered":
+            # "(a)", "2.1", "iv." keep their label and are indented by depth
+            name = "List Continue" if block.level == 1 else f"List Continue {min(block.level, 3)}"
+            self.paragraph([(f"{block.marker} ", False)] + block.runs, name)
+        else:
+            self.paragraph(block.runs)
+
 
 def create_docx(content: str) -> io.BytesIO:
-    """Creates a DOCX file in memory from a string."""
+    """
+    Creates a DOCX file in memory from a draft.
+
+    Headings, numbered clauses, bullets and **bold** runs become Word styles,
+    list numbering and bold runs instead of one plain paragraph.
+    """
     document = Document()
-    document.add_paragraph(content)
-    
+    writer = _DocxWriter(document)
+    for block in parse_draft(content):
+        writer.add(block)
+
     buffer = io.BytesIO()
     document.save(buffer)
     buffer.seek(0)
     return buffer
 
+FONT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fonts")
+PDF_FONT_FAMILY = "DejaVuSerif"
+PDF_FONT_FILES = {"": "DejaVuSerif.ttf", "B": "DejaVuSerif-Bold.ttf"}
+PDF_BODY_SIZE = 11
+PDF_LINE_HEIGHT = 5.5
+PDF_INDENT = 6
+
+_pdf_fonts = {}
+_pdf_fonts_lock = threading.Lock()
+
+def _add_pdf_fonts(pdf: FPDF):
+    """Registers the bundled Unicode fonts on pdf, parsing each TTF once per process."""
+    with _pdf_fonts_lock:
+        if not _pdf_fonts:
+            loader = FPDF()
+            for style, filename in PDF_FONT_FILES.items():
+                loader.add_font(PDF_FONT_FAMILY, style, os.path.join(FONT_DIR, filename))
+            _pdf_fonts.update(loader.fonts)
+
+    for fontkey, parsed in _pdf_fonts.items():
+        # Metrics (cmap, glyph widths) are shared. Output subsets font.ttfont
+        # in place, so every document gets its own lazily loaded copy of it.
+        font = copy.copy(parsed)
+        font.i = len(pdf.fonts) + 1
+        font.ttfont = ttLib.TTFont(font.ttffile, recalcTimestamp=False, lazy=True)
+        font.subset = SubsetMap(font)
+        font.biggest_size_pt = 0
+        pdf.fonts[fontkey] = font
+
+def _write_runs(pdf: FPDF, runs):
+    for text, bold in runs:
+        pdf.set_font(PDF_FONT_FAMILY, "B" if bold else "", PDF_BODY_SIZE)
+        pdf.write(PDF_LINE_HEIGHT, text)
+
 def create_pdf(content: str) -> io.BytesIO:
-    """Creates a PDF file in memory from a string."""
+    """
+    Creates a PDF file in memory from a draft.
+
+    Uses the bundled DejaVu Serif fonts (embedded as subsets), so accents,
+    curly quotes and other non-Latin-1 characters print as written. Headings,
+    numbered clauses, bullets and **bold** runs are laid out block by block.
+    """
     pdf = FPDF()
+    pdf.set_margins(20, 20, 20)
+    pdf.set_auto_page_break(True, margin=20)
+    _add_pdf_fonts(pdf)
     pdf.add_page()
-    pdf.set_font("Arial", size=12)
-    
-    # Encode content to latin-1, which is what FPDF expects
-    # Replace characters that can't be encoded
-    encoded_content = content.encode('latin-1', 'replace').decode('latin-1')
-    
-    pdf.multi_cell(0, 10, txt=encoded_content)
-    
+    margin = pdf.l_margin
+
+    for block in parse_draft(content):
+        if block.kind == "heading":
+            if block.level == 1:
+                pdf.set_font(PDF_FONT_FAMILY, "B", 15)
+                pdf.multi_cell(0, 8, block_text(block), align="C", new_x="LMARGIN", new_y="NEXT")
+                pdf.ln(4)
+            else:
+                pdf.ln(3)
+                pdf.set_font(PDF_FONT_FAMILY, "B", 12)
+                pdf.multi_cell(0, 6.5, block_text(block), new_x="LMARGIN", new_y="NEXT")
+                pdf.ln(1)
+            continue
+
+        label = "•" if block.kind == "bullet" else block.marker
+        if label:
+            # Hanging indent: the label sits in the gutter, wrapped lines align with the text.
+            x = margin + (block.level - 1) * PDF_INDENT
+            pdf.set_font(PDF_FONT_FAMILY, "", PDF_BODY_SIZE)
+            width = max(PDF_INDENT, pdf.get_string_width(label) + 2)
+            pdf.set_x(x)
+            pdf.cell(width, PDF_LINE_HEIGHT, label)
+            pdf.set_left_margin(x + width)
+        _write_runs(pdf, block.runs)
+        pdf.set_left_margin(margin)
+        pdf.ln(PDF_LINE_HEIGHT + 1.5)
+
     buffer = io.BytesIO()
-    # The output from pdf.output is already bytes, no need to encode again
-    pdf_output = pdf.output(dest='S')
-    buffer.write(pdf_output)
+    buffer.write(pdf.output())
     buffer.seek(0)
     return buffer
+
+
+RENDERERS = {
+    "docx": create_docx,
+    "pdf": create_pdf,
+}
+
+def render_document(file_format: str, content: str) -> bytes:
+    """Renders content as DOCX or PDF bytes (picklable entry point for worker processes)."""
+    return RENDERERS[file_format](content).getvalue()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Benchmark SQLite under concurrent chat turns: N writer and M reader threads.
+
+Each writer saves turns the way ai_agent.history.save_messages does (read the
+session, insert two messages, touch the session, in one transaction); each
+reader pages a transcript and counts messages like the session summary.
+Compares SQLite's defaults (rollback journal, synchronous=FULL, deferred
+transactions, a new connection per operation as with CONN_MAX_AGE=0) with
+the profile in backend.db (WAL, synchronous=NORMAL, busy_timeout, mmap and
+cache size, immediate write transactions, persistent connections and a
+query_only read connection). Run from the repository root:
+
+    python tests/bench_db.py [writers] [readers] [seconds]
+"""
+
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+
+import django
+
+django.setup()
+
+from backend.db import READ_DATABASE, sqlite_pragmas
+
+SESSIONS = 50
+MESSAGES_PER_SESSION = 40
+
+SCHEMA = """
+CREATE TABLE chat_sessions_session (id TEXT PRIMARY KEY, title TEXT, status TEXT, updated_at TEXT);
+CREATE TABLE chat_message (
+    id TEXT PRIMARY KEY, session_id TEXT REFERENCES chat_sessions_session (id),
+    role TEXT, content TEXT, metadata TEXT, created_at TEXT
+);
+CREATE INDEX chat_message_session_created ON chat_message (session_id, created_at, id);
+"""
+
+CONTENT = "The Tenant shall pay rent on the first day of each month. " * 8
+
+
+def now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def create_database(path):
+    db = sqlite3.connect(path)
+    db.executescript(SCHEMA)
+    sessions = [str(uuid.uuid4()) for _ in range(SESSIONS)]
+    db.executemany("INSERT INTO chat_sessions_session VALUES (?, 'Lease', 'drafting', ?)",
+                   [(pk, now()) for pk in sessions])
+    db.executemany("INSERT INTO chat_message VALUES (?, ?, 'user', ?, '{}', ?)", [
+        (str(uuid.uuid4()), pk, CONTENT, now()) for pk in sessions for _ in range(MESSAGES_PER_SESSION)
+    ])
+    db.commit()
+    db.close()
+    return sessions
+
+
+class Profile:
+    def __init__(self, name, persistent, begin, pragmas):
+        self.name = name
+        self.persistent = persistent
+        self.begin = begin
+        self.pragmas = pragmas
+
+    def connect(self, path, alias):
+        # isolation_level=None: transactions are opened explicitly, as Django does
+        db = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        for pragma in self.pragmas(alias):
+            db.execute(f"PRAGMA {pragma}")
+        return db
+
+
+PROFILES = [
+    Profile("sqlite defaults", persistent=False, begin="BEGIN", pragmas=lambda alias: []),
+    Profile("backend.db profile", persistent=True, begin="BEGIN IMMEDIATE", pragmas=sqlite_pragmas),
+]
+
+
+def write_turn(db, profile, session_id):
+    db.execute(profile.begin)
+    try:
+        db.execute("SELECT status FROM chat_sessions_session WHERE id = ?", (session_id,)).fetchone()
+        db.executemany("INSERT INTO chat_message VALUES (?, ?, ?, ?, '{}', ?)", [
+            (str(uuid.uuid4()), session_id, "user", "Add a pet clause", now()),
+            (str(uuid.uuid4()), session_id, "assistant", CONTENT, now()),
+        ])
+        db.execute("UPDATE chat_sessions_session SET updated_at = ? WHERE id = ?", (now(), session_id))
+        db.execute("COMMIT")
+    except BaseException:
+        if db.in_transaction:
+            db.execute("ROLLBACK")
+        raise
+
+
+def read_page(db, profile, session_id):
+    db.execute(
+        "SELECT id, role, content FROM chat_message WHERE session_id = ? "
+        "ORDER BY created_at DESC, id DESC LIMIT 20", (session_id,)
+    ).fetchall()
+    db.execute("SELECT COUNT(*) FROM chat_message WHERE session_id = ?", (session_id,)).fetchone()
+
+
+def worker(path, profile, alias, operation, sessions, stop, results):
+    done = errors = 0
+    db = profile.connect(path, alias) if profile.persistent else None
+    while not stop.is_set():
+        connection = db or profile.connect(path, alias)
+        try:
+            operation(connection, profile, random.choice(sessions))
+            done += 1
+        except sqlite3.OperationalError:  # database is locked
+            errors += 1
+        finally:
+            if db is None:
+                connection.close()
+    if db is not None:
+        db.close()
+    results.append((alias, done, errors))
+
+
+def run(profile, writers, readers, seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "bench.sqlite3")
+        sessions = create_database(path)
+        stop = threading.Event()
+        results = []
+        threads = [
+            threading.Thread(target=worker, args=(path, profile, "default", write_turn, sessions, stop, results))
+            for _ in range(writers)
+        ] + [
+            threading.Thread(target=worker, args=(path, profile, READ_DATABASE, read_page, sessions, stop, results))
+            for _ in range(readers)
+        ]
+        for thread in threads:
+            thread.start()
+        time.sleep(seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+
+    for alias, label in (("default", "turns"), (READ_DATABASE, "reads")):
+        done = sum(r[1] for r in results if r[0] == alias)
+        errors = sum(r[2] for r in results if r[0] == alias)
+        print(f"  {label:<6} {done / seconds:9.1f} /s   {errors:5d} locked")
+
+
+if __name__ == "__main__":
+    writers, readers, seconds = (sys.argv[1:] + [None] * 3)[:3]
+    writers, readers = int(writers or 4), int(readers or 4)
+    seconds = float(seconds or 5)
+    print(f"{writers} writers, {readers} readers, {seconds:g} s")
+    for profile in PROFILES:
+        print(profile.name)
+        run(profile, writers, readers, seconds)
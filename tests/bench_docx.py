@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark DOCX export of a long draft: build time and peak memory.
+
+Compares the structure-aware builder (modules.utils.create_docx) with the old
+single-paragraph export. Peak memory is the Python heap seen by tracemalloc;
+lxml's C allocations are not included. Run from the repository root:
+
+    python tests/bench_docx.py [pages]
+"""
+
+import io
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from docx import Document
+from modules.utils import create_docx
+
+LINES_PER_PAGE = 45
+
+SECTION = """### **{n}. TRANSFER TERMS**
+
+The property subject to this Agreement is legally described as:
+- Municipal Address: **789 Pine Road, Toronto, Ontario, M4B 1B2**
+- Legal Description: **Lot 12, Plan 3456, City of Toronto**
+
+1. The Transferor agrees to transfer full legal ownership of the property to the Transferee on **October 15, 2033**.
+2. The transfer shall be unconditional, with no monetary consideration required from the Transferee.
+(a) The Transferee shall pay all land transfer taxes arising from the transfer.
+(b) The Transferor shall maintain the property in good repair until the transfer date.
+
+This Agreement shall be governed by and construed in accordance with the laws of the **Province of Ontario**.
+"""
+
+
+def make_draft(pages):
+    lines_per_section = SECTION.count("\n") + 1
+    sections = max(1, pages * LINES_PER_PAGE // lines_per_section)
+    return "**PROPERTY TRANSFER AGREEMENT**\n\n" + "\n".join(SECTION.format(n=n) for n in range(1, sections + 1))
+
+
+def single_paragraph_docx(content):
+    document = Document()
+    document.add_paragraph(content)
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer
+
+
+def measure(label, build, content, repeat=3):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        buffer = build(content)
+        timings.append(time.perf_counter() - started)
+    tracemalloc.start()
+    build(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    size = len(buffer.getvalue())
+    print(f"{label:<20} best {min(timings) * 1000:8.1f} ms   peak heap {peak / 2**20:6.1f} MiB   file {size / 1024:7.1f} KiB")
+
+
+if __name__ == "__main__":
+    pages = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    draft = make_draft(pages)
+    print(f"{pages} pages: {draft.count(chr(10)) + 1} lines, {len(draft) / 1024:.0f} KiB of text")
+    measure("single paragraph", single_paragraph_docx, draft)
+    measure("structured", create_docx, draft)
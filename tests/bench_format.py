@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark format_document_content on 1k-, 10k- and 100k-line drafts.
+
+Compares the previous regex-per-heading formatter with the single-pass one
+(modules.formatting) and with IncrementalFormatter re-formatting a draft
+after a one-line edit. Run from the repository root:
+
+    python tests/bench_format.py [lines ...]
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.formatting import IncrementalFormatter, format_document_content
+from modules.sections import LEGAL_HEADINGS, is_heading_line
+
+SECTION = """TERMS
+
+The Transferor agrees to transfer full legal ownership of the property to the Transferee.
+The transfer shall be unconditional, with no monetary consideration required.
+
+Governing Law:
+This Agreement shall be governed by the laws of the Province of Ontario.
+
+
+Confidentiality
+Each party shall keep the terms of this Agreement confidential."""
+
+
+def make_draft(lines):
+    section_lines = SECTION.count("\n") + 1
+    return "\n".join([SECTION] * max(1, lines // section_lines))
+
+
+def regex_per_heading(content):
+    # The formatter this module replaced, kept for comparison.
+    content = re.sub(r'\n\s*\n+', '\n\n', content.strip())
+    for heading in LEGAL_HEADINGS:
+        pattern = rf"(?<=\n)({heading})(?=\n)"
+        content = re.sub(pattern, lambda m: m.group(1).upper(), content, flags=re.IGNORECASE)
+    numbered_lines = []
+    section_number = 1
+    for line in content.split('\n'):
+        if is_heading_line(line):
+            numbered_lines.append(f"{section_number}. {line.strip().upper()}")
+            section_number += 1
+        else:
+            numbered_lines.append("    " + line.strip())
+    return '\n\n'.join(numbered_lines).strip() + "\n"
+
+
+def best_of(function, argument, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(argument)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def report(label, seconds, lines):
+    print(f"  {label:<22} {seconds * 1000:9.2f} ms   {lines / seconds / 1e6:7.2f} M lines/s")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000]
+    for size in sizes:
+        draft = make_draft(size)
+        lines = draft.count("\n") + 1
+        repeat = 5 if lines < 50_000 else 3
+        assert regex_per_heading(draft) == format_document_content(draft)
+        print(f"{lines} lines, {len(draft) / 1024:.0f} KiB")
+        report("regex per heading", best_of(regex_per_heading, draft, repeat), lines)
+        report("single pass", best_of(format_document_content, draft, repeat), lines)
+
+        # One edited line in the middle of the draft.
+        formatter = IncrementalFormatter(draft)
+        middle = len(draft) // 2
+        edited = [draft, draft[:middle] + "TERMINATION:\n" + draft[middle:]]
+        timings = []
+        for i in range(repeat * 2):
+            started = time.perf_counter()
+            formatter.update(edited[i % 2])
+            timings.append(time.perf_counter() - started)
+        assert formatter.formatted == format_document_content(edited[1])
+        report("incremental, 1 edit", min(timings), lines)